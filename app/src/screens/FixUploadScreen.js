@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import {
   View,
   Text,
@@ -14,7 +14,7 @@ import {
 import { MaterialIcons } from "@expo/vector-icons";
 import * as ImagePicker from "expo-image-picker";
 import { auth } from "../services/firebase";
-import api from "../services/api";
+import api, { isRejectedSubmission, newIdempotencyKey } from "../services/api";
 import { getIssueDisplayName } from "../utils/issueTypeMapping";
 import { Ionicons } from "@expo/vector-icons";
 import { KeyboardAwareScrollView } from "react-native-keyboard-controller";
@@ -24,6 +24,14 @@ const FixUploadScreen = ({ route, navigation }) => {
   const [images, setImages] = useState([]);
   const [description, setDescription] = useState("");
   const [uploading, setUploading] = useState(false);
+  // Reused across retries of the same submission; cleared once it succeeds or is
+  // rejected, and whenever the form changes
+  const idempotencyKey = useRef(null);
+
+  // An edited form is a different submission: it must not replay the old result
+  useEffect(() => {
+    idempotencyKey.current = null;
+  }, [images, description]);
 
   const pickImages = async () => {
     try {
@@ -145,6 +153,9 @@ const FixUploadScreen = ({ route, navigation }) => {
         });
       });
 
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = newIdempotencyKey();
+      }
       const response = await api.post(
         `/api/issues/${issueId}/submit-fix`,
         formData,
@@ -152,11 +163,13 @@ const FixUploadScreen = ({ route, navigation }) => {
           headers: {
             "Content-Type": "multipart/form-data",
             Authorization: `Bearer ${token}`,
+            "Idempotency-Key": idempotencyKey.current,
           },
         }
       );
 
       if (response.status === 200) {
+        idempotencyKey.current = null;
         const verificationResult = response.data.verification_result;
 
         if (verificationResult && verificationResult.overall_outcome) {
@@ -219,6 +232,9 @@ const FixUploadScreen = ({ route, navigation }) => {
       }
     } catch (error) {
       console.error("Error submitting fix:", error.message || error);
+      if (isRejectedSubmission(error)) {
+        idempotencyKey.current = null;
+      }
       let errorMessage =
         "Failed to submit fix. Please check your connection and try again.";
 
@@ -106,9 +106,11 @@ const HomeScreen = ({ navigation }) => {
   const [page, setPage] = useState(1);
   const [hasMore, setHasMore] = useState(true);
   const [loadingMore, setLoadingMore] = useState(false);
+  // Opaque token from the backend for the page after the last one loaded
+  const [nextCursor, setNextCursor] = useState(null);
 
   const handleLoadMore = async () => {
-    if (loadingMore || !hasMore || !lastLocation?.coords) return;
+    if (loadingMore || !hasMore || !nextCursor || !lastLocation?.coords) return;
 
     console.log(
       `Loading more issues... Current posts: ${posts.length}, Page: ${page}`
@@ -123,7 +125,7 @@ const HomeScreen = ({ navigation }) => {
           latitude: lastLocation.coords.latitude,
           longitude: lastLocation.coords.longitude,
           limit: 20,
-          skip: posts.length, // Use current posts length as offset to avoid duplicates
+          cursor: nextCursor, // Continues after the last loaded issue, however deep
         },
       });
 
@@ -143,7 +145,7 @@ const HomeScreen = ({ navigation }) => {
               issueTypes: issue.detected_issues,
               location: await formatLocation(issue.location),
               postImage: {
-                uri: issue.photo_url,
+                uri: issue.photo_variants?.medium || issue.photo_url,
               },
               impactLevel:
                 issue.severity_score >= 8
@@ -176,9 +178,11 @@ const HomeScreen = ({ navigation }) => {
           }, Current skip: ${response.data.skip || 0}`
         );
 
-        if (newIssues.length === 0) {
+        setNextCursor(response.data.next_cursor || null);
+        if (!response.data.next_cursor) {
           setHasMore(false);
-        } else {
+        }
+        if (newIssues.length > 0) {
           // Filter out duplicates by checking if issue ID already exists
           setPosts((prev) => {
             const existingIds = new Set(prev.map((p) => p.id));
@@ -254,6 +258,7 @@ const HomeScreen = ({ navigation }) => {
       // Reset pagination state when fetching initial posts
       setPage(1);
       setHasMore(true);
+      setNextCursor(null);
 
       // NEW: Use the combined endpoint that includes user status
       const response = await api.get("/api/issues/with-user-status", {
@@ -270,6 +275,8 @@ const HomeScreen = ({ navigation }) => {
         setPosts([]);
         return;
       }
+      setNextCursor(response.data.next_cursor || null);
+      setHasMore(Boolean(response.data.next_cursor));
 
       const issues = await Promise.all(
         response.data.issues.map(async (issue) => {
@@ -284,7 +291,7 @@ const HomeScreen = ({ navigation }) => {
             issueTypes: issue.detected_issues,
             location: await formatLocation(issue.location),
             postImage: {
-              uri: issue.photo_url,
+              uri: issue.photo_variants?.medium || issue.photo_url,
             },
             impactLevel:
               issue.severity_score >= 8
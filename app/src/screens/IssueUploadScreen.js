@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   View,
   Text,
@@ -12,7 +12,7 @@ import {
 import * as ImagePicker from "expo-image-picker";
 import { useActionSheet } from "@expo/react-native-action-sheet";
 import * as Location from "expo-location";
-import api from "../services/api";
+import api, { isRejectedSubmission, newIdempotencyKey } from "../services/api";
 import { KeyboardAwareScrollView } from "react-native-keyboard-controller";
 import { auth } from "../services/firebase";
 import { getCurrentLocation } from "../services/getLocation";
@@ -22,6 +22,9 @@ import { getIssueTypesWithNames } from "../utils/issueTypeMapping";
 import { Dropdown } from "react-native-element-dropdown";
 import Constants from "expo-constants";
 
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_POLL_TIMEOUT_MS = 120000;
+
 const IssueUploadScreen = ({ navigation }) => {
   const [image, setImage] = useState(null);
   const [description, setDescription] = useState("");
@@ -30,9 +33,17 @@ const IssueUploadScreen = ({ navigation }) => {
   const [isAnonymous, setIsAnonymous] = useState(false);
   const [loadingLocation, setLoadingLocation] = useState(false);
   const [uploading, setUploading] = useState(false);
+  // Reused across retries of the same submission; cleared once it succeeds or is
+  // rejected, and whenever the form changes
+  const idempotencyKey = useRef(null);
   const [issueTypes, setIssueTypes] = useState([]);
   const { showActionSheetWithOptions } = useActionSheet();
 
+  // An edited form is a different submission: it must not replay the old result
+  useEffect(() => {
+    idempotencyKey.current = null;
+  }, [image, description, location, address, isAnonymous, issueTypes]);
+
   console.log("test", process.env.EXPO_PUBLIC_GOOGLE_MAPS_API_KEY);
 
   const issueTypesData = getIssueTypesWithNames();
@@ -151,6 +162,11 @@ const IssueUploadScreen = ({ navigation }) => {
         type: type,
       });
       formData.append("locationstr", address);
+      // Device/place coordinates let the backend skip forward geocoding
+      if (location?.coords) {
+        formData.append("latitude", String(location.coords.latitude));
+        formData.append("longitude", String(location.coords.longitude));
+      }
       formData.append("description", description);
       if (issueTypes && issueTypes.length > 0) {
         issueTypes.forEach((label) => {
@@ -169,19 +185,29 @@ const IssueUploadScreen = ({ navigation }) => {
       console.log("User authenticated:", user.uid);
       console.log("Token obtained:", token ? "Yes" : "No");
 
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = newIdempotencyKey();
+      }
+      // Ask for a job instead of holding the request open through the analysis
       const response = await api.post("/submit-issue", formData, {
         headers: {
           Authorization: `Bearer ${token}`,
           "Content-Type": "multipart/form-data",
+          Prefer: "respond-async",
+          "Idempotency-Key": idempotencyKey.current,
         },
         timeout: 60000,
       });
 
       console.log("Upload successful:", response.data);
 
-      // add to db
+      const result =
+        response.status === 202
+          ? await waitForJob(response.data.status_url, token)
+          : response.data;
+      idempotencyKey.current = null;
 
-      if (response.data.no_issues_found) {
+      if (result.no_issues_found) {
         Alert.alert("Notice", "No issues were detected in the uploaded image.");
         return;
       }
@@ -202,6 +228,9 @@ const IssueUploadScreen = ({ navigation }) => {
       navigation.goBack();
     } catch (error) {
       console.error("Upload error:", error);
+      if (isRejectedSubmission(error)) {
+        idempotencyKey.current = null;
+      }
       Alert.alert(
         "Upload Failed",
         error.response?.data?.detail ||
@@ -212,6 +241,23 @@ const IssueUploadScreen = ({ navigation }) => {
     }
   };
 
+  const waitForJob = async (statusUrl, token) => {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      const { data: job } = await api.get(statusUrl, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (job.status === "succeeded") return job.result;
+      if (job.status === "failed") {
+        // A retry must run a new job, not replay this one
+        idempotencyKey.current = null;
+        throw { response: { data: { detail: job.error || "Analysis failed" } } };
+      }
+    }
+    throw { response: { data: { detail: "Analysis is taking longer than expected. Please check back later." } } };
+  };
+
   return (
     <KeyboardAwareScrollView
       style={styles.container}
@@ -727,7 +727,7 @@ const MapScreen = ({ navigation }) => {
 
             {selectedIssue.photo_url && (
               <Image
-                source={{ uri: selectedIssue.photo_url }}
+                source={{ uri: selectedIssue.photo_variants?.thumb || selectedIssue.photo_url }}
                 style={styles.issueImage}
                 resizeMode="cover"
               />
@@ -1,3 +1,4 @@
+import "react-native-get-random-values";
 import axios from "axios";
 import { auth } from "./firebase";
 
@@ -14,4 +15,21 @@ api.interceptors.request.use(async (config) => {
   return config;
 });
 
+// Sent as Idempotency-Key on submissions. Keep one per submission and reuse it
+// when the user retries after a network error, so the backend replays the
+// first result instead of creating a duplicate. Start a new one when the form
+// changes or the submission was rejected (see isRejectedSubmission).
+export const newIdempotencyKey = () => {
+  const bytes = new Uint8Array(16);
+  crypto.getRandomValues(bytes);
+  return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+};
+
+// A 4xx rejects the request itself: resending it under the same key would only
+// replay the rejection. 409 (still in progress) and 429 are worth retrying as is.
+export const isRejectedSubmission = (error) => {
+  const status = error?.response?.status;
+  return status >= 400 && status < 500 && status !== 409 && status !== 429;
+};
+
 export default api;
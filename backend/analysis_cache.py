@@ -0,0 +1,71 @@
+"""
+Cache of analyzer results for identical resubmissions.
+
+Users often resend the same photo after a timeout. The result the analyzer
+returned for it (including the issue it created) is cached under the photo's
+SHA-256, the normalized description and labels, the reporter and the
+quantized location, so the resubmission is answered from memory: no Gemini
+call and no second issue document. The same photo sent by someone else, or
+from somewhere else, is a new report and misses.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Optional
+
+from cachetools import TTLCache
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "10000"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(24 * 3600)))
+# ~11 m: GPS jitter between a submission and its retry stays within one cell
+ANALYSIS_CACHE_COORD_DECIMALS = 4
+
+
+def normalize_description(description: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", (description or "").strip().lower())
+
+
+def analysis_cache_key(
+    image_sha256: str,
+    description: Optional[str],
+    labels: Iterable[str],
+    reporter_id: str,
+    latitude: float,
+    longitude: float,
+) -> str:
+    normalized_labels = sorted({label.strip().lower() for label in labels if label and label.strip()})
+    location = [round(latitude, ANALYSIS_CACHE_COORD_DECIMALS), round(longitude, ANALYSIS_CACHE_COORD_DECIMALS)]
+    material = json.dumps(
+        [image_sha256, normalize_description(description), normalized_labels, reporter_id, location]
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnalysisResultCache:
+    def __init__(self, maxsize: int = ANALYSIS_CACHE_SIZE, ttl: int = ANALYSIS_CACHE_TTL_SECONDS):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not key:
+            return None
+        result = self._cache.get(key)
+        self.metrics["hits" if result is not None else "misses"] += 1
+        return result
+
+    def put(self, key: Optional[str], result: Dict[str, Any]) -> None:
+        if not key:
+            return
+        self._cache[key] = result
+        self.metrics["stores"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+        }
@@ -0,0 +1,165 @@
+"""
+Backfill `display_address` on existing issues.
+
+Walks the `issues` index with a point-in-time + search_after over documents
+that have no `display_address`, resolves each location through the same
+ReverseGeocodeCache the gateway uses (gazetteer first, throttled Nominatim as
+fallback) and writes the results back with one `_bulk` request per page.
+
+Usage:
+    python backfill_display_address.py [--batch-size 200] [--max-docs-per-second 50] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from geopy.geocoders import Nominatim
+
+from gazetteer import load_gazetteer
+from geocoding import ReverseGeocodeCache, is_resolved_address
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("backfill_display_address")
+
+load_dotenv()
+ES_URL = os.getenv("ES_URL", "http://localhost:9200")
+ES_USER = os.getenv("ES_USER")
+ES_PASS = os.getenv("ES_PASS")
+ES_VERIFY_CERTS = os.getenv("ES_VERIFY_CERTS", "true").lower() in ("1", "true", "yes")
+ES_CA_CERT = os.getenv("ES_CA_CERT")
+ISSUES_INDEX = "issues"
+PIT_KEEP_ALIVE = "5m"
+
+
+def build_es_client() -> AsyncElasticsearch:
+    es_connection_kwargs: Dict[str, Any] = {}
+    if ES_USER and ES_PASS:
+        es_connection_kwargs["basic_auth"] = (ES_USER, ES_PASS)
+    if not ES_VERIFY_CERTS:
+        es_connection_kwargs["verify_certs"] = False
+    elif ES_CA_CERT:
+        es_connection_kwargs["ca_certs"] = ES_CA_CERT
+    return AsyncElasticsearch(hosts=[ES_URL], request_timeout=60, **es_connection_kwargs)
+
+
+async def backfill(
+    es: AsyncElasticsearch,
+    geocoder: ReverseGeocodeCache,
+    batch_size: int,
+    max_docs_per_second: float,
+    dry_run: bool,
+) -> Dict[str, int]:
+    totals = {"scanned": 0, "updated": 0, "unresolved": 0, "bulk_errors": 0}
+    pit = await es.open_point_in_time(index=ISSUES_INDEX, keep_alive=PIT_KEEP_ALIVE)
+    pit_id = pit["id"]
+    search_after: Optional[List[Any]] = None
+
+    try:
+        while True:
+            started = time.monotonic()
+            body: Dict[str, Any] = {
+                "size": batch_size,
+                "query": {"bool": {"must_not": [{"exists": {"field": "display_address"}}]}},
+                "_source": ["location"],
+                "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                "sort": [{"_shard_doc": "asc"}],
+            }
+            if search_after is not None:
+                body["search_after"] = search_after
+
+            resp = await es.search(body=body)
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp["hits"]["hits"]
+            if not hits:
+                break
+            search_after = hits[-1]["sort"]
+            totals["scanned"] += len(hits)
+
+            ids: List[str] = []
+            coords = []
+            for hit in hits:
+                location = hit["_source"].get("location") or {}
+                lat, lon = location.get("lat"), location.get("lon")
+                if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+                    ids.append(hit["_id"])
+                    coords.append((lat, lon))
+                else:
+                    totals["unresolved"] += 1
+
+            # Wait for every lookup in the page; the geocoder's own throttle paces Nominatim.
+            addresses = await geocoder.lookup_many(coords, wait_seconds=None)
+            actions = []
+            for doc_id, address in zip(ids, addresses):
+                if not is_resolved_address(address):
+                    totals["unresolved"] += 1
+                    continue
+                actions.append(
+                    {
+                        "_op_type": "update",
+                        "_index": ISSUES_INDEX,
+                        "_id": doc_id,
+                        "doc": {"display_address": address},
+                    }
+                )
+
+            if actions and not dry_run:
+                success, errors = await async_bulk(es, actions, raise_on_error=False)
+                totals["updated"] += success
+                totals["bulk_errors"] += len(errors) if isinstance(errors, list) else int(errors)
+            elif actions:
+                totals["updated"] += len(actions)
+
+            logger.info(
+                f"Page done: scanned={totals['scanned']} updated={totals['updated']} "
+                f"unresolved={totals['unresolved']} bulk_errors={totals['bulk_errors']}"
+            )
+
+            # Throttle writes so the backfill never competes with live traffic
+            if max_docs_per_second > 0:
+                min_duration = len(hits) / max_docs_per_second
+                elapsed = time.monotonic() - started
+                if elapsed < min_duration:
+                    await asyncio.sleep(min_duration - elapsed)
+    finally:
+        try:
+            await es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.warning(f"Failed to close point in time: {e}")
+
+    return totals
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill display_address on issues")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--max-docs-per-second", type=float, default=50.0)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    es = build_es_client()
+    geocoder = ReverseGeocodeCache(
+        Nominatim(user_agent="civicfix_backend_app_v6"), gazetteer=load_gazetteer()
+    )
+    geocoder.load()
+    try:
+        totals = await backfill(
+            es, geocoder, args.batch_size, args.max_docs_per_second, args.dry_run
+        )
+        logger.info(f"Backfill finished: {totals}")
+        logger.info(f"Geocoder stats: {geocoder.stats()}")
+    finally:
+        geocoder.save()
+        await es.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
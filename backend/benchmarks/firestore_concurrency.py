@@ -0,0 +1,131 @@
+"""
+Firestore concurrency benchmark: blocking client vs. FirestoreStore.
+
+Replays the Firestore work of GET /api/issues/with-user-status (one user
+profile read plus upvote/report status for a page of issues) as an open-loop
+load: requests arrive at a fixed rate, and latency is measured from each
+request's scheduled arrival to its completion. With the blocking client the
+event loop serialises every call, so queueing shows up in p99. With the async
+store the round trips overlap.
+
+Uses the same credentials as the gateway (FIREBASE_SERVICE_ACCOUNT_JSON or
+backend/serviceAccountKey.json), or the emulator when FIRESTORE_EMULATOR_HOST
+is set. Only reads are issued.
+
+Usage (from backend/):
+    python benchmarks/firestore_concurrency.py --uid <existing-user-uid> [--rate 100] [--requests 1000] [--page-size 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import firebase_admin
+from firebase_admin import credentials, firestore, firestore_async
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from firestore_store import FirestoreStore, interaction_doc_id  # noqa: E402
+
+
+def init_firebase() -> None:
+    if firebase_admin._apps:
+        return
+    creds_json = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON")
+    if creds_json:
+        firebase_admin.initialize_app(credentials.Certificate(json.loads(creds_json)))
+    elif os.getenv("FIRESTORE_EMULATOR_HOST"):
+        firebase_admin.initialize_app(options={"projectId": os.getenv("GCLOUD_PROJECT", "civicfix-bench")})
+    else:
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "serviceAccountKey.json")
+        firebase_admin.initialize_app(credentials.Certificate(path))
+
+
+def blocking_handler(uid: str, issue_ids: List[str]) -> Callable[[], Awaitable[None]]:
+    """The pre-async pattern: sync Firestore calls made directly inside a coroutine."""
+    client = firestore.client()
+
+    async def handler() -> None:
+        client.collection("users").document(uid).get()
+        for collection in ("upvotes", "reports"):
+            refs = [client.collection(collection).document(interaction_doc_id(i, uid)) for i in issue_ids]
+            list(client.get_all(refs))
+
+    return handler
+
+
+def async_handler(uid: str, issue_ids: List[str]) -> Callable[[], Awaitable[None]]:
+    store = FirestoreStore(firestore_async.client())
+
+    async def handler() -> None:
+        await asyncio.gather(store.get_user(uid), store.get_interaction_status(uid, issue_ids))
+
+    return handler
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_load(handler: Callable[[], Awaitable[None]], rate: float, total: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        scheduled = started + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await handler()
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - scheduled)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return {"completed": 0, "errors": errors}
+    return {
+        "completed": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Blocking vs async Firestore latency under load")
+    parser.add_argument("--uid", required=True, help="uid of an existing user document")
+    parser.add_argument("--rate", type=float, default=100.0, help="request arrivals per second")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=20, help="issues per simulated feed page")
+    parser.add_argument("--mode", choices=["both", "blocking", "async"], default="both")
+    args = parser.parse_args()
+
+    init_firebase()
+    issue_ids = [f"bench-issue-{i}" for i in range(args.page_size)]
+    modes = ["blocking", "async"] if args.mode == "both" else [args.mode]
+    factories = {"blocking": blocking_handler, "async": async_handler}
+
+    for mode in modes:
+        handler = factories[mode](args.uid, issue_ids)
+        await handler()  # warm up the channel before measuring
+        result = await run_load(handler, args.rate, args.requests)
+        print(f"{mode:>8}: {result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
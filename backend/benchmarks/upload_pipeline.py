@@ -0,0 +1,85 @@
+"""
+Upload pipeline benchmark: serial uploads vs. UploadPipeline, fully offline.
+
+Writes N synthetic photos through LocalFSBackend into a temp directory. An
+optional per-upload latency emulates the GCS round trip, since the local
+disk alone is far faster than the network. The serial mode mirrors the old
+handlers (one blocking upload after another on the event loop).
+
+Usage (from backend/):
+    python benchmarks/upload_pipeline.py [--files 5] [--size-kb 2048] [--latency-ms 150] [--concurrency 8] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from uploads import LocalFSBackend, UploadItem, UploadPipeline  # noqa: E402
+
+
+class LatencyBackend(LocalFSBackend):
+    """LocalFSBackend plus a fixed blocking delay per object, like a remote store."""
+
+    def __init__(self, root: str, latency_seconds: float):
+        super().__init__(root=root, base_url="file://" + root)
+        self.latency_seconds = latency_seconds
+
+    def put(self, object_name: str, source, size: int, content_type: Optional[str]) -> str:
+        time.sleep(self.latency_seconds)
+        return super().put(object_name, source, size, content_type)
+
+
+def make_items(round_no: int, files: int, payload: bytes) -> List[UploadItem]:
+    return [
+        UploadItem(object_name=f"bench/{round_no}/{i}.jpg", source=payload, content_type="image/jpeg", filename=f"{i}.jpg")
+        for i in range(files)
+    ]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Serial vs concurrent upload latency")
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--size-kb", type=int, default=2048)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_kb * 1024)
+    with tempfile.TemporaryDirectory(prefix="civicfix-upload-bench-") as root:
+        backend = LatencyBackend(root, args.latency_ms / 1000.0)
+        pipeline = UploadPipeline(backend, concurrency=args.concurrency)
+
+        serial, concurrent = [], []
+        for round_no in range(args.rounds):
+            items = make_items(round_no, args.files, payload)
+            started = time.perf_counter()
+            for item in items:
+                backend.put(item.object_name, item.source, item.size, item.content_type)
+            serial.append(time.perf_counter() - started)
+
+            items = make_items(args.rounds + round_no, args.files, payload)
+            started = time.perf_counter()
+            results = await pipeline.upload_many(items)
+            concurrent.append(time.perf_counter() - started)
+            assert [r.index for r in results] == list(range(args.files))
+            assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+
+        pipeline.close()
+
+    for name, samples in (("serial", serial), ("pipeline", concurrent)):
+        print(
+            f"{name:>8}: median {statistics.median(samples) * 1000:.1f} ms, "
+            f"max {max(samples) * 1000:.1f} ms over {args.rounds} rounds of {args.files} x {args.size_kb} KB"
+        )
+    print(f"pipeline stats: {pipeline.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
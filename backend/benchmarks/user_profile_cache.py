@@ -0,0 +1,88 @@
+"""
+User profile cache check: read latency with and without the cache, and
+invalidation by our own writes and by the snapshot listener.
+
+Meant for the Firestore emulator, since it writes a throwaway user document:
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/user_profile_cache.py
+
+Also runs against real credentials (see firestore_concurrency.py) if --uid
+names a document that may be modified.
+
+Usage (from backend/):
+    python benchmarks/user_profile_cache.py [--uid bench-user] [--reads 500]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from firebase_admin import firestore, firestore_async
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from firestore_concurrency import init_firebase  # noqa: E402
+from firestore_store import FirestoreStore  # noqa: E402
+from user_profiles import UserProfileCache  # noqa: E402
+
+
+async def time_reads(store: FirestoreStore, uid: str, reads: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    for _ in range(reads):
+        started = time.perf_counter()
+        await store.get_user(uid)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+async def wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="User profile cache latency and invalidation check")
+    parser.add_argument("--uid", default="bench-user", help="user document to create/modify")
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    init_firebase()
+    client = firestore_async.client()
+    cache = UserProfileCache()
+    uncached = FirestoreStore(client)
+    cached = FirestoreStore(client, user_cache=cache)
+
+    await cached.set_user(args.uid, {"name": "Bench", "karma": 0}, merge=False)
+    print(f"uncached: {await time_reads(uncached, args.uid, args.reads)}")
+    print(f"  cached: {await time_reads(cached, args.uid, args.reads)}")
+
+    # Own write: the next read must see it
+    await cached.update_user(args.uid, {"karma": 1})
+    own_write_seen = (await cached.get_user(args.uid))["karma"] == 1
+    print(f"own write visible after update_user: {own_write_seen}")
+
+    # Someone else's write: only the listener can invalidate before the TTL
+    cache.start_listener(firestore.client())
+    await asyncio.sleep(1.0)  # let the initial snapshot arrive
+    await cached.get_user(args.uid)
+    await uncached.update_user(args.uid, {"karma": 2})
+    invalidated = await wait_for(lambda: cache.metrics["listener_invalidations"] > 0)
+    external_write_seen = (await cached.get_user(args.uid))["karma"] == 2
+    cache.stop_listener()
+    print(f"external write invalidated by listener: {invalidated}, visible: {external_write_seen}")
+    print(f"stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
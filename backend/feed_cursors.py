@@ -0,0 +1,66 @@
+"""
+Opaque cursor tokens for the nearby-issue feeds (/issues/ and
+/api/issues/with-user-status).
+
+A page is fetched with `search_after` on the previous page's last sort
+values, so every page costs the same as the first. `from`/`skip` paging
+makes ES collect and discard more hits the deeper the user scrolls. A cursor
+also freezes the feed's time window and, optionally, a point-in-time (PIT)
+snapshot, so issues created while the user scrolls do not shift later pages.
+
+Tokens are urlsafe base64 JSON. They carry a fingerprint of the query
+parameters, so a cursor cannot be replayed against a different location or
+radius.
+"""
+
+import base64
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+FEED_PIT_KEEP_ALIVE = os.getenv("FEED_PIT_KEEP_ALIVE", "2m")
+CURSOR_VERSION = 1
+
+
+class FeedCursorError(ValueError):
+    """The cursor is malformed or belongs to a different query (400)."""
+
+
+@dataclass
+class FeedCursor:
+    search_after: List[Any]
+    since: str  # created_at lower bound fixed by the first page
+    pit_id: Optional[str] = None
+
+
+def query_fingerprint(*params: Any) -> str:
+    return hashlib.sha256(json.dumps(params, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(cursor: FeedCursor, fingerprint: str) -> str:
+    payload = {
+        "v": CURSOR_VERSION,
+        "q": fingerprint,
+        "after": cursor.search_after,
+        "since": cursor.since,
+        "pit": cursor.pit_id,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, fingerprint: str) -> FeedCursor:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if payload["v"] != CURSOR_VERSION or not isinstance(payload["after"], list):
+            raise ValueError("unsupported cursor")
+        cursor = FeedCursor(search_after=payload["after"], since=str(payload["since"]), pit_id=payload.get("pit"))
+        matches = payload["q"] == fingerprint
+    except (ValueError, KeyError, TypeError) as e:
+        raise FeedCursorError(f"Invalid cursor: {e}")
+    if not matches:
+        raise FeedCursorError("Cursor does not belong to this query")
+    return cursor
@@ -0,0 +1,250 @@
+"""
+Async Firestore data access for the gateway (users, upvotes, reports, jobs,
+idempotency keys).
+
+Every endpoint goes through FirestoreStore so no handler issues blocking
+Firestore RPCs on the event loop; concurrent requests overlap their
+Firestore round trips instead of queueing behind each other.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.cloud.firestore import AsyncClient, FieldFilter, Increment, async_transactional
+
+from user_profiles import UserProfileCache
+
+logger = logging.getLogger(__name__)
+
+USERS_COLLECTION = "users"
+UPVOTES_COLLECTION = "upvotes"
+REPORTS_COLLECTION = "reports"
+JOBS_COLLECTION = "jobs"
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+
+
+def interaction_doc_id(issue_id: str, user_uid: str) -> str:
+    """Document id shared by the upvotes and reports collections."""
+    return f"{issue_id}__{user_uid}"
+
+
+class FirestoreStore:
+    def __init__(self, client: AsyncClient, user_cache: Optional[UserProfileCache] = None):
+        self.client = client
+        self.user_cache = user_cache
+
+    # --- Users ---
+    def _user_ref(self, uid: str):
+        return self.client.collection(USERS_COLLECTION).document(uid)
+
+    async def get_user(self, uid: str, cached: bool = True) -> Optional[Dict[str, Any]]:
+        """The user's document, from the profile cache when allowed and present."""
+        if self.user_cache is None:
+            snapshot = await self._user_ref(uid).get()
+            return snapshot.to_dict() if snapshot.exists else None
+        if cached:
+            hit, data = self.user_cache.get(uid)
+            if hit:
+                return data
+        generation = self.user_cache.generation(uid)
+        snapshot = await self._user_ref(uid).get()
+        if not snapshot.exists:
+            # Not cached: clients create their own user documents, which we would not see
+            return None
+        data = snapshot.to_dict()
+        self.user_cache.put(uid, data, generation)
+        return data
+
+    async def update_user(self, uid: str, fields: Dict[str, Any]) -> None:
+        try:
+            await self._user_ref(uid).update(fields)
+        finally:
+            # Invalidate even on failure: the write may have been applied
+            if self.user_cache is not None:
+                self.user_cache.invalidate(uid)
+
+    async def set_user(self, uid: str, data: Dict[str, Any], merge: bool = True) -> None:
+        try:
+            await self._user_ref(uid).set(data, merge=merge)
+        finally:
+            if self.user_cache is not None:
+                self.user_cache.invalidate(uid)
+
+    async def record_issue_reported(self, uid: str, new_user: Dict[str, Any], first_post_karma: int) -> str:
+        """
+        Count a submission on the user's document in a transaction: +first_post_karma
+        and `has_posted_before` the first time, `stats.issues_reported` +1 always.
+        A missing document is created from `new_user`. Returns "first_post",
+        "repeat" or "created".
+        """
+        ref = self._user_ref(uid)
+
+        @async_transactional
+        async def _record(transaction) -> str:
+            snapshot = await ref.get(transaction=transaction)
+            if not snapshot.exists:
+                transaction.set(ref, new_user)
+                return "created"
+            if (snapshot.to_dict() or {}).get("has_posted_before", False):
+                transaction.update(ref, {"stats.issues_reported": Increment(1)})
+                return "repeat"
+            transaction.update(
+                ref,
+                {
+                    "karma": Increment(first_post_karma),
+                    "has_posted_before": True,
+                    "stats.issues_reported": Increment(1),
+                },
+            )
+            return "first_post"
+
+        try:
+            return await _record(self.client.transaction())
+        finally:
+            if self.user_cache is not None:
+                self.user_cache.invalidate(uid)
+
+    async def count_users_with_more_karma(self, user_type: str, karma: float) -> int:
+        """Server-side count aggregation; no user documents are transferred."""
+        query = (
+            self.client.collection(USERS_COLLECTION)
+            .where(filter=FieldFilter("userType", "==", user_type))
+            .where(filter=FieldFilter("karma", ">", karma))
+        )
+        results = await query.count(alias="higher").get()
+        return int(results[0][0].value) if results and results[0] else 0
+
+    async def top_users_by_karma(self, user_type: str, limit: int = 10) -> List[Dict[str, Any]]:
+        query = (
+            self.client.collection(USERS_COLLECTION)
+            .where(filter=FieldFilter("userType", "==", user_type))
+            .order_by("karma", direction="DESCENDING")
+            .limit(limit)
+        )
+        return [doc.to_dict() async for doc in query.stream()]
+
+    # --- Upvotes ---
+    def _upvote_ref(self, issue_id: str, uid: str):
+        return self.client.collection(UPVOTES_COLLECTION).document(interaction_doc_id(issue_id, uid))
+
+    async def get_upvote(self, issue_id: str, uid: str) -> Optional[Dict[str, Any]]:
+        snapshot = await self._upvote_ref(issue_id, uid).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def toggle_upvote(self, issue_id: str, uid: str, now: str) -> Tuple[bool, bool]:
+        """
+        Flip the user's upvote in a transaction.
+
+        Returns (is_active, created): created is True only when this is the
+        user's first ever upvote on the issue.
+        """
+        ref = self._upvote_ref(issue_id, uid)
+
+        @async_transactional
+        async def _toggle(transaction) -> Tuple[bool, bool]:
+            snapshot = await ref.get(transaction=transaction)
+            if snapshot.exists:
+                is_active = not (snapshot.to_dict() or {}).get("isActive", False)
+                transaction.update(ref, {"isActive": is_active, "lastUpdated": now})
+                return is_active, False
+            transaction.set(
+                ref,
+                {
+                    "issueId": issue_id,
+                    "userId": uid,
+                    "isActive": True,
+                    "upvotedAt": now,
+                    "lastUpdated": now,
+                },
+            )
+            return True, True
+
+        return await _toggle(self.client.transaction())
+
+    # --- Reports ---
+    def _report_ref(self, issue_id: str, uid: str):
+        return self.client.collection(REPORTS_COLLECTION).document(interaction_doc_id(issue_id, uid))
+
+    async def get_report(self, issue_id: str, uid: str) -> Optional[Dict[str, Any]]:
+        snapshot = await self._report_ref(issue_id, uid).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def create_report(self, issue_id: str, uid: str, now: str) -> None:
+        # Reports are permanent, so isActive is always True
+        await self._report_ref(issue_id, uid).set(
+            {
+                "issueId": issue_id,
+                "userId": uid,
+                "isActive": True,
+                "reportedAt": now,
+                "lastUpdated": now,
+            }
+        )
+
+    # --- Batch status ---
+    async def _active_flags(self, collection: str, uid: str, issue_ids: List[str]) -> Dict[str, bool]:
+        doc_to_issue = {interaction_doc_id(issue_id, uid): issue_id for issue_id in issue_ids}
+        refs = [self.client.collection(collection).document(doc_id) for doc_id in doc_to_issue]
+        flags = {issue_id: False for issue_id in issue_ids}
+        # get_all does not preserve request order, so map results back by document id
+        async for snapshot in self.client.get_all(refs):
+            if snapshot.exists and snapshot.id in doc_to_issue:
+                flags[doc_to_issue[snapshot.id]] = bool((snapshot.to_dict() or {}).get("isActive", False))
+        return flags
+
+    async def get_interaction_status(
+        self, uid: str, issue_ids: Iterable[str]
+    ) -> Tuple[Dict[str, bool], Dict[str, bool]]:
+        """Return (upvote_status, report_status) maps of issue_id -> isActive."""
+        issue_ids = list(dict.fromkeys(issue_ids))
+        if not issue_ids:
+            return {}, {}
+        upvotes, reports = await asyncio.gather(
+            self._active_flags(UPVOTES_COLLECTION, uid, issue_ids),
+            self._active_flags(REPORTS_COLLECTION, uid, issue_ids),
+        )
+        return upvotes, reports
+
+    # --- Jobs ---
+    async def save_job(self, job: Dict[str, Any]) -> None:
+        """Mirror a job's public state so any gateway instance can answer polls."""
+        await self.client.collection(JOBS_COLLECTION).document(job["id"]).set(job)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = await self.client.collection(JOBS_COLLECTION).document(job_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    # --- Idempotency keys (see idempotency.py) ---
+    # `expires_at` is a timestamp so a Firestore TTL policy can purge old keys.
+    def _idempotency_ref(self, key_id: str):
+        return self.client.collection(IDEMPOTENCY_COLLECTION).document(key_id)
+
+    async def claim_idempotency_key(self, key_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Claim the key in a transaction. Returns None if this caller now holds it,
+        otherwise the live record: completed (with "response") or still running.
+        Expired records and lapsed claims are taken over.
+        """
+        ref = self._idempotency_ref(key_id)
+
+        @async_transactional
+        async def _claim(transaction) -> Optional[Dict[str, Any]]:
+            now = datetime.now(timezone.utc)
+            snapshot = await ref.get(transaction=transaction)
+            if snapshot.exists:
+                record = snapshot.to_dict() or {}
+                if record.get("expires_at") and record["expires_at"] > now:
+                    return record
+            transaction.set(ref, {"response": None, "expires_at": now + timedelta(seconds=lease_seconds)})
+            return None
+
+        return await _claim(self.client.transaction())
+
+    async def complete_idempotency_key(self, key_id: str, response: Dict[str, Any], ttl_seconds: int) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        await self._idempotency_ref(key_id).set({"response": response, "expires_at": expires_at})
+
+    async def release_idempotency_key(self, key_id: str) -> None:
+        await self._idempotency_ref(key_id).delete()
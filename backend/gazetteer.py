@@ -0,0 +1,120 @@
+"""
+Offline reverse geocoder backed by a local gazetteer file.
+
+The gazetteer is a CSV of named points (streets and localities) that is loaded
+once into geohash-bucketed indexes. A lookup only scans the query cell and its
+8 neighbours, so answering lat/lon -> "street, locality, city" costs a few
+microseconds and never leaves the process. Nominatim is only used by the
+caller when the gazetteer has nothing close enough.
+
+CSV columns: kind,name,locality,city,lat,lon  (kind is "street" or "locality")
+"""
+
+import csv
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from geoutils import geohash_encode, geohash_neighbors, haversine_km
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_FILE = os.getenv(
+    "GAZETTEER_FILE",
+    os.path.join(os.path.dirname(__file__), "data", "pune_gazetteer.csv"),
+)
+# A street name is only used when the point is this close to a known street.
+GAZETTEER_STREET_MAX_KM = float(os.getenv("GAZETTEER_STREET_MAX_KM", "0.5"))
+GAZETTEER_LOCALITY_MAX_KM = float(os.getenv("GAZETTEER_LOCALITY_MAX_KM", "3.0"))
+
+# Bucket sizes are chosen so a search radius never exceeds one cell:
+# precision 6 cells are ~1.2 x 0.6 km, precision 5 cells are ~4.9 x 4.9 km.
+STREET_GEOHASH_PRECISION = 6
+LOCALITY_GEOHASH_PRECISION = 5
+
+# (name, locality, city, lat, lon)
+GazetteerEntry = Tuple[str, str, str, float, float]
+
+
+class Gazetteer:
+    """Geohash-bucketed nearest-neighbour index over street and locality points."""
+
+    def __init__(
+        self,
+        street_max_km: float = GAZETTEER_STREET_MAX_KM,
+        locality_max_km: float = GAZETTEER_LOCALITY_MAX_KM,
+    ):
+        self.street_max_km = street_max_km
+        self.locality_max_km = locality_max_km
+        self._streets: Dict[str, List[GazetteerEntry]] = {}
+        self._localities: Dict[str, List[GazetteerEntry]] = {}
+        self.size = 0
+
+    def add(self, kind: str, name: str, locality: str, city: str, lat: float, lon: float) -> None:
+        entry = (name, locality or name, city, lat, lon)
+        if kind == "street":
+            self._streets.setdefault(geohash_encode(lat, lon, STREET_GEOHASH_PRECISION), []).append(entry)
+        elif kind == "locality":
+            self._localities.setdefault(geohash_encode(lat, lon, LOCALITY_GEOHASH_PRECISION), []).append(entry)
+        else:
+            raise ValueError(f"Unknown gazetteer kind: {kind}")
+        self.size += 1
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs) -> "Gazetteer":
+        gazetteer = cls(**kwargs)
+        with open(path, "r", encoding="utf-8", newline="") as fh:
+            for row in csv.DictReader(fh):
+                try:
+                    gazetteer.add(
+                        row["kind"].strip(),
+                        row["name"].strip(),
+                        (row.get("locality") or "").strip(),
+                        (row.get("city") or "").strip(),
+                        float(row["lat"]),
+                        float(row["lon"]),
+                    )
+                except (KeyError, ValueError) as e:
+                    logger.warning(f"Skipping bad gazetteer row {row}: {e}")
+        logger.info(f"Loaded {gazetteer.size} gazetteer entries from {path}")
+        return gazetteer
+
+    @staticmethod
+    def _nearest(
+        index: Dict[str, List[GazetteerEntry]], lat: float, lon: float, precision: int, max_km: float
+    ) -> Optional[GazetteerEntry]:
+        best: Optional[GazetteerEntry] = None
+        best_km = max_km
+        for cell in geohash_neighbors(lat, lon, precision):
+            for entry in index.get(cell, ()):
+                dist = haversine_km(lat, lon, entry[3], entry[4])
+                if dist <= best_km:
+                    best, best_km = entry, dist
+        return best
+
+    def reverse(self, lat: float, lon: float) -> Optional[str]:
+        """Return "street, locality, city" (or "locality, city"), or None if nothing is near."""
+        street = self._nearest(self._streets, lat, lon, STREET_GEOHASH_PRECISION, self.street_max_km)
+        if street:
+            name, locality, city, _, _ = street
+            return ", ".join(p for p in (name, locality, city) if p)
+
+        locality = self._nearest(
+            self._localities, lat, lon, LOCALITY_GEOHASH_PRECISION, self.locality_max_km
+        )
+        if locality:
+            name, _, city, _, _ = locality
+            return ", ".join(p for p in (name, city) if p)
+        return None
+
+
+def load_gazetteer(path: Optional[str] = GAZETTEER_FILE) -> Optional[Gazetteer]:
+    """Load the configured gazetteer, or return None if it is missing/unreadable."""
+    if not path or not os.path.exists(path):
+        logger.warning(f"Gazetteer file not found at {path}; offline reverse geocoding disabled.")
+        return None
+    try:
+        return Gazetteer.from_csv(path)
+    except Exception as e:
+        logger.error(f"Failed to load gazetteer from {path}: {e}")
+        return None
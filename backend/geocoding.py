@@ -0,0 +1,607 @@
+"""
+Geocoding caches used by the gateway (reverse for the feed, forward for submissions).
+
+Nominatim is slow (hundreds of ms per call) and rate-limited to ~1 req/s, so
+lookups are answered from the offline gazetteer when possible; otherwise they
+are run off the event loop, throttled, de-duplicated while in flight and
+cached on spatially quantized keys. The cache is bounded (LRU + TTL) and
+is persisted to disk so a restarted pod serves addresses warm.
+
+Forward lookups are cached on a normalized form of the address text, with
+short-lived negative entries for strings Nominatim cannot resolve. The
+fallback variants of an address are raced rather than tried serially.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from cachetools import LRUCache
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# 4 decimals ~= 11 m, close enough that neighbouring reports share a street name.
+REVERSE_GEOCODE_PRECISION = int(os.getenv("REVERSE_GEOCODE_PRECISION", "4"))
+REVERSE_GEOCODE_CACHE_SIZE = int(os.getenv("REVERSE_GEOCODE_CACHE_SIZE", "50000"))
+REVERSE_GEOCODE_TTL_SECONDS = int(
+    os.getenv("REVERSE_GEOCODE_TTL_SECONDS", str(30 * 24 * 3600))
+)
+REVERSE_GEOCODE_FAILURE_TTL_SECONDS = int(
+    os.getenv("REVERSE_GEOCODE_FAILURE_TTL_SECONDS", "600")
+)
+REVERSE_GEOCODE_CACHE_FILE = os.getenv(
+    "REVERSE_GEOCODE_CACHE_FILE", "reverse_geocode_cache.json"
+)
+REVERSE_GEOCODE_PERSIST_INTERVAL_SECONDS = int(
+    os.getenv("REVERSE_GEOCODE_PERSIST_INTERVAL_SECONDS", "300")
+)
+# How long a feed request waits for cold lookups before returning a placeholder.
+REVERSE_GEOCODE_WAIT_SECONDS = float(os.getenv("REVERSE_GEOCODE_WAIT_SECONDS", "2.0"))
+# Upper bound on how long a submission waits to resolve its address at ingest.
+REVERSE_GEOCODE_INGEST_TIMEOUT_SECONDS = float(
+    os.getenv("REVERSE_GEOCODE_INGEST_TIMEOUT_SECONDS", "3.0")
+)
+FORWARD_GEOCODE_CACHE_SIZE = int(os.getenv("FORWARD_GEOCODE_CACHE_SIZE", "20000"))
+FORWARD_GEOCODE_TTL_SECONDS = int(
+    os.getenv("FORWARD_GEOCODE_TTL_SECONDS", str(7 * 24 * 3600))
+)
+FORWARD_GEOCODE_NEGATIVE_TTL_SECONDS = int(
+    os.getenv("FORWARD_GEOCODE_NEGATIVE_TTL_SECONDS", "3600")
+)
+FORWARD_GEOCODE_ATTEMPT_TIMEOUT_SECONDS = float(
+    os.getenv("FORWARD_GEOCODE_ATTEMPT_TIMEOUT_SECONDS", "4.0")
+)
+# Overall budget for one forward lookup across all raced variants.
+FORWARD_GEOCODE_TIMEOUT_SECONDS = float(os.getenv("FORWARD_GEOCODE_TIMEOUT_SECONDS", "8.0"))
+NOMINATIM_MIN_INTERVAL_SECONDS = float(
+    os.getenv("NOMINATIM_MIN_INTERVAL_SECONDS", "1.0")
+)
+
+ADDRESS_PENDING = "Address lookup pending"
+ADDRESS_NOT_FOUND = "Address not found"
+ADDRESS_LOOKUP_ERROR = "Address lookup timeout/error"
+
+
+class NominatimThrottle:
+    """
+    Async rate limiter that spaces out request starts to respect the public
+    Nominatim usage policy (1 request per second per application).
+    """
+
+    def __init__(self, min_interval: float = NOMINATIM_MIN_INTERVAL_SECONDS):
+        self.min_interval = min_interval
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+                now = time.monotonic()
+            self._next_slot = now + self.min_interval
+
+
+def is_resolved_address(value: Optional[str]) -> bool:
+    """True if `value` is a real address rather than a failure/placeholder message."""
+    return bool(value) and value not in (ADDRESS_NOT_FOUND, ADDRESS_LOOKUP_ERROR, ADDRESS_PENDING)
+
+
+def format_display_address(address: str) -> str:
+    """Shorten a Nominatim address to 'street, locality, city'."""
+    address_parts = address.split(",")
+    if len(address_parts) >= 3:
+        return f"{address_parts[0].strip()}, {address_parts[1].strip()}, {address_parts[-2].strip()}"
+    return address
+
+
+class ReverseGeocodeCache:
+    """
+    Bounded, persistent reverse-geocoding cache in front of a geopy geocoder.
+
+    Keys are coordinates rounded to `precision` decimals. Values are stored
+    with an absolute expiry so entries survive a save/load round trip with
+    their remaining TTL intact.
+    """
+
+    def __init__(
+        self,
+        geolocator: Any,
+        throttle: Optional[NominatimThrottle] = None,
+        precision: int = REVERSE_GEOCODE_PRECISION,
+        maxsize: int = REVERSE_GEOCODE_CACHE_SIZE,
+        ttl: int = REVERSE_GEOCODE_TTL_SECONDS,
+        failure_ttl: int = REVERSE_GEOCODE_FAILURE_TTL_SECONDS,
+        cache_file: Optional[str] = REVERSE_GEOCODE_CACHE_FILE,
+        gazetteer: Optional[Any] = None,
+    ):
+        self.geolocator = geolocator
+        self.gazetteer = gazetteer
+        self.throttle = throttle or NominatimThrottle()
+        self.precision = precision
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.cache_file = cache_file
+        # key -> (display_address, expires_at_epoch)
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        # Failed lookups are remembered briefly so a dead cell is not retried per request.
+        self._failures: LRUCache = LRUCache(maxsize=max(1000, maxsize // 10))
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._persist_task: Optional[asyncio.Task] = None
+        self._dirty = False
+        self.metrics: Dict[str, float] = {
+            "hits": 0,
+            "offline_hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "inflight_joins": 0,
+            "lookups": 0,
+            "lookup_failures": 0,
+            "lookup_seconds_total": 0.0,
+            "evictions_expired": 0,
+        }
+
+    # --- Keys and raw cache access ---
+    def make_key(self, lat: float, lon: float) -> str:
+        return f"{round(lat, self.precision):.{self.precision}f},{round(lon, self.precision):.{self.precision}f}"
+
+    def get_cached(self, lat: float, lon: float) -> Optional[str]:
+        """Return a cached address without ever calling the geocoder."""
+        key = self.make_key(lat, lon)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        address, expires_at = entry
+        if expires_at < time.time():
+            self._cache.pop(key, None)
+            self.metrics["evictions_expired"] += 1
+            return None
+        return address
+
+    def put(self, lat: float, lon: float, address: str) -> None:
+        self._cache[self.make_key(lat, lon)] = (address, time.time() + self.ttl)
+        self._dirty = True
+
+    def get_offline(self, lat: float, lon: float) -> Optional[str]:
+        """Answer from the local gazetteer, if one is loaded and has a nearby entry."""
+        if self.gazetteer is None:
+            return None
+        address = self.gazetteer.reverse(lat, lon)
+        if address is not None:
+            self.metrics["offline_hits"] += 1
+        return address
+
+    def _failure_cached(self, key: str) -> Optional[str]:
+        entry = self._failures.get(key)
+        if entry is None:
+            return None
+        message, expires_at = entry
+        if expires_at < time.time():
+            self._failures.pop(key, None)
+            return None
+        return message
+
+    # --- Lookups ---
+    def _reverse_blocking(self, lat: float, lon: float) -> Tuple[Optional[str], str]:
+        """Run one Nominatim reverse call. Returns (address, failure_message)."""
+        try:
+            geo_result = self.geolocator.reverse(
+                f"{lat}, {lon}", exactly_one=True, timeout=5, language="en"
+            )
+            if geo_result and geo_result.address:
+                return format_display_address(geo_result.address), ""
+            logger.warning(f"RevGeocode ({lat},{lon}) no result.")
+            return None, ADDRESS_NOT_FOUND
+        except (GeocoderTimedOut, GeocoderServiceError) as geo_e:
+            logger.warning(f"RevGeocode failed for ({lat},{lon}): {geo_e}")
+            return None, ADDRESS_LOOKUP_ERROR
+        except Exception:
+            logger.exception(f"Unexpected error during reverse geocoding for ({lat},{lon})")
+            return None, ADDRESS_LOOKUP_ERROR
+
+    async def _resolve(self, key: str, lat: float, lon: float) -> str:
+        await self.throttle.wait()
+        started = time.perf_counter()
+        address, failure = await asyncio.to_thread(self._reverse_blocking, lat, lon)
+        self.metrics["lookups"] += 1
+        self.metrics["lookup_seconds_total"] += time.perf_counter() - started
+        if address:
+            self.put(lat, lon, address)
+            return address
+        self.metrics["lookup_failures"] += 1
+        self._failures[key] = (failure, time.time() + self.failure_ttl)
+        return failure
+
+    def _lookup_future(self, lat: float, lon: float) -> "asyncio.Future[str]":
+        """Return a future for the address, sharing any lookup already in flight."""
+        key = self.make_key(lat, lon)
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self.metrics["inflight_joins"] += 1
+            return existing
+
+        task = asyncio.ensure_future(self._resolve(key, lat, lon))
+        self._inflight[key] = task
+        self._background.add(task)
+
+        def _done(t: asyncio.Task) -> None:
+            self._inflight.pop(key, None)
+            self._background.discard(t)
+
+        task.add_done_callback(_done)
+        return task
+
+    async def lookup(self, lat: float, lon: float) -> str:
+        """Resolve a single coordinate, waiting for the geocoder on a miss."""
+        cached = self.get_cached(lat, lon)
+        if cached is not None:
+            self.metrics["hits"] += 1
+            return cached
+        offline = self.get_offline(lat, lon)
+        if offline is not None:
+            return offline
+        failure = self._failure_cached(self.make_key(lat, lon))
+        if failure is not None:
+            self.metrics["negative_hits"] += 1
+            return failure
+        self.metrics["misses"] += 1
+        return await asyncio.shield(self._lookup_future(lat, lon))
+
+    def lookup_local(self, lat: float, lon: float) -> Optional[str]:
+        """Resolve from the cache or gazetteer only; never touches the network."""
+        cached = self.get_cached(lat, lon)
+        if cached is not None:
+            self.metrics["hits"] += 1
+            return cached
+        return self.get_offline(lat, lon)
+
+    async def resolve(self, lat: float, lon: float, timeout: float) -> Optional[str]:
+        """
+        Resolve an address for storage on a document. Returns None on failure or
+        timeout rather than a placeholder message, so callers never persist one.
+        """
+        try:
+            address = await asyncio.wait_for(self.lookup(lat, lon), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        return address if is_resolved_address(address) else None
+
+    async def lookup_many(
+        self,
+        coords: Iterable[Tuple[float, float]],
+        wait_seconds: Optional[float] = REVERSE_GEOCODE_WAIT_SECONDS,
+    ) -> List[str]:
+        """
+        Resolve many coordinates for a single response.
+
+        Cache and gazetteer hits are returned immediately. Misses are scheduled in the
+        background and awaited for at most `wait_seconds` (None waits for all);
+        anything still unresolved comes back as ADDRESS_PENDING and will be
+        warm next time.
+        """
+        coords = list(coords)
+        results: List[Optional[str]] = [None] * len(coords)
+        pending: Dict[int, asyncio.Future] = {}
+
+        for i, (lat, lon) in enumerate(coords):
+            cached = self.get_cached(lat, lon)
+            if cached is not None:
+                self.metrics["hits"] += 1
+                results[i] = cached
+                continue
+            offline = self.get_offline(lat, lon)
+            if offline is not None:
+                results[i] = offline
+                continue
+            failure = self._failure_cached(self.make_key(lat, lon))
+            if failure is not None:
+                self.metrics["negative_hits"] += 1
+                results[i] = failure
+                continue
+            self.metrics["misses"] += 1
+            pending[i] = self._lookup_future(lat, lon)
+
+        if pending:
+            await asyncio.wait(set(pending.values()), timeout=wait_seconds)
+            for i, fut in pending.items():
+                if fut.done() and not fut.cancelled() and fut.exception() is None:
+                    results[i] = fut.result()
+                else:
+                    results[i] = ADDRESS_PENDING
+
+        return [r if r is not None else ADDRESS_PENDING for r in results]
+
+    # --- Persistence ---
+    def load(self) -> int:
+        """Load unexpired entries from `cache_file`. Returns the number loaded."""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return 0
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except Exception as e:
+            logger.warning(f"Could not read reverse geocode cache {self.cache_file}: {e}")
+            return 0
+
+        if data.get("precision") != self.precision:
+            logger.info("Reverse geocode cache precision changed; discarding persisted entries.")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for key, (address, expires_at) in data.get("entries", {}).items():
+            if expires_at > now:
+                self._cache[key] = (address, expires_at)
+                loaded += 1
+        logger.info(f"Loaded {loaded} reverse geocode entries from {self.cache_file}")
+        return loaded
+
+    def save(self) -> int:
+        """Atomically write unexpired entries to `cache_file`. Returns the number saved."""
+        if not self.cache_file:
+            return 0
+        now = time.time()
+        entries = {k: list(v) for k, v in list(self._cache.items()) if v[1] > now}
+        tmp_path = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump({"precision": self.precision, "entries": entries}, fh)
+            os.replace(tmp_path, self.cache_file)
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"Could not persist reverse geocode cache to {self.cache_file}: {e}")
+            return 0
+        return len(entries)
+
+    async def _persist_loop(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if self._dirty:
+                saved = await asyncio.to_thread(self.save)
+                logger.info(f"Persisted {saved} reverse geocode entries.")
+
+    async def start(self, persist_interval: int = REVERSE_GEOCODE_PERSIST_INTERVAL_SECONDS) -> None:
+        await asyncio.to_thread(self.load)
+        if self.cache_file and persist_interval > 0:
+            self._persist_task = asyncio.create_task(self._persist_loop(persist_interval))
+
+    async def stop(self) -> None:
+        if self._persist_task:
+            self._persist_task.cancel()
+            self._persist_task = None
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.to_thread(self.save)
+
+    # --- Metrics ---
+    def stats(self) -> Dict[str, Any]:
+        lookups = (
+            self.metrics["hits"]
+            + self.metrics["offline_hits"]
+            + self.metrics["misses"]
+            + self.metrics["negative_hits"]
+        )
+        served = self.metrics["hits"] + self.metrics["offline_hits"]
+        return {
+            **self.metrics,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "gazetteer_size": self.gazetteer.size if self.gazetteer is not None else 0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "negative_size": len(self._failures),
+            "inflight": len(self._inflight),
+            "precision": self.precision,
+        }
+
+
+def normalize_address(location_text: str) -> str:
+    """Canonical cache key for free-text addresses (case, spacing and comma noise removed)."""
+    text = location_text.lower().strip()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"(, )+", ", ", text)
+    return text.strip(" ,.;")
+
+
+def geocode_variants(location_text: str) -> List[str]:
+    """
+    Address strings to try, most specific first: the full address, the address
+    without a trailing postal code, and the last two parts (city/state or locality).
+    """
+    # 1. First attempt: Use the full address
+    try_addresses = [location_text]
+
+    # 2. Second attempt: Remove any possible postal code (last segment if it's numeric)
+    parts = location_text.split(",")
+    if parts and parts[-1].strip().isdigit():
+        simplified_addr = ",".join(parts[:-1]).strip()
+        if simplified_addr:
+            try_addresses.append(simplified_addr)
+
+    # 3. Third attempt: Use the last two known parts (often city/state or major locality)
+    if len(parts) >= 2:
+        last_two_parts = ",".join([parts[-2].strip(), parts[-1].strip()])
+        if last_two_parts not in try_addresses and last_two_parts != location_text:
+            try_addresses.append(last_two_parts)
+
+    # Use a dict to maintain order but prevent duplicates
+    return list(dict.fromkeys(try_addresses))
+
+
+class GeocoderUnavailableError(Exception):
+    """The geocoding service failed or timed out; the address may still resolve later (503)."""
+
+
+class ForwardGeocodeCache:
+    """
+    Cached address -> coordinates lookups for submissions.
+
+    Positive results live for `ttl`, unresolvable strings for `negative_ttl`;
+    service errors and timeouts are not cached.
+    On a miss, the variants from geocode_variants() are started one throttle
+    slot apart and raced: the most specific variant that succeeds wins, and
+    less specific ones are cancelled as soon as the answer is settled.
+    """
+
+    def __init__(
+        self,
+        geolocator: Any,
+        throttle: Optional[NominatimThrottle] = None,
+        maxsize: int = FORWARD_GEOCODE_CACHE_SIZE,
+        ttl: int = FORWARD_GEOCODE_TTL_SECONDS,
+        negative_ttl: int = FORWARD_GEOCODE_NEGATIVE_TTL_SECONDS,
+        attempt_timeout: float = FORWARD_GEOCODE_ATTEMPT_TIMEOUT_SECONDS,
+        overall_timeout: float = FORWARD_GEOCODE_TIMEOUT_SECONDS,
+    ):
+        self.geolocator = geolocator
+        self.throttle = throttle or NominatimThrottle()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.attempt_timeout = attempt_timeout
+        self.overall_timeout = overall_timeout
+        # normalized text -> (result dict or None, expires_at_epoch)
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.metrics: Dict[str, float] = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "inflight_joins": 0,
+            "attempts": 0,
+            "attempts_cancelled": 0,
+            "fallback_wins": 0,
+            "unresolved": 0,
+            "unavailable": 0,
+            "lookup_seconds_total": 0.0,
+        }
+
+    def _geocode_blocking(self, address: str) -> Optional[Dict[str, Any]]:
+        logger.info(f"Attempting to geocode address: '{address}'")
+        try:
+            geo_result = self.geolocator.geocode(
+                address, exactly_one=True, timeout=self.attempt_timeout
+            )
+        except Exception as e:
+            logger.warning(f"Geocode service error for '{address}': {e}")
+            raise
+        if not geo_result:
+            logger.warning(f"Geocode attempt failed for: '{address}'.")
+            return None
+        logger.info(
+            f"Geocode OK for '{address}': ({geo_result.latitude}, {geo_result.longitude})"
+        )
+        return {
+            "latitude": geo_result.latitude,
+            "longitude": geo_result.longitude,
+            "address": geo_result.address,
+        }
+
+    async def _attempt(self, address: str) -> Optional[Dict[str, Any]]:
+        await self.throttle.wait()
+        self.metrics["attempts"] += 1
+        return await asyncio.to_thread(self._geocode_blocking, address)
+
+    async def _race(self, variants: List[str]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(best result, conclusive): a None result is conclusive only if every variant answered "not found"."""
+        tasks = [asyncio.create_task(self._attempt(v)) for v in variants]
+        best: Optional[Dict[str, Any]] = None
+        best_index: Optional[int] = None
+        deadline = time.monotonic() + self.overall_timeout
+        pending = set(tasks)
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for i, task in enumerate(tasks):
+                    if task.done() and not task.cancelled() and task.exception() is None:
+                        result = task.result()
+                        if result and (best_index is None or i < best_index):
+                            best, best_index = result, i
+                # Settled once every more specific variant has finished
+                if best_index is not None and all(t.done() for t in tasks[:best_index]):
+                    break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    self.metrics["attempts_cancelled"] += 1
+        if best_index is not None and best_index > 0:
+            self.metrics["fallback_wins"] += 1
+        conclusive = best is not None or all(
+            t.done() and not t.cancelled() and t.exception() is None for t in tasks
+        )
+        return best, conclusive
+
+    async def _resolve(self, key: str, location_text: str) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        result, conclusive = await self._race(geocode_variants(location_text))
+        self.metrics["lookup_seconds_total"] += time.perf_counter() - started
+        if result is None and not conclusive:
+            # Service errors or timeouts: do not remember the address as unresolvable
+            self.metrics["unavailable"] += 1
+            raise GeocoderUnavailableError(f"Geocoding '{location_text}' failed or timed out")
+        elif result is None:
+            self.metrics["unresolved"] += 1
+            self._cache[key] = (None, time.time() + self.negative_ttl)
+        else:
+            self._cache[key] = (result, time.time() + self.ttl)
+        return result
+
+    async def geocode(self, location_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Return {'latitude', 'longitude', 'address'} for the text, or None if it
+        does not resolve. Raises GeocoderUnavailableError on service errors/timeouts.
+        """
+        if not location_text or not location_text.strip():
+            return None
+        key = normalize_address(location_text)
+
+        entry = self._cache.get(key)
+        if entry is not None:
+            result, expires_at = entry
+            if expires_at >= time.time():
+                if result is None:
+                    self.metrics["negative_hits"] += 1
+                    return None
+                self.metrics["hits"] += 1
+                return dict(result)
+            self._cache.pop(key, None)
+
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self.metrics["inflight_joins"] += 1
+            result = await asyncio.shield(existing)
+            return dict(result) if result else None
+
+        self.metrics["misses"] += 1
+        task = asyncio.ensure_future(self._resolve(key, location_text.strip()))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        result = await asyncio.shield(task)
+        return dict(result) if result else None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["negative_hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(
+                (self.metrics["hits"] + self.metrics["negative_hits"]) / lookups, 4
+            )
+            if lookups
+            else 0.0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "inflight": len(self._inflight),
+        }
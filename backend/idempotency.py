@@ -0,0 +1,315 @@
+"""
+Idempotency-Key support for non-idempotent POST endpoints (issue and fix submission).
+
+Mobile clients retry submissions on flaky networks. A request carrying an
+`Idempotency-Key` header executes at most once per (user, endpoint, key)
+within IDEMPOTENCY_TTL_SECONDS:
+
+- A replay of a completed request gets the stored response (status, body,
+  Location) back immediately, marked with `Idempotent-Replayed: true`.
+- A duplicate arriving while the first execution is still running waits for
+  it (up to IDEMPOTENCY_WAIT_SECONDS) and then gets the same response.
+- Only 2xx responses and 4xx that the same request would always get again
+  (IDEMPOTENCY_STORED_4XX) are stored. Anything else (5xx, 401/403/409/429,
+  exceptions) releases the key so the client's retry runs again.
+- The key is bound to a fingerprint of the request body. Reusing it for a
+  different request (edited form, other photo) is rejected with 422 instead
+  of replaying the first response.
+
+Completed responses are kept in memory and, through an optional backend
+(FirestoreStore), shared with other gateway instances. The backend also holds
+a claim while a request runs, so a retry routed to another instance waits
+rather than executing in parallel. Claims expire after IDEMPOTENCY_LEASE_SECONDS
+in case the instance holding one dies.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "300"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# Bodies larger than this are not stored (submission responses are a few KB)
+IDEMPOTENCY_MAX_BODY_BYTES = 256 * 1024
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+# Client errors that depend only on the request itself (not on auth, user state or load)
+IDEMPOTENCY_STORED_4XX = frozenset({400, 404, 405, 413, 415, 422})
+BACKEND_POLL_SECONDS = 0.5
+
+
+class IdempotencyKeyError(ValueError):
+    """The Idempotency-Key header is empty or too long (400)."""
+
+
+class IdempotencyInProgressError(Exception):
+    """The first execution is still running after the wait timeout (409)."""
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """The key was already used for a request with a different body (422)."""
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: str
+    media_type: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    fingerprint: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StoredResponse":
+        return cls(
+            status_code=int(data["status_code"]),
+            body=data.get("body") or "",
+            media_type=data.get("media_type"),
+            headers=dict(data.get("headers") or {}),
+            fingerprint=data.get("fingerprint"),
+        )
+
+
+class IdempotencyBackend(Protocol):
+    async def claim_idempotency_key(self, key_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """Claim the key; None if claimed, else the existing record (completed or in progress)."""
+
+    async def complete_idempotency_key(self, key_id: str, response: Dict[str, Any], ttl_seconds: int) -> None: ...
+
+    async def release_idempotency_key(self, key_id: str) -> None: ...
+
+
+def idempotency_key_id(scope: str, key: str) -> str:
+    """Document-id-safe key for a client key within a scope (user + endpoint)."""
+    key = key.strip()
+    if not key or len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+        raise IdempotencyKeyError(f"Idempotency-Key must be 1-{IDEMPOTENCY_MAX_KEY_LENGTH} characters")
+    return hashlib.sha256(f"{scope}\n{key}".encode("utf-8")).hexdigest()
+
+
+class BodyFingerprint:
+    """
+    Hash of a request body (form fields and file bytes), fed chunk by chunk as
+    the body streams to the handler, so nothing is buffered. The multipart
+    boundary is random per request, so it is removed first: a retry of the
+    same form gets the same fingerprint.
+    """
+
+    def __init__(self, content_type: Optional[str]):
+        self._boundary = b""
+        for param in (content_type or "").split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "boundary" and value:
+                self._boundary = value.strip('"').encode("latin-1")
+        self._hash = hashlib.sha256()
+        # Bytes that may be the start of a boundary split across chunks
+        self._tail = b""
+        self.complete = False
+
+    def update(self, chunk: bytes, more_body: bool) -> None:
+        data = self._tail + chunk
+        keep = 0
+        if self._boundary:
+            data = data.replace(self._boundary, b"")
+            if more_body:
+                keep = len(self._boundary) - 1
+        cut = max(len(data) - keep, 0)
+        self._hash.update(data[:cut])
+        self._tail = data[cut:]
+        if not more_body:
+            self.complete = True
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def storable_status(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code in IDEMPOTENCY_STORED_4XX
+
+
+def _check_fingerprint(stored: Optional[str], fingerprint: Optional[str]) -> None:
+    if stored is not None and fingerprint is not None and stored != fingerprint:
+        raise IdempotencyKeyMismatchError(
+            "Idempotency-Key was already used for a different request; send a new key"
+        )
+
+
+class IdempotencyManager:
+    def __init__(
+        self,
+        backend: Optional[IdempotencyBackend] = None,
+        ttl: int = IDEMPOTENCY_TTL_SECONDS,
+        wait_seconds: float = IDEMPOTENCY_WAIT_SECONDS,
+        lease_seconds: int = IDEMPOTENCY_LEASE_SECONDS,
+        maxsize: int = IDEMPOTENCY_CACHE_SIZE,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.wait_seconds = wait_seconds
+        self.lease_seconds = lease_seconds
+        self._completed: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.metrics = {
+            "executions": 0,
+            "replays": 0,
+            "joined_in_flight": 0,
+            "released": 0,
+            "mismatches": 0,
+            "backend_errors": 0,
+        }
+
+    async def execute(
+        self,
+        key_id: str,
+        run: Callable[[], Awaitable[StoredResponse]],
+        fingerprint: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+    ) -> Tuple[StoredResponse, bool]:
+        """
+        Run `run` once per key; returns (response, replayed).
+
+        `fingerprint` returns the request's fingerprint once its body has been
+        read: by `run`, or by `fingerprint` itself when the request is answered
+        without running. Raises IdempotencyKeyMismatchError if the key belongs
+        to a request with another fingerprint.
+        """
+
+        async def request_fingerprint() -> Optional[str]:
+            return await fingerprint() if fingerprint is not None else None
+
+        stored = self._completed.get(key_id)
+        if stored is not None:
+            self._verify(stored.fingerprint, await request_fingerprint())
+            self.metrics["replays"] += 1
+            return stored, True
+
+        in_flight = self._in_flight.get(key_id)
+        if in_flight is not None:
+            own_fingerprint = await request_fingerprint()
+            self.metrics["joined_in_flight"] += 1
+            try:
+                response = await asyncio.wait_for(asyncio.shield(in_flight), self.wait_seconds)
+            except asyncio.TimeoutError:
+                raise IdempotencyInProgressError("A request with this Idempotency-Key is still in progress")
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The first execution was cancelled (client gone); its claim is released
+                raise IdempotencyInProgressError("The request with this Idempotency-Key was interrupted; retry it")
+            self._verify(response.fingerprint, own_fingerprint)
+            return response, True
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[key_id] = future
+        try:
+            existing = await self._claim(key_id)
+            if existing is not None:
+                response = StoredResponse.from_dict(existing)
+                self._completed[key_id] = response
+                self._verify(response.fingerprint, await request_fingerprint())
+                self.metrics["replays"] += 1
+                future.set_result(response)
+                return response, True
+
+            self.metrics["executions"] += 1
+            try:
+                response = await run()
+                response.fingerprint = await request_fingerprint()
+            except BaseException:
+                await self._release(key_id)
+                raise
+            # A response to a body that never fully arrived (client gone, size
+            # limit) says nothing about what a retry would get
+            incomplete = fingerprint is not None and response.fingerprint is None
+            if (
+                incomplete
+                or not storable_status(response.status_code)
+                or len(response.body) > IDEMPOTENCY_MAX_BODY_BYTES
+            ):
+                await self._release(key_id)
+            else:
+                self._completed[key_id] = response
+                await self._complete(key_id, response)
+            future.set_result(response)
+            return response, False
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # Mark it retrieved: waiters re-raise it, but there may be none
+                    future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key_id, None)
+
+    def _verify(self, stored: Optional[str], fingerprint: Optional[str]) -> None:
+        try:
+            _check_fingerprint(stored, fingerprint)
+        except IdempotencyKeyMismatchError:
+            self.metrics["mismatches"] += 1
+            raise
+
+    # --- Backend (best effort: without it, keys are only honoured per instance) ---
+    async def _claim(self, key_id: str) -> Optional[Dict[str, Any]]:
+        """None once this instance holds the claim; the stored response if already completed."""
+        if self.backend is None:
+            return None
+        deadline = time.monotonic() + self.wait_seconds
+        waited = False
+        while True:
+            try:
+                record = await self.backend.claim_idempotency_key(key_id, self.lease_seconds)
+            except Exception as e:
+                self.metrics["backend_errors"] += 1
+                logger.warning(f"Idempotency claim failed for {key_id[:12]}; running unshared: {e}")
+                return None
+            if record is None:
+                return None
+            if record.get("response"):
+                return record["response"]
+            # Another instance is running it; wait for its result
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError("A request with this Idempotency-Key is still in progress")
+            if not waited:
+                waited = True
+                self.metrics["joined_in_flight"] += 1
+            await asyncio.sleep(BACKEND_POLL_SECONDS)
+
+    async def _complete(self, key_id: str, response: StoredResponse) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.complete_idempotency_key(key_id, response.as_dict(), self.ttl)
+        except Exception as e:
+            self.metrics["backend_errors"] += 1
+            logger.warning(f"Could not store idempotent response {key_id[:12]}: {e}")
+
+    async def _release(self, key_id: str) -> None:
+        self.metrics["released"] += 1
+        if self.backend is None:
+            return
+        try:
+            await self.backend.release_idempotency_key(key_id)
+        except Exception as e:
+            self.metrics["backend_errors"] += 1
+            logger.warning(f"Could not release idempotency key {key_id[:12]}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "stored": len(self._completed),
+            "in_flight": len(self._in_flight),
+            "shared": self.backend is not None,
+        }
@@ -0,0 +1,226 @@
+"""
+Image helpers for the gateway's upload paths.
+
+- EXIF GPS extraction (headers only)
+- WebP thumbnail/medium derivatives, rendered in a process pool so decoding
+  and resizing large phone photos never competes with the event loop
+- 64-bit difference hash (dHash) for near-duplicate photo detection
+
+Pillow (and NumPy, for hashing) are optional at import time: without them the
+helpers degrade to returning None/{} so uploads still work, just without the
+extras.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+try:
+    from PIL import Image, ImageOps
+
+    PIL_ENABLED = True
+except ImportError:
+    Image = None
+    ImageOps = None
+    PIL_ENABLED = False
+
+try:
+    import numpy as np
+
+    NUMPY_ENABLED = True
+except ImportError:
+    np = None
+    NUMPY_ENABLED = False
+
+logger = logging.getLogger(__name__)
+
+# EXIF tag ids (see the EXIF 2.3 spec, GPS IFD)
+EXIF_GPS_IFD = 0x8825
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+
+# Longest edge in pixels for each derivative
+DERIVATIVE_SIZES: Dict[str, int] = {"thumb": 320, "medium": 1024}
+DERIVATIVE_WEBP_QUALITY = int(os.getenv("DERIVATIVE_WEBP_QUALITY", "80"))
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+DERIVATIVES_ENABLED = os.getenv("DERIVATIVES_ENABLED", "true").lower() in ("1", "true", "yes")
+DHASH_SIZE = 8  # 8x8 gradient bits -> 64-bit hash
+
+if not PIL_ENABLED:
+    logger.warning("Pillow not installed. EXIF GPS extraction and image derivatives are disabled.")
+
+
+def _dms_to_degrees(dms, ref: str) -> float:
+    degrees, minutes, seconds = (float(v) for v in dms)
+    value = degrees + minutes / 60.0 + seconds / 3600.0
+    return -value if ref.upper() in ("S", "W") else value
+
+
+def extract_gps_coordinates(data: Union[bytes, BinaryIO]) -> Optional[Tuple[float, float]]:
+    """
+    Return (latitude, longitude) from the image's EXIF GPS block, or None if
+    the image has no usable GPS data. Only headers are parsed, not pixels, so
+    a file object is read just far enough to reach them and then rewound.
+    """
+    if not PIL_ENABLED or not data:
+        return None
+    source = BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
+    try:
+        source.seek(0)
+        with Image.open(source) as img:
+            gps = img.getexif().get_ifd(EXIF_GPS_IFD)
+        if not gps or GPS_LATITUDE not in gps or GPS_LONGITUDE not in gps:
+            return None
+        lat = _dms_to_degrees(gps[GPS_LATITUDE], str(gps.get(GPS_LATITUDE_REF, "N")))
+        lon = _dms_to_degrees(gps[GPS_LONGITUDE], str(gps.get(GPS_LONGITUDE_REF, "E")))
+    except Exception as e:
+        logger.debug(f"No EXIF GPS data: {e}")
+        return None
+    finally:
+        source.seek(0)
+
+    # Many cameras write 0/0 when they have no fix
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0) or (lat == 0.0 and lon == 0.0):
+        return None
+    return lat, lon
+
+
+def render_webp_derivatives(
+    path: str,
+    sizes: Dict[str, int] = DERIVATIVE_SIZES,
+    quality: int = DERIVATIVE_WEBP_QUALITY,
+) -> Dict[str, bytes]:
+    """
+    Render downscaled WebP variants of the image at `path`, keyed like `sizes`.
+    Runs in a worker process; only the (small) encoded variants travel back.
+    """
+    largest = max(sizes.values())
+    with Image.open(path) as img:
+        # JPEG: let libjpeg decode at a reduced scale (>= largest) instead of full size
+        img.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+        variants: Dict[str, bytes] = {}
+        for name, edge in sorted(sizes.items(), key=lambda kv: -kv[1]):
+            variant = img.copy()
+            variant.thumbnail((edge, edge), Image.LANCZOS)  # never upscales
+            buf = BytesIO()
+            variant.save(buf, "WEBP", quality=quality, method=4)
+            variants[name] = buf.getvalue()
+    return variants
+
+
+def photo_dhash(source: Union[bytes, BinaryIO]) -> Optional[int]:
+    """
+    64-bit dHash: grayscale, shrink to 9x8, one bit per horizontal gradient sign.
+    Robust to re-encoding, resizing and small crops; None if it cannot be computed.
+    """
+    if not (PIL_ENABLED and NUMPY_ENABLED):
+        return None
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            source = BytesIO(source)
+        source.seek(0)
+        with Image.open(source) as img:
+            # JPEG draft mode decodes at 1/8 scale, far cheaper than a full decode
+            img.draft("L", (DHASH_SIZE * 8, DHASH_SIZE * 8))
+            img = ImageOps.exif_transpose(img).convert("L")
+            small = img.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.LANCZOS)
+        pixels = np.asarray(small, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+    except Exception as e:
+        logger.debug(f"Could not compute dHash: {e}")
+        return None
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class DerivativeGenerator:
+    """Renders WebP derivatives for uploads on a bounded process pool."""
+
+    def __init__(self, workers: int = DERIVATIVE_WORKERS, enabled: bool = DERIVATIVES_ENABLED):
+        self.enabled = enabled and PIL_ENABLED
+        self._workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.metrics = {"rendered": 0, "failures": 0, "bytes_out": 0}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created lazily, and with "spawn": forking a process that already runs
+        # gRPC/Firestore threads is unsafe
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @staticmethod
+    def _snapshot_blocking(source: Union[bytes, BinaryIO]) -> str:
+        fd, path = tempfile.mkstemp(prefix="civicfix-derivative-")
+        with os.fdopen(fd, "wb") as out:
+            if isinstance(source, (bytes, bytearray)):
+                out.write(source)
+            else:
+                source.seek(0)
+                shutil.copyfileobj(source, out, 1024 * 1024)
+                source.seek(0)
+        return path
+
+    async def snapshot(self, source: Union[bytes, BinaryIO]) -> Optional[str]:
+        """
+        Copy the upload to a private temp file the worker process can open.
+        Must finish before anything else reads `source` concurrently.
+        """
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._snapshot_blocking, source)
+        except Exception as e:
+            logger.error(f"Could not snapshot upload for derivatives: {e}")
+            return None
+
+    async def render(self, path: str) -> Dict[str, bytes]:
+        """Render variants from a snapshot (which is deleted afterwards); {} on failure."""
+        loop = asyncio.get_running_loop()
+        try:
+            variants = await loop.run_in_executor(self._pool(), render_webp_derivatives, path)
+        except Exception as e:
+            self.metrics["failures"] += 1
+            logger.error(f"Derivative rendering failed: {e}")
+            return {}
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self.metrics["rendered"] += 1
+        self.metrics["bytes_out"] += sum(len(v) for v in variants.values())
+        return variants
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.metrics, "enabled": self.enabled}
+
+
+def variant_object_name(object_name: str, variant: str) -> str:
+    """issues/abc_photo.jpg -> issues/abc_photo.thumb.webp (stored next to the original)."""
+    return f"{os.path.splitext(object_name)[0]}.{variant}.webp"
@@ -0,0 +1,220 @@
+"""
+In-process job queue for slow submission steps (the analyzer call).
+
+An endpoint persists its inputs (the photo is already in GCS), enqueues a job
+and answers 202 right away; a bounded pool of worker tasks runs the handlers.
+
+- Retries: a handler raises RetryableJobError for transient failures; the job
+  is re-queued with exponential backoff until max_attempts, then dead-lettered.
+  Any other exception fails the job immediately (and dead-letters it).
+- Status: unfinished jobs stay in memory until they finish; finished ones are
+  kept for `retention_seconds`. When a persist callback is given, state is
+  mirrored (best effort) so other instances can serve polls.
+- Subscriptions: wait_for_update() lets SSE endpoints stream state changes.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+DEAD_LETTER_SIZE = 500
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_RETRYING = "retrying"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class RetryableJobError(Exception):
+    """Transient failure (upstream 5xx, timeout, connection reset): retry the job."""
+
+
+class JobQueueFullError(Exception):
+    """The queue is at capacity; the caller should shed load (503)."""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    owner: Optional[str]
+    status: str = JOB_QUEUED
+    attempts: int = 0
+    max_attempts: int = JOB_MAX_ATTEMPTS
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    version: int = 0
+
+    def public(self) -> Dict[str, Any]:
+        """What clients see: everything except the internal payload."""
+        data = asdict(self)
+        data.pop("payload")
+        return data
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_queue: int = JOB_QUEUE_SIZE,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_base_seconds: float = JOB_RETRY_BASE_SECONDS,
+        retention_seconds: int = JOB_RETENTION_SECONDS,
+        persist: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.persist = persist
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        # Queued, running and retrying jobs are never evicted: the worker (or a
+        # backoff task) still has to find them. Only finished ones expire.
+        self._active: Dict[str, Job] = {}
+        self._finished: TTLCache = TTLCache(maxsize=max_queue * 10, ttl=retention_seconds)
+        self._handlers: Dict[str, JobHandler] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._tasks: set = set()
+        self.dead_letters: Deque[str] = deque(maxlen=DEAD_LETTER_SIZE)
+        self.metrics = {"submitted": 0, "succeeded": 0, "failed": 0, "retries": 0, "rejected": 0}
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    # --- State ---
+    async def _update(self, job: Job, **changes) -> None:
+        for key, value in changes.items():
+            setattr(job, key, value)
+        job.updated_at = time.time()
+        job.version += 1
+        if job.status in TERMINAL_STATES and self._active.pop(job.id, None) is not None:
+            self._finished[job.id] = job
+        # Wake every subscriber, then arm a fresh event for the next change
+        event = self._events.pop(job.id, None)
+        if event:
+            event.set()
+        if self.persist:
+            try:
+                await self.persist(job.public())
+            except Exception as e:
+                logger.warning(f"Could not persist job {job.id}: {e}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._active.get(job_id) or self._finished.get(job_id)
+
+    async def wait_for_update(self, job_id: str, version: int, timeout: float) -> Optional[Job]:
+        """Return the job once its version is past `version`, or as-is after `timeout`."""
+        job = self.get(job_id)
+        if job is None or job.version > version:
+            return job
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.get(job_id)
+
+    # --- Submission ---
+    async def submit(self, kind: str, payload: Dict[str, Any], owner: Optional[str] = None) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind {kind}")
+        job = Job(id=uuid.uuid4().hex, kind=kind, payload=payload, owner=owner, max_attempts=self.max_attempts)
+        try:
+            self._queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            self.metrics["rejected"] += 1
+            raise JobQueueFullError("Job queue is full")
+        self._active[job.id] = job
+        self.metrics["submitted"] += 1
+        await self._update(job)
+        return job
+
+    async def _requeue_later(self, job: Job, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._update(job, status=JOB_QUEUED)
+        await self._queue.put(job.id)
+
+    # --- Workers ---
+    async def _run(self, job: Job) -> None:
+        handler = self._handlers[job.kind]
+        await self._update(job, status=JOB_RUNNING, attempts=job.attempts + 1)
+        try:
+            result = await handler(job.payload)
+        except RetryableJobError as e:
+            if job.attempts < job.max_attempts:
+                delay = self.retry_base_seconds * (2 ** (job.attempts - 1))
+                self.metrics["retries"] += 1
+                logger.warning(f"Job {job.id} attempt {job.attempts} failed ({e}); retrying in {delay}s")
+                await self._update(job, status=JOB_RETRYING, error=str(e))
+                task = asyncio.create_task(self._requeue_later(job, delay))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                return
+            await self._dead_letter(job, f"Gave up after {job.attempts} attempts: {e}")
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.kind}) failed permanently")
+            await self._dead_letter(job, str(e) or e.__class__.__name__)
+        else:
+            self.metrics["succeeded"] += 1
+            # The payload is no longer needed once the job is done
+            await self._update(job, status=JOB_SUCCEEDED, result=result, error=None, payload={})
+
+    async def _dead_letter(self, job: Job, error: str) -> None:
+        self.metrics["failed"] += 1
+        self.dead_letters.append(job.id)
+        logger.error(f"Job {job.id} ({job.kind}) dead-lettered: {error}")
+        await self._update(job, status=JOB_FAILED, error=error)
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self._active.get(job_id)
+                if job is not None:
+                    await self._run(job)
+                else:
+                    logger.error(f"Job worker {n}: queued job {job_id} is not tracked")
+            except Exception:
+                logger.exception(f"Job worker {n} crashed on {job_id}")
+            finally:
+                self._queue.task_done()
+
+    async def start(self) -> None:
+        for n in range(self.workers):
+            task = asyncio.create_task(self._worker(n))
+            self._tasks.add(task)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "queued": self._queue.qsize(),
+            "active_jobs": len(self._active),
+            "tracked_jobs": len(self._active) + len(self._finished),
+            "dead_letters": len(self.dead_letters),
+            "workers": self.workers,
+        }
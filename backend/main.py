@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta, timezone
 import asyncio
+import dataclasses
 import json
 import uuid
 import logging
-import requests
+import httpx
 import os
 from datetime import datetime
 from fastapi import Query  # Add Query import
@@ -19,35 +20,96 @@ from fastapi import (
     Depends,
 )  # Added Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import json
 
 # --- ADDED firestore and auth_errors ---
 from firebase_admin import (
-    auth,
     credentials,
     initialize_app,
     _auth_utils as firebase_auth_errors,
     firestore,
+    firestore_async,
 )
 from dotenv import load_dotenv
 from google.cloud import storage
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Any, Optional
-from google.cloud.firestore_v1.base_query import FieldFilter
+from typing import List, Dict, Any, Optional, BinaryIO, Tuple, Union
 from google.cloud.firestore_v1.transforms import Increment
 from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
 from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import asyncio
 
+from analysis_cache import AnalysisResultCache, analysis_cache_key
+from firestore_store import FirestoreStore
+from gazetteer import load_gazetteer
+from imaging import (
+    DERIVATIVE_SIZES,
+    DerivativeGenerator,
+    extract_gps_coordinates,
+    photo_dhash,
+    variant_object_name,
+)
+from near_duplicates import NearDuplicateIndex, format_dhash, parse_dhash
+from feed_cursors import (
+    FEED_PIT_KEEP_ALIVE,
+    FeedCursor,
+    FeedCursorError,
+    decode_cursor,
+    encode_cursor,
+    query_fingerprint,
+)
+from pipeline import Pipeline, PipelineMetrics
+from response_cache import ResponseCache
+from map_tiles import MAP_TILE_MAX_ZOOM, MapTileCache, filter_key, tile_bounds, valid_tile
+from single_flight import SingleFlight, request_key
+from geocoding import (
+    ADDRESS_PENDING,
+    REVERSE_GEOCODE_INGEST_TIMEOUT_SECONDS,
+    ForwardGeocodeCache,
+    GeocoderUnavailableError,
+    NominatimThrottle,
+    ReverseGeocodeCache,
+)
+from uploads import (
+    MAX_FILES_PER_SUBMISSION,
+    MAX_IMAGE_UPLOAD_BYTES,
+    MULTIPART_OVERHEAD_BYTES,
+    UploadItem,
+    UploadResult,
+    build_upload_pipeline,
+    content_object_name,
+    content_sha256,
+    read_stream,
+    stream_size,
+)
+from jobs import (
+    JOB_MAX_ATTEMPTS,
+    TERMINAL_STATES,
+    JobQueue,
+    JobQueueFullError,
+    RetryableJobError,
+)
+from user_profiles import USER_CACHE_SNAPSHOT_LISTENER, UserProfileCache
+from idempotency import (
+    IdempotencyInProgressError,
+    IdempotencyKeyError,
+    IdempotencyKeyMismatchError,
+    IdempotencyManager,
+    StoredResponse,
+    idempotency_key_id,
+    BodyFingerprint,
+)
+from token_verifier import (
+    FirebaseTokenVerifier,
+    TokenRevokedError,
+    TokenUserDisabledError,
+    TokenVerificationError,
+)
+
 BUCKET_NAME = "civicfix_issues_bucket/fix-proof"
 router = APIRouter()
 
-# --- ADD Global Cache ---
-geocode_cache: Dict[str, str] = {}
-# --- END ADD ---
-
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
@@ -56,6 +118,9 @@ logger = logging.getLogger(__name__)
 # --- Firebase Setup ---
 default_app = None
 db = None
+store: Optional[FirestoreStore] = None
+# users/{uid} documents, shared by every endpoint through store.get_user
+user_profiles = UserProfileCache()
 
 try:
     import os
@@ -94,14 +159,16 @@ try:
         default_app = initialize_app(cred)
         logger.info("✓ Firebase Admin initialized successfully")
 
-    # Initialize Firestore DB client (synchronous)
-    db = firestore.client()
+    # Initialize Firestore DB client (async; all access goes through FirestoreStore)
+    db = firestore_async.client()
+    store = FirestoreStore(db, user_cache=user_profiles)
     logger.info("✓ Firestore client initialized successfully")
 
 except Exception as fb_err:
     logger.error(f"✗ Failed to initialize Firebase Admin: {fb_err}", exc_info=True)
     default_app = None
     db = None  # Set db to None if init fails
+    store = None
 
 # --- Environment Variables ---
 load_dotenv()
@@ -109,6 +176,14 @@ BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
 CLOUD_ANALYZER_URL = os.getenv("CLOUD_ANALYZER_URL", "http://localhost:8001")
 # --- NEW: Verifier URL (pointing to port 8002) ---
 VERIFIER_URL = os.getenv("VERIFIER_URL", "http://localhost:8002")
+# Shared outbound HTTP client settings (analyzer/verifier calls)
+ANALYZER_TIMEOUT_SECONDS = float(os.getenv("ANALYZER_TIMEOUT_SECONDS", "60"))
+VERIFIER_TIMEOUT_SECONDS = float(os.getenv("VERIFIER_TIMEOUT_SECONDS", "90"))
+# Photos up to this size are sent to the analyzer inline, overlapping the GCS upload
+ANALYZER_INLINE_MAX_BYTES = int(os.getenv("ANALYZER_INLINE_MAX_BYTES", str(15 * 1024 * 1024)))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
 ES_URL = os.getenv("ES_URL", "http://localhost:9200")
 # For cloud ES, try HTTP if HTTPS fails
 ES_URL_HTTP = (
@@ -120,6 +195,8 @@ ES_VERIFY_CERTS = os.getenv("ES_VERIFY_CERTS", "true").lower() in ("1", "true",
 ES_CA_CERT = os.getenv("ES_CA_CERT")
 SPAM_REPORT_THRESHOLD = 3
 REOPEN_REPORT_THRESHOLD = 3
+# ~11 m: /api/issues callers this close to each other share a feed cache entry
+FEED_CACHE_COORD_DECIMALS = 4
 
 # Debug: Print all relevant environment variables
 logger.info(f"Environment Variables:")
@@ -134,9 +211,18 @@ logger.info(f"  CLOUD_ANALYZER_URL: {CLOUD_ANALYZER_URL}")
 if not BUCKET_NAME:
     logger.warning("GCS_BUCKET_NAME env var not set. File uploads will fail.")
 
+# --- Firebase ID-token Verification ---
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID") or (
+    default_app.project_id if default_app else None
+)
+token_verifier = FirebaseTokenVerifier(project_id=FIREBASE_PROJECT_ID)
+
 # --- FastAPI App and ES Client ---
 app = FastAPI(title="CivicFix API Gateway")
 es_client: Optional[AsyncElasticsearch] = None
+http_client: Optional[httpx.AsyncClient] = None
+ANALYZER_TIMEOUT = httpx.Timeout(ANALYZER_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+VERIFIER_TIMEOUT = httpx.Timeout(VERIFIER_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
 es_connection_kwargs: Dict[str, Any] = {}
 if ES_USER and ES_PASS:
     es_connection_kwargs["basic_auth"] = (ES_USER, ES_PASS)
@@ -204,6 +290,179 @@ async def shutdown_event():
         logger.info("ES connection closed.")
 
 
+# --- Lifespan Events for Shared HTTP Client ---
+@app.on_event("startup")
+async def start_http_client():
+    global http_client
+    # One pooled client for all analyzer/verifier calls: keep-alive connections are
+    # reused across requests, HTTP/2 is negotiated where the upstream supports it.
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=ANALYZER_TIMEOUT,
+    )
+
+
+@app.on_event("shutdown")
+async def stop_http_client():
+    if http_client:
+        await http_client.aclose()
+        logger.info("HTTP client closed.")
+
+
+# --- Lifespan Events for Upload Pipeline ---
+@app.on_event("shutdown")
+async def stop_upload_pipeline():
+    if upload_pipeline:
+        # Let in-flight uploads finish before the worker exits
+        await asyncio.to_thread(upload_pipeline.close)
+    await asyncio.to_thread(derivative_generator.close)
+
+
+# --- Lifespan Events for Job Queue ---
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+
+# --- Lifespan Events for User Profile Cache ---
+@app.on_event("startup")
+async def start_user_profile_listener():
+    if not (USER_CACHE_SNAPSHOT_LISTENER and default_app):
+        return
+    try:
+        # Listeners need the synchronous client; callbacks arrive on its own thread
+        user_profiles.start_listener(firestore.client())
+    except Exception as e:
+        logger.warning(f"User profile snapshot listener not started; relying on TTL: {e}")
+
+
+@app.on_event("shutdown")
+async def stop_user_profile_listener():
+    user_profiles.stop_listener()
+
+
+# --- Lifespan Events for Near-Duplicate Index ---
+@app.on_event("startup")
+async def start_near_duplicate_index():
+    async def _warm():
+        try:
+            loaded = await near_duplicates.load(es_client)
+            logger.info(f"Near-duplicate index warmed with {loaded} recent issues.")
+        except Exception as e:
+            logger.warning(f"Could not warm near-duplicate index: {e}")
+
+    # Warm in the background; until then lookups just find fewer candidates
+    global near_duplicates_warmup
+    near_duplicates_warmup = asyncio.create_task(_warm())
+
+
+# --- Lifespan Events for Reverse Geocode Cache ---
+@app.on_event("startup")
+async def start_reverse_geocoder():
+    await reverse_geocoder.start()
+
+
+@app.on_event("shutdown")
+async def stop_reverse_geocoder():
+    await reverse_geocoder.stop()
+    logger.info("Reverse geocode cache persisted.")
+
+
+# --- Lifespan Events for Token Verifier ---
+@app.on_event("startup")
+async def start_token_verifier():
+    await token_verifier.start()
+
+
+@app.on_event("shutdown")
+async def stop_token_verifier():
+    await token_verifier.stop()
+
+
+def _idempotent_path(request: Request) -> Optional[str]:
+    """Path of a POST that honours Idempotency-Key, None for everything else."""
+    path = request.url.path
+    if request.method != "POST":
+        return None
+    if path in ("/submit-issue", "/submit-issue-multi") or (
+        path.startswith("/api/issues/") and path.endswith("/submit-fix")
+    ):
+        return path
+    return None
+
+
+@app.middleware("http")
+async def idempotency_middleware(request: Request, call_next):
+    # Registered before the auth middleware, so it runs after it and keys are
+    # scoped to the caller's uid. See idempotency.py.
+    key = request.headers.get("idempotency-key")
+    path = _idempotent_path(request)
+    user = getattr(request.state, "user", None)
+    if key is None or path is None or user is None:
+        return await call_next(request)
+    try:
+        key_id = idempotency_key_id(f"{user.get('uid')} {path}", key)
+    except IdempotencyKeyError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+
+    # The body is hashed as it streams through, to the handler or (for a replay,
+    # which never runs it) straight into the hash: it is never buffered here
+    body_fingerprint = BodyFingerprint(request.headers.get("content-type"))
+    receive = request._receive
+
+    async def fingerprinting_receive():
+        message = await receive()
+        if message["type"] == "http.request":
+            body_fingerprint.update(message.get("body", b""), message.get("more_body", False))
+        return message
+
+    request._receive = fingerprinting_receive
+
+    async def fingerprint() -> Optional[str]:
+        while not body_fingerprint.complete:
+            if (await fingerprinting_receive())["type"] == "http.disconnect":
+                return None
+        return body_fingerprint.hexdigest()
+
+    first_response: Dict[str, Any] = {}
+
+    async def run() -> StoredResponse:
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        first_response.update(body=body, headers=dict(response.headers))
+        return StoredResponse(
+            status_code=response.status_code,
+            body=body.decode("utf-8", errors="replace"),
+            media_type=response.headers.get("content-type"),
+            headers={"Location": response.headers["location"]} if "location" in response.headers else {},
+        )
+
+    try:
+        stored, replayed = await idempotency.execute(key_id, run, fingerprint=fingerprint)
+    except IdempotencyKeyMismatchError as e:
+        return JSONResponse(status_code=422, content={"detail": str(e)})
+    except IdempotencyInProgressError as e:
+        return JSONResponse(status_code=409, content={"detail": str(e)}, headers={"Retry-After": "5"})
+    if replayed:
+        logger.info(f"Replaying {path} for Idempotency-Key {key[:40]}")
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type=stored.media_type,
+            headers={**stored.headers, "Idempotent-Replayed": "true"},
+        )
+    return Response(content=first_response["body"], status_code=stored.status_code, headers=first_response["headers"])
+
+
 @app.middleware("http")
 async def verify_firebase_token_middleware(request: Request, call_next):
     # --- NEW ---
@@ -214,6 +473,7 @@ async def verify_firebase_token_middleware(request: Request, call_next):
         "/api/issues",
         "/issues/",
         "/issues/latest",
+        "/metrics",
         "/favicon.ico",  # Keep if you added it
     ]
     if request.url.path in public_paths or request.method == "OPTIONS":
@@ -231,25 +491,20 @@ async def verify_firebase_token_middleware(request: Request, call_next):
         logger.warning(f"Missing/invalid Auth header for: {request.url.path}")
         raise HTTPException(401, "Missing/invalid auth token")
     id_token = auth_header.split("Bearer ")[1]
-    decoded_token = None
     try:
-        # --- The verify_id_token call is likely correct ---
-        decoded_token = auth.verify_id_token(id_token, check_revoked=True)
+        # Signature/claims are checked locally against cached Google keys; revocation
+        # and disabled status come from the verifier's background refresh.
+        decoded_token = await token_verifier.verify(id_token)
         request.state.user = decoded_token
-        logger.info(f"Token OK for UID: {decoded_token.get('uid')}")
+        logger.debug(f"Token OK for UID: {decoded_token.get('uid')}")
 
-    # --- CORRECTED Exception Handling ---
-    except auth.RevokedIdTokenError:  # Catch directly from auth
-        logger.warning(
-            f"Token revoked for UID: {decoded_token.get('uid') if decoded_token else 'unknown'}"
-        )
+    except TokenRevokedError as e:
+        logger.warning(f"Token revoked: {e}")
         raise HTTPException(status_code=401, detail="Token has been revoked.")
-    except auth.UserDisabledError:  # Catch directly from auth
-        logger.warning(
-            f"User disabled for UID: {decoded_token.get('uid') if decoded_token else 'unknown'}"
-        )
+    except TokenUserDisabledError as e:
+        logger.warning(f"User disabled: {e}")
         raise HTTPException(status_code=403, detail="User account disabled.")
-    except (ValueError, auth.InvalidIdTokenError) as e:  # Catch directly from auth
+    except TokenVerificationError as e:
         logger.error(f"Invalid token: {e}")
         raise HTTPException(status_code=401, detail="Invalid authentication token.")
     except Exception as e:  # General catch-all
@@ -263,6 +518,66 @@ async def verify_firebase_token_middleware(request: Request, call_next):
     return response
 
 
+def _max_request_bytes(path: str) -> Optional[int]:
+    """Upper bound on the request body for upload endpoints, None for everything else."""
+    if path == "/submit-issue":
+        return MAX_IMAGE_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    if path == "/submit-issue-multi" or (
+        path.startswith("/api/issues/") and path.endswith("/submit-fix")
+    ):
+        return MAX_IMAGE_UPLOAD_BYTES * MAX_FILES_PER_SUBMISSION + MULTIPART_OVERHEAD_BYTES
+    return None
+
+
+@app.middleware("http")
+async def limit_upload_size_middleware(request: Request, call_next):
+    # Registered after the auth middleware, so it runs first: oversized uploads are
+    # rejected from the Content-Length header before any of the body is read.
+    limit = _max_request_bytes(request.url.path)
+    if limit is None:
+        return await call_next(request)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > limit:
+            logger.warning(
+                f"Rejecting {request.url.path}: Content-Length {content_length} > {limit}"
+            )
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Request body too large (limit {limit} bytes)"},
+            )
+
+    # Chunked bodies (or a lying Content-Length) are counted as they are read;
+    # every downstream read of the body goes through this receive. Past the
+    # limit the body ends as if the client had gone, and the handler's answer
+    # to that truncated body is replaced by the 413.
+    receive = request._receive
+    received = 0
+
+    async def limited_receive():
+        nonlocal received
+        if received > limit:
+            return {"type": "http.disconnect"}
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                return {"type": "http.disconnect"}
+        return message
+
+    request._receive = limited_receive
+    response = await call_next(request)
+    if received <= limit:
+        return response
+    async for _ in response.body_iterator:
+        pass
+    logger.warning(f"Rejecting {request.url.path}: body exceeded {limit} bytes")
+    return JSONResponse(
+        status_code=413,
+        content={"detail": f"Request body too large (limit {limit} bytes)"},
+    )
+
+
 # --- NEW: Dependency Functions (Copied from our previous discussion) ---
 async def get_current_user(request: Request) -> dict:
     user = getattr(request.state, "user", None)
@@ -309,61 +624,190 @@ try:
 except Exception as gcs_err:
     logger.error(f"✗ GCS client initialization failed: {gcs_err}", exc_info=True)
     storage_client = None
+# Concurrent, off-loop uploads to GCS (or a local directory when UPLOAD_BACKEND=local)
+upload_pipeline = build_upload_pipeline(storage_client, BUCKET_NAME)
+# WebP thumb/medium variants of issue photos, rendered in a process pool
+derivative_generator = DerivativeGenerator()
+# Analyzer results of recent submissions, keyed by photo hash + description + labels
+analysis_cache = AnalysisResultCache()
+# Identical concurrent ES searches/counts share one call (es_search, es_count)
+es_single_flight = SingleFlight()
+# Public feed responses (/issues/latest, /api/issues); dropped on our own issue writes
+feed_cache = ResponseCache()
+# /api/map-tiles responses per (tile, filter set); dropped per tile on issue writes
+map_tiles = MapTileCache()
+# dHashes of recent issue photos by geohash cell, for attaching near-duplicate reports
+near_duplicates = NearDuplicateIndex()
+near_duplicates_warmup: Optional[asyncio.Task] = None
+
+
+async def persist_job(job: Dict[str, Any]) -> None:
+    if store:
+        await store.save_job(job)
+
+
+def issues_changed(location: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Drop cached responses an issue write may have changed: the public feeds,
+    and the map tiles containing the issue ({"lat", "lon"}), or every map tile
+    when its location is unknown.
+    """
+    feed_cache.invalidate()
+    try:
+        map_tiles.invalidate_point(float(location["lat"]), float(location["lon"]))
+    except (TypeError, KeyError, ValueError):
+        map_tiles.invalidate_all()
+
+
+# Background analyzer jobs for `Prefer: respond-async` submissions
+job_queue = JobQueue(persist=persist_job)
+# Idempotency-Key results for the submission endpoints, shared via Firestore
+idempotency = IdempotencyManager(backend=store)
+# Per-stage timings of the submission pipelines (see pipeline.py)
+pipeline_metrics = PipelineMetrics()
 geolocator = Nominatim(user_agent="civicfix_backend_app_v6")
+# Shared so forward and reverse lookups together stay within Nominatim's 1 req/s policy
+nominatim_throttle = NominatimThrottle()
+# Offline gazetteer answers first; Nominatim is only the fallback for uncovered areas
+reverse_geocoder = ReverseGeocodeCache(
+    geolocator, throttle=nominatim_throttle, gazetteer=load_gazetteer()
+)
+forward_geocoder = ForwardGeocodeCache(geolocator, throttle=nominatim_throttle)
 
 
-def geocode_location(location_text: str) -> Optional[Dict]:
+async def geocode_location(location_text: str) -> Optional[Dict]:
     """
-    Attempts to geocode an address string with fallbacks if the initial attempt fails.
+    Geocodes an address string through the forward geocode cache, racing
+    fallback variants if the full address does not resolve.
     Returns: Dict with 'latitude', 'longitude', 'address', and 'timestamp' or None.
+    Raises 503 if the geocoding service failed, so the client retries rather
+    than treating the address as invalid.
     """
-    if not location_text:
+    try:
+        geo_result = await forward_geocoder.geocode(location_text)
+    except GeocoderUnavailableError as e:
+        logger.warning(str(e))
+        raise HTTPException(503, "Geocoding service unavailable, please retry")
+    if not geo_result:
         return None
+    # The timestamp marks the submission, so it is never served from the cache
+    geo_result["timestamp"] = datetime.utcnow().isoformat() + "Z"
+    return geo_result
 
-    # 1. First attempt: Use the full address
-    try_addresses = [location_text]
 
-    # 2. Second attempt: Remove any possible postal code (last segment if it's numeric)
-    parts = location_text.split(",")
-    if parts and parts[-1].strip().isdigit():
-        simplified_addr = ",".join(parts[:-1]).strip()
-        if simplified_addr:
-            try_addresses.append(simplified_addr)
+def _valid_coordinates(latitude: Optional[float], longitude: Optional[float]) -> bool:
+    return (
+        latitude is not None
+        and longitude is not None
+        and -90.0 <= latitude <= 90.0
+        and -180.0 <= longitude <= 180.0
+    )
 
-    # 3. Third attempt: Use the last two known parts (often city/state or major locality)
-    if len(parts) >= 2:
-        last_two_parts = ",".join([parts[-2].strip(), parts[-1].strip()])
-        if last_two_parts not in try_addresses and last_two_parts != location_text:
-            try_addresses.append(last_two_parts)
 
-    # Use a set to maintain order but prevent duplicates
-    unique_attempts = list(dict.fromkeys(try_addresses))
+async def resolve_submission_location(
+    latitude: Optional[float],
+    longitude: Optional[float],
+    image: Optional[Union[bytes, BinaryIO]],
+    location_text: Optional[str],
+    exif_coords: Optional[Tuple[float, float]] = None,
+) -> Optional[Dict]:
+    """
+    Pick coordinates for a submission, cheapest source first:
+    1. device GPS sent by the client, 2. EXIF GPS in the photo,
+    3. forward geocoding of the location text (last resort, hits Nominatim).
+    Pass `exif_coords` if the caller already read them; otherwise they are
+    read from `image`.
+    Returns: Dict with 'latitude', 'longitude', 'timestamp' and 'source' or None.
+    """
+    timestamp = datetime.utcnow().isoformat() + "Z"
+
+    if _valid_coordinates(latitude, longitude):
+        logger.info(f"Using device coordinates ({latitude}, {longitude})")
+        return {"latitude": latitude, "longitude": longitude, "timestamp": timestamp, "source": "device"}
+    if latitude is not None or longitude is not None:
+        logger.warning(f"Ignoring invalid device coordinates: lat={latitude}, lon={longitude}")
+
+    if exif_coords is None and image is not None:
+        # Reads only the photo's headers, even from a spooled upload
+        exif_coords = await asyncio.to_thread(extract_gps_coordinates, image)
+    if exif_coords:
+        logger.info(f"Using EXIF GPS coordinates {exif_coords}")
+        return {
+            "latitude": exif_coords[0],
+            "longitude": exif_coords[1],
+            "timestamp": timestamp,
+            "source": "exif",
+        }
 
-    for attempt_addr in unique_attempts:
-        logger.info(f"Attempting to geocode address: '{attempt_addr}'")
-        try:
-            # Assuming 'geolocator' is a global or imported object from geopy.geocoders
-            geo_result = geolocator.geocode(attempt_addr, exactly_one=True, timeout=5)
+    if location_text:
+        geocoded = await geocode_location(location_text)
+        if geocoded:
+            geocoded["source"] = "geocoded"
+            return geocoded
 
-            if geo_result:
-                # Log success and return data
-                logger.info(
-                    f"Geocode OK for '{attempt_addr}': ({geo_result.latitude}, {geo_result.longitude})"
+    return None
+
+
+async def upload_with_variants(item: UploadItem) -> Tuple[UploadResult, Dict[str, str]]:
+    """
+    Upload an issue photo and, in parallel, render and upload its WebP variants
+    next to it. Variants are best effort: on any failure they are just omitted.
+    Returns (original upload result, {variant name: url}).
+
+    For content-addressed items already in storage nothing is rendered or
+    uploaded; the stored variants are looked up instead.
+    """
+    if item.skip_if_exists:
+        existing_url = await upload_pipeline.existing_url(item.object_name)
+        if existing_url:
+            names = list(DERIVATIVE_SIZES)
+            urls = await asyncio.gather(
+                *(upload_pipeline.existing_url(variant_object_name(item.object_name, name)) for name in names)
+            )
+            upload_pipeline.metrics["dedup_hits"] += 1
+            upload_pipeline.metrics["dedup_bytes_skipped"] += item.size
+            existing = UploadResult(
+                index=0, filename=item.filename, object_name=item.object_name, url=existing_url, existed=True
+            )
+            return existing, {name: url for name, url in zip(names, urls) if url}
+        # Known to be absent: skip the pipeline's own existence check
+        item = dataclasses.replace(item, skip_if_exists=False)
+
+    # The worker process gets its own copy, so the original upload can read the source concurrently
+    snapshot = await derivative_generator.snapshot(item.source)
+
+    async def _variants() -> Dict[str, str]:
+        if not snapshot:
+            return {}
+        rendered = await derivative_generator.render(snapshot)
+        names = list(rendered)
+        results = await upload_pipeline.upload_many(
+            [
+                UploadItem(
+                    object_name=variant_object_name(item.object_name, name),
+                    source=rendered[name],
+                    content_type="image/webp",
+                    filename=f"{name}.webp",
                 )
-                return {
-                    "latitude": geo_result.latitude,
-                    "longitude": geo_result.longitude,
-                    "address": geo_result.address,
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
-            else:
-                logger.warning(f"Geocode attempt failed for: '{attempt_addr}'.")
+                for name in names
+            ]
+        )
+        return {name: r.url for name, r in zip(names, results) if r.ok}
 
-        except Exception as e:
-            logger.warning(f"Geocode service error for '{attempt_addr}': {e}")
-            continue
+    original, photo_variants = await asyncio.gather(
+        upload_pipeline.upload_one(item), _variants()
+    )
+    return original, (photo_variants if original.ok else {})
 
-    return None
+
+def upload_size(file: UploadFile, max_bytes: int) -> int:
+    """Size of a parsed upload (spooled to disk above 1 MB); 413 if it exceeds max_bytes."""
+    size = file.size if file.size is not None else stream_size(file.file)
+    if size > max_bytes:
+        raise HTTPException(
+            413, f"File '{file.filename}' is {size} bytes; the limit is {max_bytes} bytes"
+        )
+    return size
 
 
 # --- API Endpoints ---
@@ -391,28 +835,31 @@ async def root():
     }
 
 
-@app.get("/api/issues")
-async def get_all_issues(
-    user: Optional[dict] = Depends(get_optional_user),
-    # --- ADD Query Parameters ---
-    latitude: Optional[float] = Query(
-        None, description="User's latitude for nearby filtering"
-    ),
-    longitude: Optional[float] = Query(
-        None, description="User's longitude for nearby filtering"
-    ),
-    radius_km: float = Query(
-        5.0, description="Search radius in kilometers for nearby filtering", gt=0
-    ),  # Default 5km, must be > 0
-    # --- END ADD ---
-):
-    if user:
-        logger.info(f"User {user.get('uid')} fetching issues.")
-    else:
-        logger.info("Anon user fetching issues.")
-    if not es_client:
-        raise HTTPException(503, "DB unavailable")
+@app.get("/metrics")
+async def get_metrics():
+    """Cache and latency counters for the gateway's in-process subsystems."""
+    return {
+        "reverse_geocode": reverse_geocoder.stats(),
+        "forward_geocode": forward_geocoder.stats(),
+        "token_verification": token_verifier.stats(),
+        "user_profiles": user_profiles.stats(),
+        "idempotency": idempotency.stats(),
+        "uploads": upload_pipeline.stats() if upload_pipeline else None,
+        "image_derivatives": derivative_generator.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "feed_cache": feed_cache.stats(),
+        "map_tiles": map_tiles.stats(),
+        "es_single_flight": es_single_flight.stats(),
+        "near_duplicates": near_duplicates.stats(),
+        "jobs": job_queue.stats(),
+        "pipelines": pipeline_metrics.stats(),
+    }
+
 
+async def fetch_all_issues(
+    latitude: Optional[float], longitude: Optional[float], radius_km: float
+) -> Dict[str, Any]:
+    """The /api/issues response; identical for every caller, so it is cached in feed_cache."""
     logger.info("Fetching issues...")
     issues_with_address = []
     try:
@@ -466,7 +913,7 @@ async def get_all_issues(
             es_query_body["query"] = {"match_all": {}}
         # --- END DYNAMIC QUERY BUILD ---
 
-        response = await es_client.search(
+        response = await es_search(
             index="issues",
             body=es_query_body,  # Use the dynamically built body
             request_timeout=45,
@@ -474,9 +921,12 @@ async def get_all_issues(
 
         logger.info(f"ES returned {len(response['hits']['hits'])} issues.")
 
-        # --- Process hits, add distance, and perform reverse geocoding with cache ---
+        # --- Process hits, add distance, and attach display addresses ---
+        # Addresses are stored on the document at ingest (or by the backfill job).
+        # Documents still missing one are answered from the local cache/gazetteer
+        # only, so this read path never calls out to a geocoder.
         processed_count = 0
-        cache_hits = 0  # Track cache hits
+        stored_addresses = 0
 
         # Extract only the _source documents first
         issues_source = [hit["_source"] for hit in response["hits"]["hits"]]
@@ -497,74 +947,27 @@ async def get_all_issues(
                     if isinstance(current_sort[0], (float, int)):
                         issue_copy["distance_km"] = round(current_sort[0], 2)
 
-            # --- Reverse Geocoding Logic with Cache ---
-            display_address = "Address lookup failed"
-            location = issue.get("location")
-
-            if isinstance(location, dict) and "lat" in location and "lon" in location:
-                lat, lon = location.get("lat"), location.get("lon")
-                if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
-
-                    # --- CACHE LOGIC ---
-                    cache_key = (
-                        f"{lat:.6f},{lon:.6f}"  # Create a key with fixed precision
-                    )
-
-                    if cache_key in geocode_cache:
-                        display_address = geocode_cache[cache_key]
-                        cache_hits += 1
+            display_address = issue.get("display_address")
+            if display_address:
+                stored_addresses += 1
+            else:
+                location = issue.get("location")
+                if isinstance(location, dict) and "lat" in location and "lon" in location:
+                    lat, lon = location.get("lat"), location.get("lon")
+                    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+                        display_address = (
+                            reverse_geocoder.lookup_local(lat, lon) or ADDRESS_PENDING
+                        )
                     else:
-                        # --- Original Geocoding Logic (if not in cache) ---
-                        try:
-                            # Assuming geolocator is initialized globally
-                            geo_result = geolocator.reverse(
-                                f"{lat}, {lon}",
-                                exactly_one=True,
-                                timeout=5,
-                                language="en",
-                            )
-                            if geo_result and geo_result.address:
-                                address_parts = geo_result.address.split(",")
-                                if len(address_parts) >= 3:
-                                    resolved_address = f"{address_parts[0].strip()}, {address_parts[1].strip()}, {address_parts[-2].strip()}"
-                                else:
-                                    resolved_address = geo_result.address
-                                display_address = (
-                                    resolved_address  # Assign resolved address
-                                )
-                            else:
-                                display_address = (
-                                    "Address not found"  # Specific failure message
-                                )
-                                logger.warning(f"RevGeocode ({lat},{lon}) no result.")
-
-                        except (GeocoderTimedOut, GeocoderServiceError) as geo_e:
-                            display_address = "Address lookup timeout/error"  # Specific failure message
-                            logger.warning(
-                                f"RevGeocode failed for ({lat},{lon}): {geo_e}"
-                            )
-                        except Exception as e:
-                            display_address = (
-                                "Address lookup error"  # Specific failure message
-                            )
-                            logger.exception(
-                                f"Unexpected error during reverse geocoding for ({lat},{lon})"
-                            )
-                        # --- Store result (or failure message) in cache ---
-                        geocode_cache[cache_key] = display_address
-                    # --- END CACHE LOGIC ---
-
+                        display_address = "Invalid coordinates"
+                        logger.warning(
+                            f"Invalid coordinates for issue {issue.get('issue_id', 'N/A')}: lat={lat}, lon={lon}"
+                        )
                 else:
-                    display_address = "Invalid coordinates"
+                    display_address = "Missing coordinates"
                     logger.warning(
-                        f"Skipping geocoding for invalid coordinates: lat={lat}, lon={lon}"
+                        f"Issue {issue.get('issue_id', 'N/A')} has missing/invalid location: {location}"
                     )
-            else:
-                display_address = "Missing coordinates"
-                logger.warning(
-                    f"Skipping geocoding for issue {issue.get('issue_id', 'N/A')} due to missing/invalid location: {location}"
-                )
-            # --- End Reverse Geocoding ---
 
             issue_copy["display_address"] = display_address
             issues_with_address.append(issue_copy)
@@ -572,7 +975,7 @@ async def get_all_issues(
         # --- End processing loop ---
 
         logger.info(
-            f"Finished processing {processed_count} issues. Cache hits: {cache_hits}/{processed_count}."
+            f"Finished processing {processed_count} issues. Stored addresses: {stored_addresses}/{processed_count}."
             + (
                 f" Filtered near ({latitude}, {longitude})"
                 if latitude is not None
@@ -584,11 +987,202 @@ async def get_all_issues(
     except NotFoundError:
         logger.warning("Issues index not found.")
         return {"issues": []}
+
+
+@app.get("/api/issues")
+async def get_all_issues(
+    user: Optional[dict] = Depends(get_optional_user),
+    # --- ADD Query Parameters ---
+    latitude: Optional[float] = Query(
+        None, description="User's latitude for nearby filtering"
+    ),
+    longitude: Optional[float] = Query(
+        None, description="User's longitude for nearby filtering"
+    ),
+    radius_km: float = Query(
+        5.0, description="Search radius in kilometers for nearby filtering", gt=0
+    ),  # Default 5km, must be > 0
+    # --- END ADD ---
+):
+    if user:
+        logger.info(f"User {user.get('uid')} fetching issues.")
+    else:
+        logger.info("Anon user fetching issues.")
+    if not es_client:
+        raise HTTPException(503, "DB unavailable")
+
+    # Same response for every caller: coordinates are rounded to ~10 m so nearby
+    # callers share an entry, and a burst of requests costs one ES query.
+    if latitude is not None and longitude is not None:
+        latitude, longitude = round(latitude, FEED_CACHE_COORD_DECIMALS), round(longitude, FEED_CACHE_COORD_DECIMALS)
+    key = ("api_issues", latitude, longitude, radius_km)
+    try:
+        return await feed_cache.get_or_compute(
+            key, lambda: fetch_all_issues(latitude, longitude, radius_km)
+        )
     except Exception as e:
         logger.exception("Failed severely during fetch/process issues")
         raise HTTPException(500, f"Database query or processing failed: {e}")
 
 
+NEARBY_ISSUE_FIELDS = [
+    "issue_id",
+    "location",
+    "description",
+    "issue_types",
+    "severity_score",
+    "status",
+    "created_at",
+    "photo_url",
+    "photo_variants",
+    "upvotes",
+    "impact_score",
+    "detected_issues",
+    "uploader_display_name",
+    "reported_by",
+    "display_address",
+]
+
+
+async def search_nearby_issues(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: int,
+    skip: int,
+    days_back: int,
+    cursor: Optional[str],
+    snapshot: bool,
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    """
+    One page of issues near a location, sorted by distance then recency.
+    Returns (issues with distance_km, total hits, next cursor or None).
+
+    With a cursor the page continues after the previous one via search_after;
+    `skip` is only honoured without one (legacy offset paging). `snapshot`
+    pins the first page and every page after it to a point-in-time.
+    """
+    # Snapped like /api/issues, so callers in the same ~11 m cell send identical
+    # queries and es_search can coalesce them
+    latitude, longitude = round(latitude, FEED_CACHE_COORD_DECIMALS), round(longitude, FEED_CACHE_COORD_DECIMALS)
+    fingerprint = query_fingerprint(latitude, longitude, radius_km, days_back)
+    try:
+        after = decode_cursor(cursor, fingerprint) if cursor else None
+    except FeedCursorError as e:
+        raise HTTPException(400, str(e))
+
+    if after:
+        since = after.since
+    else:
+        # Whole minutes, for the same reason: a microsecond cutoff makes every query unique
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        since = (now - timedelta(days=days_back)).isoformat()
+    pit_id = after.pit_id if after else None
+    if snapshot and not after:
+        pit = await es_client.open_point_in_time(index="issues", keep_alive=FEED_PIT_KEEP_ALIVE)
+        pit_id = pit["id"]
+
+    query: Dict[str, Any] = {
+        "size": limit,
+        "query": {
+            "bool": {
+                "must": [{"range": {"created_at": {"gte": since}}}],
+                "filter": [
+                    {
+                        "geo_distance": {
+                            "distance": f"{radius_km}km",
+                            "location": {"lat": latitude, "lon": longitude},
+                        }
+                    }
+                ],
+            }
+        },
+        "sort": [
+            {
+                "_geo_distance": {
+                    "location": {"lat": latitude, "lon": longitude},
+                    "order": "asc",
+                    "unit": "km",
+                }
+            },
+            {"created_at": {"order": "desc"}},
+        ],
+        "_source": NEARBY_ISSUE_FIELDS,
+    }
+    if pit_id:
+        # The PIT adds its own _shard_doc tie-breaker
+        query["pit"] = {"id": pit_id, "keep_alive": FEED_PIT_KEEP_ALIVE}
+    else:
+        # Unique tie-breaker, so search_after never skips or repeats hits with equal sort values
+        query["sort"].append({"issue_id": {"order": "asc"}})
+    if after:
+        query["search_after"] = after.search_after
+    else:
+        query["from"] = skip
+
+    try:
+        if pit_id:
+            response = await es_search(body=query, request_timeout=45)
+        else:
+            response = await es_search(index="issues", body=query, request_timeout=45)
+    except NotFoundError as e:
+        if pit_id:
+            raise HTTPException(410, "Feed snapshot expired; reload the feed")
+        raise
+
+    hits = response["hits"]["hits"]
+    issues = []
+    for hit in hits:
+        issue_data = hit["_source"]
+        if hit.get("sort"):
+            issue_data["distance_km"] = hit["sort"][0]
+        issues.append(issue_data)
+
+    next_cursor = None
+    pit_id = response.get("pit_id", pit_id)
+    if len(hits) == limit and hits[-1].get("sort"):
+        next_cursor = encode_cursor(
+            FeedCursor(search_after=hits[-1]["sort"], since=since, pit_id=pit_id), fingerprint
+        )
+    elif pit_id:
+        # Last page: release the snapshot now instead of waiting for keep_alive
+        await close_point_in_time(pit_id)
+    return issues, response["hits"]["total"]["value"], next_cursor
+
+
+async def es_search(**params) -> Dict[str, Any]:
+    """es_client.search; identical concurrent searches share one ES call (see single_flight.py)."""
+    return await _es_single_flight("search", params)
+
+
+async def es_search_mvt(**params) -> bytes:
+    """es_client.search_mvt; the body is the binary vector tile."""
+    return await _es_single_flight("search_mvt", params)
+
+
+async def es_count(**params) -> Dict[str, Any]:
+    """es_client.count; identical concurrent counts share one ES call."""
+    return await _es_single_flight("count", params)
+
+
+async def _es_single_flight(operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    # request_timeout does not change the result, so it is not part of the key
+    key = request_key(operation, {k: v for k, v in params.items() if k != "request_timeout"})
+
+    async def call() -> Dict[str, Any]:
+        response = await getattr(es_client, operation)(**params)
+        return response.body
+
+    return await es_single_flight.do(key, call)
+
+
+async def close_point_in_time(pit_id: str) -> None:
+    try:
+        await es_client.close_point_in_time(id=pit_id)
+    except Exception as e:
+        logger.debug(f"Could not close PIT: {e}")
+
+
 # BETTER TO USE FOR HEATMAP---->>> IT HAS COORDINATES AND MORE FILTERS
 @app.get("/issues/")
 async def get_issues(
@@ -598,6 +1192,8 @@ async def get_issues(
     limit: int = 10,
     skip: int = 0,
     days_back: int = 30,
+    cursor: Optional[str] = None,
+    snapshot: bool = False,
     user: Optional[dict] = Depends(get_optional_user),
 ):
     """
@@ -607,72 +1203,18 @@ async def get_issues(
         longitude: Location longitude
         radius_km: Search radius in kilometers (default 5km)
         limit: Maximum number of results (default 10)
-        skip: Number of results to skip for pagination (default 0)
+        skip: Number of results to skip, without a cursor (default 0; prefer cursor)
         days_back: Only include issues from last N days (default 30)
+        cursor: `next_cursor` of the previous page
+        snapshot: Serve this page and the following ones from a point-in-time snapshot
     """
     if not es_client:
         raise HTTPException(503, "DB unavailable")
 
     try:
-        date_threshold = (
-            datetime.now(timezone.utc) - timedelta(days=days_back)
-        ).isoformat()
-
-        query = {
-            "size": limit,
-            "from": skip,  # Add pagination support
-            "query": {
-                "bool": {
-                    "must": [{"range": {"created_at": {"gte": date_threshold}}}],
-                    "filter": [
-                        {
-                            "geo_distance": {
-                                "distance": f"{radius_km}km",
-                                "location": {"lat": latitude, "lon": longitude},
-                            }
-                        }
-                    ],
-                }
-            },
-            "sort": [
-                {
-                    "_geo_distance": {
-                        "location": {"lat": latitude, "lon": longitude},
-                        "order": "asc",
-                        "unit": "km",
-                    }
-                },
-                {"created_at": {"order": "desc"}},
-            ],
-            "_source": [
-                "issue_id",
-                "location",
-                "description",
-                "issue_types",
-                "severity_score",
-                "status",
-                "created_at",
-                "photo_url",
-                "upvotes",
-                "impact_score",
-                "detected_issues",
-                "uploader_display_name",
-                "reported_by",
-            ],
-        }
-
-        response = await es_client.search(
-            index="issues", body=query, request_timeout=45
+        issues, total_hits, next_cursor = await search_nearby_issues(
+            latitude, longitude, radius_km, limit, skip, days_back, cursor, snapshot
         )
-        issues = []
-
-        for hit in response["hits"]["hits"]:
-            issue_data = hit["_source"]
-            if hit.get("sort"):
-                issue_data["distance_km"] = hit["sort"][0]
-            issues.append(issue_data)
-
-        total_hits = response["hits"]["total"]["value"]
 
         logger.info(
             f"Found {len(issues)} issues near ({latitude}, {longitude}) within {radius_km}km (skip={skip}, total={total_hits})"
@@ -683,9 +1225,12 @@ async def get_issues(
             "count": len(issues),
             "total": total_hits,  # Total available results
             "skip": skip,
+            "next_cursor": next_cursor,
             "issues": issues,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Failed to retrieve nearby issues from Elasticsearch")
         raise HTTPException(500, "Internal server error")
@@ -699,6 +1244,8 @@ async def get_issues_with_user_status(
     limit: int = 10,
     skip: int = 0,
     days_back: int = 30,
+    cursor: Optional[str] = None,
+    snapshot: bool = False,
     user: dict = Depends(get_current_user),  # Requires authentication
 ):
     """
@@ -710,8 +1257,10 @@ async def get_issues_with_user_status(
         longitude: Location longitude
         radius_km: Search radius in kilometers (default 5km)
         limit: Maximum number of results (default 10)
-        skip: Number of results to skip for pagination (default 0)
+        skip: Number of results to skip, without a cursor (default 0; prefer cursor)
         days_back: Only include issues from last N days (default 30)
+        cursor: `next_cursor` of the previous page
+        snapshot: Serve this page and the following ones from a point-in-time snapshot
 
     Returns:
         Issues with embedded user status (hasUpvoted, hasReported) for each issue
@@ -728,68 +1277,10 @@ async def get_issues_with_user_status(
 
     try:
         # 1. Fetch issues from Elasticsearch (same as /issues/ endpoint)
-        date_threshold = (
-            datetime.now(timezone.utc) - timedelta(days=days_back)
-        ).isoformat()
-
-        query = {
-            "size": limit,
-            "from": skip,
-            "query": {
-                "bool": {
-                    "must": [{"range": {"created_at": {"gte": date_threshold}}}],
-                    "filter": [
-                        {
-                            "geo_distance": {
-                                "distance": f"{radius_km}km",
-                                "location": {"lat": latitude, "lon": longitude},
-                            }
-                        }
-                    ],
-                }
-            },
-            "sort": [
-                {
-                    "_geo_distance": {
-                        "location": {"lat": latitude, "lon": longitude},
-                        "order": "asc",
-                        "unit": "km",
-                    }
-                },
-                {"created_at": {"order": "desc"}},
-            ],
-            "_source": [
-                "issue_id",
-                "location",
-                "description",
-                "issue_types",
-                "severity_score",
-                "status",
-                "created_at",
-                "photo_url",
-                "upvotes",
-                "impact_score",
-                "detected_issues",
-                "uploader_display_name",
-                "reported_by",
-            ],
-        }
-
-        response = await es_client.search(
-            index="issues", body=query, request_timeout=45
+        issues, total_hits, next_cursor = await search_nearby_issues(
+            latitude, longitude, radius_km, limit, skip, days_back, cursor, snapshot
         )
-
-        issues = []
-        issue_ids = []
-
-        for hit in response["hits"]["hits"]:
-            issue_data = hit["_source"]
-            if hit.get("sort"):
-                issue_data["distance_km"] = hit["sort"][0]
-            issues.append(issue_data)
-            issue_ids.append(issue_data["issue_id"])
-
-        total_hits = response["hits"]["total"]["value"]
+        issue_ids = [issue["issue_id"] for issue in issues]
 
         # 2. Batch fetch upvote and report status from Firestore
         upvote_status = {}
@@ -797,42 +1288,10 @@ async def get_issues_with_user_status(
 
         if issue_ids:
             try:
-                # Build document IDs for all issues
-                upvote_doc_ids = [f"{issue_id}__{user_uid}" for issue_id in issue_ids]
-                report_doc_ids = [f"{issue_id}__{user_uid}" for issue_id in issue_ids]
-
-                # Batch fetch upvotes
-                upvote_refs = [
-                    db.collection("upvotes").document(doc_id)
-                    for doc_id in upvote_doc_ids
-                ]
-
-                # Batch fetch reports
-                report_refs = [
-                    db.collection("reports").document(doc_id)
-                    for doc_id in report_doc_ids
-                ]
-
-                # Get all documents in two batch operations
-                upvote_docs = db.get_all(upvote_refs)
-                report_docs = db.get_all(report_refs)
-
-                # Build status maps
-                for i, doc in enumerate(upvote_docs):
-                    issue_id = issue_ids[i]
-                    if doc.exists:
-                        upvote_data = doc.to_dict()
-                        upvote_status[issue_id] = upvote_data.get("isActive", False)
-                    else:
-                        upvote_status[issue_id] = False
-
-                for i, doc in enumerate(report_docs):
-                    issue_id = issue_ids[i]
-                    if doc.exists:
-                        report_data = doc.to_dict()
-                        report_status[issue_id] = report_data.get("isActive", False)
-                    else:
-                        report_status[issue_id] = False
+                # Two concurrent batch reads (upvotes + reports)
+                upvote_status, report_status = await store.get_interaction_status(
+                    user_uid, issue_ids
+                )
 
                 logger.info(f"Batch fetched status for {len(issue_ids)} issues")
             except Exception as firestore_err:
@@ -866,6 +1325,7 @@ async def get_issues_with_user_status(
             "count": len(issues_with_status),
             "total": total_hits,
             "skip": skip,
+            "next_cursor": next_cursor,
             "issues": issues_with_status,
         }
 
@@ -876,6 +1336,35 @@ async def get_issues_with_user_status(
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
 
+async def fetch_latest_issues(limit: int, days_back: Optional[int]) -> Dict[str, Any]:
+    """The /issues/latest response; identical for every caller, so it is cached in feed_cache."""
+    query = {
+        "size": limit,
+        "query": {"match_all": {}},
+        "sort": [{"created_at": {"order": "desc"}}],
+        "_source": NEARBY_ISSUE_FIELDS,
+    }
+
+    # Add date filter if days_back is specified
+    if days_back:
+        date_threshold = (
+            datetime.now(timezone.utc) - timedelta(days=days_back)
+        ).isoformat()
+        query["query"] = {"range": {"created_at": {"gte": date_threshold}}}
+
+    response = await es_search(
+        index="issues", body=query, request_timeout=45
+    )
+
+    issues = []
+    for hit in response["hits"]["hits"]:
+        issue_data = hit["_source"]
+        issues.append(issue_data)
+
+    logger.info(f"Retrieved {len(issues)} latest issues")
+    return {"count": len(issues), "issues": issues}
+
+
 @app.get("/issues/latest")
 async def get_latest_issues(
     limit: int = 10,
@@ -883,51 +1372,15 @@ async def get_latest_issues(
 ):
     """
     Get the latest issues sorted by reported time.
+    Served from the feed cache (short TTL, refreshed in the background).
     """
     if not es_client:
         raise HTTPException(503, "DB unavailable")
 
     try:
-        query = {
-            "size": limit,
-            "query": {"match_all": {}},
-            "sort": [{"created_at": {"order": "desc"}}],
-            "_source": [
-                "issue_id",
-                "location",
-                "description",
-                "issue_types",
-                "severity_score",
-                "status",
-                "created_at",
-                "photo_url",
-                "upvotes",
-                "impact_score",
-                "detected_issues",
-                "uploader_display_name",
-                "reported_by",
-            ],
-        }
-
-        # Add date filter if days_back is specified
-        if days_back:
-            date_threshold = (
-                datetime.now(timezone.utc) - timedelta(days=days_back)
-            ).isoformat()
-            query["query"] = {"range": {"created_at": {"gte": date_threshold}}}
-
-        response = await es_client.search(
-            index="issues", body=query, request_timeout=45
+        return await feed_cache.get_or_compute(
+            ("latest", limit, days_back or None), lambda: fetch_latest_issues(limit, days_back)
         )
-
-        issues = []
-        for hit in response["hits"]["hits"]:
-            issue_data = hit["_source"]
-            issues.append(issue_data)
-
-        logger.info(f"Retrieved {len(issues)} latest issues")
-        return {"count": len(issues), "issues": issues}
-
     except Exception as e:
         logger.exception("Failed to retrieve latest issues from Elasticsearch")
         raise HTTPException(500, "Internal server error")
@@ -935,16 +1388,29 @@ async def get_latest_issues(
 
 @app.post("/submit-issue")
 async def submit_issue(
+    request: Request,
     user: dict = Depends(get_current_user),  # Requires auth
     file: UploadFile = File(...),
-    locationstr: str = Form(...),
+    locationstr: Optional[str] = Form(None),
     description: str = Form(...),
     labels: List[str] = Form([]),
     is_anonymous: bool = Form(False),  
+    latitude: Optional[float] = Form(None),  # Device GPS, skips geocoding when present
+    longitude: Optional[float] = Form(None),
 ):
     """
     Submit a single issue report with image, location, and description.
     Used by the React Native mobile app.
+    Location comes from device GPS, then photo EXIF GPS, then `locationstr`.
+
+    The steps run as a stage graph (see pipeline.py): the upload, the
+    reporter's profile read and the address lookup overlap with each other
+    and with the analysis. Stage timings are returned in a Server-Timing
+    header.
+
+    With `Prefer: respond-async` the photo is uploaded, the analysis is queued
+    and the response is 202 with a job to poll (GET /jobs/{id}) or stream
+    (GET /jobs/{id}/events). Without it the request waits for the analyzer.
     """
     logger.info(f"User {user.get('uid')} submitting issue report")
 
@@ -954,209 +1420,708 @@ async def submit_issue(
     if not (file.content_type or "").startswith("image/"):
         raise HTTPException(400, "Only image files are supported")
 
-    # --- 2. Geocode Location ---
-    geocoded = geocode_location(locationstr)
-    if not geocoded:
-        raise HTTPException(400, f"Could not geocode location: '{locationstr}'")
+    # The photo stays in its spooled temp file and is streamed to storage
+    size = upload_size(file, MAX_IMAGE_UPLOAD_BYTES)
+    if not size:
+        raise HTTPException(400, "Empty file")
+    if not upload_pipeline:
+        raise HTTPException(500, "GCS bucket not configured")
+
+    respond_async = "respond-async" in request.headers.get("prefer", "").lower()
+    # Small enough photos go to the analyzer inline, so it need not wait for the upload
+    inline = not respond_async and size <= ANALYZER_INLINE_MAX_BYTES
+    device_gps = _valid_coordinates(latitude, longitude)
+    submission = {
+        "photo_variants": {},
+        "description": description,
+        "labels": labels,
+        "location_text": locationstr,
+        "is_anonymous": is_anonymous,
+        "reporter_id": "anonymous" if is_anonymous else user.get("uid", "anonymous_fallback"),
+        "email": user.get("email"),
+    }
+    pipeline = Pipeline("submit_issue", pipeline_metrics)
+
+    # --- 2. Photo: every read of file.file happens here, before the upload starts ---
+    async def photo(_):
+        # Content-addressed: a resubmitted photo maps to the same object and is not re-uploaded
+        image_sha256 = await asyncio.to_thread(content_sha256, file.file)
+        dhash = await asyncio.to_thread(photo_dhash, file.file)
+        exif_coords = None
+        if not device_gps:
+            # Reads only the photo's headers, even from a spooled upload
+            exif_coords = await asyncio.to_thread(extract_gps_coordinates, file.file)
+        item = UploadItem(
+            object_name=content_object_name("issues", image_sha256, file.filename),
+            source=file.file,
+            size=size,
+            content_type=file.content_type,
+            filename=file.filename,
+            skip_if_exists=True,
+        )
+        submission["image_sha256"] = image_sha256
+        submission["public_url"] = upload_pipeline.url_for(item.object_name)
+        submission["photo_dhash"] = format_dhash(dhash) if dhash is not None else None
+        image = None
+        if inline:
+            image = (file.filename or "photo", await asyncio.to_thread(read_stream, file.file), file.content_type)
+            # Object names are content-addressed, so the final URLs are known up front
+            submission["photo_variants"] = expected_variant_urls(item.object_name)
+        return {"item": item, "dhash": dhash, "exif_coords": exif_coords, "image": image}
+
+    # --- 3. Resolve Location (device GPS -> EXIF GPS -> geocoding) ---
+    async def location(results):
+        exif_coords = results["photo"]["exif_coords"] if "photo" in results else None
+        geocoded = await resolve_submission_location(
+            latitude, longitude, None, locationstr, exif_coords=exif_coords
+        )
+        if not geocoded:
+            if locationstr:
+                raise HTTPException(400, f"Could not geocode location: '{locationstr}'")
+            raise HTTPException(400, "No location provided: send latitude/longitude or locationstr")
+        submission["geocoded"] = geocoded
+        return geocoded
+
+    # --- 4. Upload the photo and its variants (overlaps everything after the hash) ---
+    async def upload(results):
+        item = results["photo"]["item"]
+        uploaded, photo_variants = await upload_with_variants(item)
+        if not uploaded.ok:
+            logger.warning(f"Upload of {item.object_name} failed ({uploaded.error}); retrying")
+            uploaded, photo_variants = await upload_with_variants(item)
+        if not uploaded.ok:
+            if inline:
+                # The analyzer may already be indexing the issue from the inline bytes:
+                # "publish" moves the upload to a job instead of failing the request
+                logger.error(f"Upload of {item.object_name} failed again: {uploaded.error}")
+                return None
+            raise HTTPException(500, f"GCS upload failed: {uploaded.error}")
+        logger.info(
+            f"GCS {'object already stored' if uploaded.existed else 'upload successful'}: "
+            f"{uploaded.url} (variants: {list(photo_variants)})"
+        )
+        if not inline:
+            # The analyzer downloads the photo, so it runs after this stage
+            submission["photo_variants"] = photo_variants
+        return photo_variants
+
+    # --- 5. Identical resubmission (analysis cache) or near-duplicate nearby: no analysis ---
+    async def shortcut(results):
+        geocoded = results["location"]
+        # Same reporter, photo, text and place only: anyone else's submission is a new report
+        submission["analysis_key"] = analysis_cache_key(
+            submission["image_sha256"],
+            description,
+            labels,
+            # The caller's uid even for anonymous reports, whose reporter_id is shared
+            user.get("uid") or submission["reporter_id"],
+            geocoded["latitude"],
+            geocoded["longitude"],
+        )
+        cached = analysis_cache.get(submission["analysis_key"])
+        if cached is not None:
+            logger.info(f"Analysis cache hit for {submission['public_url']}; returning the earlier result")
+            return cached
+        match = near_duplicates.find(
+            geocoded["latitude"], geocoded["longitude"], results["photo"]["dhash"], labels
+        )
+        if match:
+            return await attach_duplicate_report(match, submission)
+        return None
+
+    pipeline.stage("photo", photo)
+    pipeline.stage("location", location, deps=() if device_gps else ("photo",))
+    pipeline.stage("upload", upload, deps=("photo",))
+    pipeline.stage("shortcut", shortcut, deps=("photo", "location"))
+
+    if respond_async:
+        # --- 6a. Async mode: once the photo is stored, the analyzer step becomes a job ---
+        async def enqueue(results):
+            if results["shortcut"] is not None:
+                return None
+            try:
+                return await job_queue.submit("analyze_issue", submission, owner=user.get("uid"))
+            except JobQueueFullError:
+                raise HTTPException(503, "Too many submissions in progress, retry shortly")
+
+        pipeline.stage("enqueue", enqueue, deps=("shortcut", "upload"))
+    else:
+        # --- 6b. Sync mode: analysis (and karma), alongside the upload when the photo goes inline ---
+        gate_deps = ("shortcut", "photo") if inline else ("shortcut", "photo", "upload")
+        add_analysis_stages(pipeline, submission, location_deps=("location",), gate_deps=gate_deps)
+
+        async def publish(results):
+            analysis_result, fresh = results["analysis"]
+            if not inline:
+                return
+            if results["upload"] is None:
+                photo = results["photo"]
+                await schedule_photo_repair(analysis_result, submission, photo["item"], photo["image"][1])
+            elif fresh:
+                await reconcile_photo_variants(analysis_result, submission["photo_variants"], results["upload"])
+
+        pipeline.stage("publish", publish, deps=("upload", "analysis"))
 
-    # --- 3. Upload File to GCS ---
     try:
-        file_uuid = uuid.uuid4()
-        blob_name = f"issues/{uuid.uuid4()}_{file.filename or file_uuid}"
+        results = await pipeline.run()
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as http_err:
+        error_detail = f"Analysis error: {http_err.response.status_code}. {http_err.response.text}"
+        logger.error(error_detail)
+        try:
+            err_json = http_err.response.json()
+            error_detail = err_json.get("detail", error_detail)
+        except json.JSONDecodeError:
+            pass
+        raise HTTPException(502, f"Error from analysis service: {error_detail}")
+    except httpx.RequestError as e:
+        logger.exception("Analyzer connection failed")
+        raise HTTPException(502, f"Analysis connection error: {e}")
+    except Exception as e:
+        logger.exception("Unexpected error during analysis")
+        raise HTTPException(500, f"Analysis failed: {e}")
+
+    timing_headers = {"Server-Timing": pipeline.server_timing()}
+    if results["shortcut"] is not None:
+        body = submission_response(submission, results["shortcut"])
+    elif respond_async:
+        job = results["enqueue"]
+        logger.info(f"Queued analysis job {job.id} for {submission['public_url']}")
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": f"/jobs/{job.id}",
+                "events_url": f"/jobs/{job.id}/events",
+                "image_url": submission["public_url"],
+            },
+            headers={"Location": f"/jobs/{job.id}", **timing_headers},
+        )
+    else:
+        body = submission_response(submission, results["analysis"][0])
+    return JSONResponse(content=body, headers=timing_headers)
 
-        data = await file.read()
-        if not data:
-            raise HTTPException(400, "Empty file")
 
-        if not BUCKET_NAME:
-            raise HTTPException(500, "GCS bucket not configured")
+def add_analysis_stages(
+    pipeline: Pipeline,
+    submission: Dict[str, Any],
+    location_deps: Tuple[str, ...] = (),
+    gate_deps: Tuple[str, ...] = (),
+) -> None:
+    """
+    Add the analysis half of a submission to `pipeline`:
 
-        bucket = storage_client.bucket(BUCKET_NAME)
-        blob = bucket.blob(blob_name)
-        blob.upload_from_string(data, content_type=file.content_type)
+        profile ----------+--> analysis --> karma
+        address (location)+
 
-        public_url = f"https://storage.googleapis.com/{BUCKET_NAME}/{blob_name}"
-        logger.info(f"GCS upload successful: {public_url}")
-    except Exception as gcs_err:
-        logger.exception("GCS upload failed")
-        raise HTTPException(500, f"GCS upload failed: {gcs_err}")
+    The analysis stage result is (analysis_result, fresh); fresh is False when
+    it came from a gate stage ("shortcut") or the analysis cache, in which case
+    no karma is awarded. The analyzer gets the photo inline if a "photo" stage
+    provided the bytes.
+    """
+    async def profile(_):
+        return await load_reporter_profile(submission["reporter_id"], submission["is_anonymous"])
+
+    async def address(_):
+        # Resolve the display address once here so the feed never has to
+        geocoded = submission["geocoded"]
+        return await reverse_geocoder.resolve(
+            geocoded["latitude"],
+            geocoded["longitude"],
+            timeout=REVERSE_GEOCODE_INGEST_TIMEOUT_SECONDS,
+        )
 
-    # --- 4. Call Issue Analyzer ---
+    async def analysis(results):
+        shortcut = results.get("shortcut")
+        if shortcut is not None:
+            return shortcut, False
+        # A retried job or a concurrent duplicate may find the result already there
+        cached = analysis_cache.get(submission.get("analysis_key"))
+        if cached is not None:
+            return cached, False
+        image = (results.get("photo") or {}).get("image")
+        analysis_result = await call_analyzer(
+            submission, results["profile"]["display_name"], results["address"], image
+        )
+        return analysis_result, True
+
+    async def karma(results):
+        _, fresh = results["analysis"]
+        if fresh:
+            await award_submission_karma(submission, results["profile"])
+
+    pipeline.stage("profile", profile)
+    pipeline.stage("address", address, deps=location_deps)
+    # The analyzer indexes the issue and karma is written to Firestore: once started, let them finish
+    pipeline.stage("analysis", analysis, deps=("profile", "address", *gate_deps), cancellable=False)
+    pipeline.stage("karma", karma, deps=("analysis", "profile"), cancellable=False)
+
+
+async def process_issue_submission(submission: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analysis half of /submit-issue for a submission whose photo is already
+    stored (the "analyze_issue" job). Analyzer failures propagate as httpx errors.
+    """
+    pipeline = Pipeline("analyze_issue_job", pipeline_metrics)
+    add_analysis_stages(pipeline, submission)
+    results = await pipeline.run()
+    return submission_response(submission, results["analysis"][0])
+
+
+async def load_reporter_profile(reporter_id: str, is_anonymous: bool) -> Dict[str, Any]:
+    """
+    The reporter's display name for the analyzer (and for a user document the
+    karma step creates). Cached profiles are fine here; karma decisions are
+    made in a transaction instead. Returns {"display_name"}.
+    """
+    if is_anonymous or reporter_id == "anonymous_fallback" or not db:
+        return {"display_name": "Anonymous"}
     try:
-        logger.info(f"Calling analyzer: {CLOUD_ANALYZER_URL}/analyze/")
+        user_data = await store.get_user(reporter_id)
+    except Exception as e:
+        logger.warning(f"Could not fetch display name for {reporter_id}: {e}")
+        return {"display_name": "Citizen"}
+    display_name = user_data.get("name", "Citizen") if user_data is not None else "Citizen"
+    return {"display_name": display_name}
+
+
+async def call_analyzer(
+    submission: Dict[str, Any],
+    user_display_name: str,
+    display_address: Optional[str],
+    image: Optional[Tuple[str, bytes, Optional[str]]] = None,
+) -> Dict[str, Any]:
+    """
+    Call the Issue Analyzer and record the result (analysis cache, near-duplicate index).
 
-        reporter_id = "anonymous" if is_anonymous else user.get("uid", "anonymous_fallback")
-        source_type = "anonymous" if is_anonymous else "citizen"
+    `image` is a (filename, bytes, content type) tuple; when given, the bytes are
+    posted to /analyze/inline so the analyzer need not download the photo
+    (which may still be uploading).
+    """
+    geocoded = submission["geocoded"]
+    reporter_id = submission["reporter_id"]
+    analyzer_url = f"{CLOUD_ANALYZER_URL}/analyze/inline" if image else f"{CLOUD_ANALYZER_URL}/analyze/"
+    logger.info(f"Calling analyzer: {analyzer_url}")
+
+    # Build analyzer payload
+    analyzer_payload = {
+        "image_url": submission["public_url"],
+        "description": submission["description"],
+        "location": {
+            "latitude": geocoded["latitude"],
+            "longitude": geocoded["longitude"],
+        },
+        "timestamp": geocoded["timestamp"],
+        "user_selected_labels": submission["labels"],  # Pass labels from mobile app
+        "reported_by": reporter_id,
+        "source": "anonymous" if submission["is_anonymous"] else "citizen",
+        "uploader_display_name": user_display_name,
+        "display_address": display_address,
+        "photo_variants": submission["photo_variants"] or None,
+        "photo_dhash": submission.get("photo_dhash"),
+    }
 
-        # Fetch user display name for analyzer
-        user_display_name = "Anonymous"
-        if not is_anonymous and reporter_id != "anonymous_fallback" and db:
-            try:
-                user_doc_ref = db.collection("users").document(reporter_id)
-                user_doc = user_doc_ref.get()
-                if user_doc.exists:
-                    user_display_name = user_doc.to_dict().get("name", "Citizen")
-                else:
-                    user_display_name = "Citizen"
-            except Exception as e:
-                logger.warning(f"Could not fetch display name for {reporter_id}: {e}")
-                user_display_name = "Citizen"
+    logger.debug(f"Analyzer payload: {analyzer_payload}")
 
-        # Build analyzer payload
-        analyzer_payload = {
-            "image_url": public_url,
-            "description": description,
-            "location": {
-                "latitude": geocoded["latitude"],
-                "longitude": geocoded["longitude"],
+    if image:
+        analyzer_response = await http_client.post(
+            analyzer_url,
+            data={"report": json.dumps(analyzer_payload)},
+            files={"image": image},
+            timeout=ANALYZER_TIMEOUT,
+        )
+    else:
+        analyzer_response = await http_client.post(
+            analyzer_url,
+            json=analyzer_payload,
+            timeout=ANALYZER_TIMEOUT,
+        )
+    analyzer_response.raise_for_status()
+    analysis_result = analyzer_response.json()
+
+    # The issue now exists: cache it first, so a retry replays it even if a later step fails
+    analysis_cache.put(submission.get("analysis_key"), analysis_result)
+    logger.info(f"Analyzer successful for {reporter_id}. Response: {analysis_result}")
+    issues_changed({"lat": geocoded["latitude"], "lon": geocoded["longitude"]})
+    dhash = parse_dhash(submission.get("photo_dhash"))
+    if analysis_result.get("issue_id") and dhash is not None:
+        near_duplicates.add(
+            analysis_result["issue_id"],
+            geocoded["latitude"],
+            geocoded["longitude"],
+            dhash,
+            [d.get("type") for d in analysis_result.get("detected_issues") or []],
+            geocoded["timestamp"],
+        )
+    return analysis_result
+
+
+async def award_submission_karma(submission: Dict[str, Any], profile: Dict[str, Any]) -> None:
+    """+10 karma on a user's first post, issues_reported +1 on every post. Never raises."""
+    reporter_id = submission["reporter_id"]
+    if submission["is_anonymous"] or reporter_id == "anonymous_fallback" or not db:
+        return
+    try:
+        # Decided in a Firestore transaction, not on the (possibly stale) cached profile:
+        # concurrent first posts on different instances must award the karma once
+        outcome = await store.record_issue_reported(
+            reporter_id,
+            {
+                "name": profile["display_name"],
+                "email": submission["email"],
+                "userType": "citizen",
+                "karma": 10,
+                "has_posted_before": True,
+                "createdAt": firestore.SERVER_TIMESTAMP,
+                "stats": {
+                    "issues_reported": 1,
+                    "issues_resolved": 0,
+                    "co2_saved": 0
+                }
+            },
+            first_post_karma=10,
+        )
+        if outcome == "first_post":
+            logger.info(f"Awarded +10 first post karma to user {reporter_id}")
+        elif outcome == "repeat":
+            logger.info(f"User {reporter_id} has posted before. Incremented issues_reported")
+        else:
+            logger.info(f"Created user document and awarded +10 first post karma to user {reporter_id}")
+
+    except Exception as firestore_err:
+        logger.error(f"Failed to update user karma/stats for {reporter_id}: {firestore_err}")
+        # Don't fail the whole request for karma issues
+
+
+def expected_variant_urls(object_name: str) -> Dict[str, str]:
+    """Variant URLs an upload of object_name will produce if rendering succeeds."""
+    if not derivative_generator.enabled:
+        return {}
+    return {
+        name: upload_pipeline.url_for(variant_object_name(object_name, name))
+        for name in DERIVATIVE_SIZES
+    }
+
+
+async def reconcile_photo_variants(
+    analysis_result: Dict[str, Any], expected: Dict[str, str], actual: Dict[str, str]
+) -> None:
+    """The analyzer indexed the expected variant URLs; correct them if some were not produced."""
+    issue_id = analysis_result.get("issue_id")
+    if actual == expected or not issue_id or not es_client:
+        return
+    try:
+        await es_client.update(index="issues", id=issue_id, doc={"photo_variants": actual or None})
+        issues_changed(analysis_result.get("location"))
+        logger.info(f"Corrected photo_variants of {issue_id} to {list(actual)}")
+    except Exception as e:
+        logger.warning(f"Could not correct photo_variants of {issue_id}: {e}")
+
+
+async def mark_issue_photo_missing(issue_id: str, location: Optional[Dict[str, Any]] = None) -> None:
+    """The issue was indexed with a photo that never reached storage: drop the dead URLs."""
+    if not es_client:
+        return
+    try:
+        await es_client.update(
+            index="issues",
+            id=issue_id,
+            doc={"photo_url": None, "photo_variants": None, "photo_missing": True},
+        )
+        issues_changed(location)
+        logger.warning(f"Marked the photo of {issue_id} as missing")
+    except Exception as e:
+        logger.error(f"Could not mark the photo of {issue_id} as missing: {e}")
+
+
+async def run_repair_issue_photo_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job handler: upload the photo of an issue the analyzer indexed from inline
+    bytes while the request's own upload failed. Retried like any job; after the
+    last attempt the issue's photo is marked missing.
+    """
+    item = payload["item"]
+    payload["attempts"] = payload.get("attempts", 0) + 1
+    uploaded, photo_variants = await upload_with_variants(item)
+    if uploaded.ok:
+        await reconcile_photo_variants(
+            {"issue_id": payload["issue_id"], "location": payload["location"]},
+            payload["expected_variants"],
+            photo_variants,
+        )
+        logger.info(f"Repaired the photo upload of {payload['issue_id']}: {uploaded.url}")
+        return {"issue_id": payload["issue_id"], "image_url": uploaded.url}
+    if payload["attempts"] < JOB_MAX_ATTEMPTS:
+        raise RetryableJobError(f"GCS upload failed: {uploaded.error}")
+    await mark_issue_photo_missing(payload["issue_id"], payload["location"])
+    raise RuntimeError(f"GCS upload failed after {payload['attempts']} attempts: {uploaded.error}")
+
+
+job_queue.register("repair_issue_photo", run_repair_issue_photo_job)
+
+
+async def schedule_photo_repair(
+    analysis_result: Dict[str, Any], submission: Dict[str, Any], item: UploadItem, image_bytes: bytes
+) -> None:
+    issue_id = analysis_result.get("issue_id")
+    if not issue_id or analysis_result.get("duplicate_of"):
+        return  # No issue of ours points at this photo
+    geocoded = submission["geocoded"]
+    location = {"lat": geocoded["latitude"], "lon": geocoded["longitude"]}
+    payload = {
+        "issue_id": issue_id,
+        # The request's spooled file is gone by the time the job runs
+        "item": dataclasses.replace(item, source=image_bytes, size=len(image_bytes)),
+        "expected_variants": submission["photo_variants"],
+        "location": location,
+    }
+    try:
+        job = await job_queue.submit("repair_issue_photo", payload, owner=submission["reporter_id"])
+        logger.warning(f"Photo upload for {issue_id} failed; retrying in job {job.id}")
+    except JobQueueFullError:
+        await mark_issue_photo_missing(issue_id, location)
+
+
+async def attach_duplicate_report(match, submission: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Count the report against the existing issue instead of creating a new one.
+    Returns the analysis result to answer with, or None (full pipeline) if the
+    issue is gone or closed.
+    """
+    if not es_client:
+        return None
+    try:
+        resp = await es_client.update(
+            index="issues",
+            id=match.issue_id,
+            script={
+                "source": """
+                    if (ctx._source.status != 'open') {
+                        ctx.op = 'noop';
+                    } else {
+                        ctx._source.duplicate_reports = (ctx._source.duplicate_reports == null ? 0 : ctx._source.duplicate_reports) + 1;
+                        ctx._source.updated_at = params.now;
+                    }
+                """,
+                "lang": "painless",
+                "params": {"now": datetime.utcnow().isoformat() + "Z"},
             },
-            "timestamp": geocoded["timestamp"],
-            "user_selected_labels": labels,  # Pass labels from mobile app
-            "reported_by": reporter_id,
-            "source": source_type,
-            "uploader_display_name": user_display_name,
-        }
-
-        logger.debug(f"Analyzer payload: {analyzer_payload}")
-
-        analyzer_response = requests.post(
-            f"{CLOUD_ANALYZER_URL}/analyze/",
-            json=analyzer_payload,
-            timeout=60
+            retry_on_conflict=3,
+            source="location",
         )
-        analyzer_response.raise_for_status()
-        analysis_result = analyzer_response.json()
-
-        logger.info(f"Analyzer successful for {reporter_id}. Response: {analysis_result}")
-
-    except requests.exceptions.HTTPError as http_err:
-        error_detail = f"Analysis error: {http_err.response.status_code}. {http_err.response.text}"
-        logger.error(error_detail)
-        try:
-            err_json = http_err.response.json()
-            error_detail = err_json.get("detail", error_detail)
-        except json.JSONDecodeError:
-            pass
-        raise HTTPException(502, f"Error from analysis service: {error_detail}")
-    except requests.exceptions.RequestException as e:
-        logger.exception("Analyzer connection failed")
-        raise HTTPException(502, f"Analysis connection error: {e}")
+    except NotFoundError:
+        near_duplicates.remove(match.issue_id)
+        return None
     except Exception as e:
-        logger.exception("Unexpected error during analysis")
-        raise HTTPException(500, f"Analysis failed: {e}")
+        logger.warning(f"Could not attach duplicate report to {match.issue_id}: {e}")
+        return None
+    if resp.get("result") == "noop":
+        near_duplicates.remove(match.issue_id)
+        return None
+    issues_changed((resp.get("get") or {}).get("_source", {}).get("location"))
 
-    # --- 5. Award Karma and Update Stats ---
-    if not is_anonymous and reporter_id != "anonymous_fallback" and db:
-        try:
-            user_doc_ref = db.collection("users").document(reporter_id)
-            user_doc = user_doc_ref.get()
-
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                has_posted = user_data.get("has_posted_before", False)
-
-                if not has_posted:
-                    # First post: award karma and set flag
-                    user_doc_ref.update({
-                        "karma": Increment(10),
-                        "has_posted_before": True,
-                        "stats.issues_reported": Increment(1)
-                    })
-                    logger.info(f"Awarded +10 first post karma to user {reporter_id}")
-                else:
-                    # Subsequent post: just increment count
-                    user_doc_ref.update({"stats.issues_reported": Increment(1)})
-                    logger.info(f"User {reporter_id} has posted before. Incremented issues_reported")
-            else:
-                # Create user document if missing
-                user_doc_ref.set({
-                    "name": user_display_name,
-                    "email": user.get("email"),
-                    "userType": "citizen",
-                    "karma": 10,
-                    "has_posted_before": True,
-                    "createdAt": firestore.SERVER_TIMESTAMP,
-                    "stats": {
-                        "issues_reported": 1,
-                        "issues_resolved": 0,
-                        "co2_saved": 0
-                    }
-                }, merge=True)
-                logger.info(f"Created user document and awarded +10 first post karma to user {reporter_id}")
+    logger.info(
+        f"Report {submission['public_url']} attached to issue {match.issue_id} "
+        f"({match.distance_bits} bits, {match.distance_m} m apart)"
+    )
+    analysis_result = {
+        "issue_id": match.issue_id,
+        "duplicate_of": match.issue_id,
+        "duplicate_distance_m": match.distance_m,
+        "detected_issues": [],
+        "auto_review": False,
+        "no_issues_found": False,
+    }
+    analysis_cache.put(submission["analysis_key"], analysis_result)
+    return analysis_result
 
-        except Exception as firestore_err:
-            logger.error(f"Failed to update user karma/stats for {reporter_id}: {firestore_err}")
-            # Don't fail the whole request for karma issues
 
-    # --- 6. Return Response ---
+def submission_response(submission: Dict[str, Any], analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    public_url = submission["public_url"]
+    geocoded = submission["geocoded"]
+    location_coords = {
+        "latitude": geocoded["latitude"],
+        "longitude": geocoded["longitude"],
+    }
     if analysis_result.get("no_issues_found"):
         return {
             "no_issues_found": True,
             "message": "No issues detected in the uploaded image.",
             "image_url": public_url,
-            "location_text": locationstr,
-            "location_coords": {
-                "latitude": geocoded["latitude"],
-                "longitude": geocoded["longitude"],
-            }
+            "location_text": submission["location_text"],
+            "location_coords": location_coords,
+            "location_source": geocoded["source"],
         }
 
     return {
         "image_url": public_url,
         "analysis": analysis_result,
-        "location_text": locationstr,
-        "location_coords": {
-            "latitude": geocoded["latitude"],
-            "longitude": geocoded["longitude"],
-        },
+        "location_text": submission["location_text"],
+        "location_coords": location_coords,
+        "location_source": geocoded["source"],
     }
 
 
+async def run_analyze_issue_job(submission: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job handler: upstream 5xx/429 and failures to connect are retried, 4xx are final.
+
+    Other transport errors (read timeouts, dropped connections) are final too:
+    the analyzer may have finished and indexed the issue, and a retry would
+    index it twice.
+    """
+    try:
+        return await process_issue_submission(submission)
+    except httpx.HTTPStatusError as http_err:
+        status_code = http_err.response.status_code
+        if status_code >= 500 or status_code == 429:
+            raise RetryableJobError(f"Analyzer returned {status_code}")
+        raise RuntimeError(f"Analyzer rejected the report ({status_code}): {http_err.response.text}")
+    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+        # Raised before the request was sent
+        raise RetryableJobError(f"Analyzer connection error: {e}")
+    except httpx.RequestError as e:
+        raise RuntimeError(f"Analyzer request failed after it was sent: {e!r}")
+
+
+job_queue.register("analyze_issue", run_analyze_issue_job)
+
+
+JOB_EVENTS_HEARTBEAT_SECONDS = 15
+
+
+async def load_job(job_id: str, user: dict) -> Dict[str, Any]:
+    """Job state from this instance, else from Firestore; 404 unless the caller owns it."""
+    job = job_queue.get(job_id)
+    data = job.public() if job else None
+    if data is None and store:
+        try:
+            data = await store.get_job(job_id)
+        except Exception as e:
+            logger.warning(f"Could not load job {job_id} from Firestore: {e}")
+    if not data or data.get("owner") != user.get("uid"):
+        raise HTTPException(404, "Job not found")
+    return data
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, user: dict = Depends(get_current_user)):
+    """Poll a submission job: queued, running, retrying, succeeded (with result) or failed."""
+    return await load_job(job_id, user)
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, user: dict = Depends(get_current_user)):
+    """Server-Sent Events: one `data:` line per job state change, closed at a terminal state."""
+    data = await load_job(job_id, user)
+
+    async def events():
+        current = data
+        while True:
+            yield f"event: status\ndata: {json.dumps(current)}\n\n"
+            if current["status"] in TERMINAL_STATES:
+                return
+            version = current["version"]
+            while True:
+                job = await job_queue.wait_for_update(job_id, version, JOB_EVENTS_HEARTBEAT_SECONDS)
+                if job is None:
+                    # Not tracked on this instance (expired or another instance owns it)
+                    try:
+                        current = await load_job(job_id, user)
+                    except HTTPException as e:
+                        # The response has started, so the error goes out as a final event
+                        yield f"event: error\ndata: {json.dumps({'detail': e.detail, 'status_code': e.status_code})}\n\n"
+                        return
+                    if current["version"] == version:
+                        return
+                    break
+                if job.version > version:
+                    current = job.public()
+                    break
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.post("/submit-issue-multi")
 async def submit_issue_multi(
     user: dict = Depends(get_current_user),  # Requires auth
     files: List[UploadFile] = File(...),  # Accepts multiple files
-    location_text: str = Form(...),
+    location_text: Optional[str] = Form(None),
     description: str = Form(""),  # Optional description
     is_anonymous: bool = Form(False),  # Get anonymous flag
+    latitude: Optional[float] = Form(None),  # Device GPS, skips geocoding when present
+    longitude: Optional[float] = Form(None),
 ):
-    if not storage_client:
+    if not upload_pipeline:
         raise HTTPException(503, "GCS unavailable")
     if not files or len(files) == 0:
         raise HTTPException(400, "No files provided")
+    if len(files) > MAX_FILES_PER_SUBMISSION:
+        raise HTTPException(413, f"At most {MAX_FILES_PER_SUBMISSION} files per submission")
 
-    # --- 1. Geocode Location ---
-    geocoded = geocode_location(location_text)
-    if not geocoded:
-        raise HTTPException(400, f"Could not find coordinates for: '{location_text}'.")
-
-    # --- 2. Upload all files to GCS ---
-
-    public_urls = []
-    issue_folder = f"issues/{uuid.uuid4()}"  # One folder for all issue images
-    bucket = storage_client.bucket(BUCKET_NAME)
-
+    # --- 1. Validate image files (the first one may carry EXIF GPS) ---
+    image_files = []
     for file in files:
         if not (file.content_type or "").startswith("image/"):
             logger.warning(f"Skipping non-image file: {file.filename}")
             continue
+        size = upload_size(file, MAX_IMAGE_UPLOAD_BYTES)
+        if not size:
+            logger.warning(f"Skipping empty file: {file.filename}")
+            continue
+        image_files.append((file, size))
 
-        try:
-            data = await file.read()  # Read file bytes
-            blob = bucket.blob(f"{issue_folder}/{file.filename}")  # Create blob
-            blob.upload_from_string(data, content_type=file.content_type)
+    # --- 2. Resolve Location (device GPS -> EXIF GPS -> geocoding) ---
+    first_image = image_files[0][0].file if image_files else None
+    geocoded = await resolve_submission_location(
+        latitude, longitude, first_image, location_text
+    )
+    if not geocoded:
+        if location_text:
+            raise HTTPException(400, f"Could not find coordinates for: '{location_text}'.")
+        raise HTTPException(400, "No location provided: send latitude/longitude or location_text")
 
-            public_url = f"https://storage.googleapis.com/{BUCKET_NAME}/{issue_folder}/{file.filename}"
-            public_urls.append(public_url)
-            logger.info(f"Uploaded {file.filename} to GCS: {public_url}")
-        except Exception as gcs_err:
-            logger.exception(f"GCS upload failed for {file.filename}: {gcs_err}")
+    # --- 3. Upload all files to GCS (concurrently, results in submission order) ---
+    if not image_files:
+        raise HTTPException(400, "No valid image files were uploaded.")
+    # Content-addressed, like /submit-issue: photos already stored are not re-uploaded
+    digests = await asyncio.gather(
+        *(asyncio.to_thread(content_sha256, file.file) for file, _ in image_files)
+    )
+    upload_items = [
+        UploadItem(
+            object_name=content_object_name("issues", digest, file.filename),
+            source=file.file,
+            size=size,
+            content_type=file.content_type,
+            filename=file.filename,
+            skip_if_exists=True,
+        )
+        for (file, size), digest in zip(image_files, digests)
+    ]
+    # Only the first photo becomes the issue's photo_url, so only it gets variants
+    (first_upload, photo_variants), other_uploads = await asyncio.gather(
+        upload_with_variants(upload_items[0]),
+        upload_pipeline.upload_many(upload_items[1:]),
+    )
+    uploads = [first_upload] + other_uploads
+    if not first_upload.ok:
+        photo_variants = {}
+    public_urls = [u.url for u in uploads if u.ok]
+    failed_uploads = [{"filename": u.filename, "error": u.error} for u in uploads if not u.ok]
+    logger.info(f"Uploaded {len(public_urls)}/{len(uploads)} issue photos ({sum(u.existed for u in uploads)} already stored)")
 
     if not public_urls:
         raise HTTPException(400, "No valid image files were uploaded.")
 
-    # --- 3. Call Analyzer (using only the *first* image) ---
+    # --- 4. Call Analyzer (using only the *first* image) ---
     try:
         first_image_url = public_urls[0]
         logger.info(f"Calling analyzer: {CLOUD_ANALYZER_URL}/analyze/")
@@ -1170,11 +2135,9 @@ async def submit_issue_multi(
         user_display_name = "Anonymous"
         if not is_anonymous and reporter_id != "anonymous_fallback" and db:
             try:
-                user_doc_ref = db.collection("users").document(reporter_id)
-                user_doc = user_doc_ref.get()  # Synchronous call
-                if user_doc.exists:
-                    # Use to_dict() method for DocumentSnapshot
-                    user_display_name = user_doc.to_dict().get("name", "Citizen")
+                user_data = await store.get_user(reporter_id)
+                if user_data is not None:
+                    user_display_name = user_data.get("name", "Citizen")
                 else:
                     logger.warning(
                         f"User document {reporter_id} not found, using default name."
@@ -1185,6 +2148,13 @@ async def submit_issue_multi(
                 user_display_name = "Citizen"  # Fallback on error
         # --- End display name fetch ---
 
+        # Resolve the display address once here so the feed never has to
+        display_address = await reverse_geocoder.resolve(
+            geocoded["latitude"],
+            geocoded["longitude"],
+            timeout=REVERSE_GEOCODE_INGEST_TIMEOUT_SECONDS,
+        )
+
         analyzer_payload = {
             "image_url": first_image_url,
             "description": description,
@@ -1198,100 +2168,49 @@ async def submit_issue_multi(
             "source": source_type,
             # --- ADDED: Pass uploader display name ---
             "uploader_display_name": user_display_name,
+            "display_address": display_address,
+            "photo_variants": photo_variants or None,
         }
 
-        analyzer_response = requests.post(
-            f"{CLOUD_ANALYZER_URL}/analyze/", json=analyzer_payload, timeout=60
+        analyzer_response = await http_client.post(
+            f"{CLOUD_ANALYZER_URL}/analyze/", json=analyzer_payload, timeout=ANALYZER_TIMEOUT
         )
-        analyzer_response.raise_for_status()  # Raises HTTPError for bad responses (4xx or 5xx)
+        analyzer_response.raise_for_status()  # Raises HTTPStatusError for bad responses (4xx or 5xx)
         analysis_result = analyzer_response.json()
 
         logger.info(f"Analyzer OK for {reporter_id}. Response: {analysis_result}")
+        issues_changed({"lat": geocoded["latitude"], "lon": geocoded["longitude"]})
 
         # --- NEW: Award +10 Karma for First Post ---
-        if not is_anonymous and reporter_id != "anonymous_fallback" and db:
-            try:
-                user_doc_ref = db.collection("users").document(reporter_id)
-                user_doc = user_doc_ref.get()  # Synchronous call
-
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()  # Use .to_dict() here
-                    has_posted = user_data.get("has_posted_before", False)
-
-                    if not has_posted:
-                        # Award +10 karma and set flag, increment issues_reported
-                        user_doc_ref.update(
-                            {
-                                "karma": Increment(10),
-                                "has_posted_before": True,
-                                "stats.issues_reported": Increment(1)
-                            }
-                        )
-                        logger.info(
-                            f"Awarded +10 first post karma and incremented issues_reported for user {reporter_id}."
-                        )
-                    else:
-                        # For subsequent posts, still count the report
-                        user_doc_ref.update(
-                            {"stats.issues_reported": Increment(1)}
-                        )
-                        logger.info(
-                            f"User {reporter_id} has posted before. No first post karma awarded. Incremented issues_reported."
-                        )
-                else:
-                    # This case might happen if signup creates auth user but Firestore doc fails
-                    logger.warning(
-                        f"User document not found for {reporter_id} when checking for first post karma. Creating doc and awarding karma."
-                    )
-                    # Optionally create the doc here if desired, or just log
-                    user_doc_ref.set(
-                        {
-                            "name": user_display_name,  # Try to use fetched name
-                            "email": user.get("email"),  # Get email from token
-                            "userType": "citizen",  # Assume citizen if doc missing
-                            "karma": 10,  # Start with 10
-                            "has_posted_before": True,
-                            "createdAt": firestore.SERVER_TIMESTAMP,
-                            "stats": {
-                                "issues_reported": 1,
-                                "issues_resolved": 0,
-                                "co2_saved": 0
-                            }
-                        },
-                        merge=True,
-                    )  # Use merge=True to avoid overwriting if created concurrently
-                    logger.info(
-                        f"Created user doc and awarded +10 first post karma to user {reporter_id}."
-                    )
-
-            except Exception as firestore_err:
-                # Log error but don't fail the request
-                logger.error(
-                    f"Failed to check/award first post karma for {reporter_id}: {firestore_err}"
-                )
+        await award_submission_karma(
+            {"reporter_id": reporter_id, "is_anonymous": is_anonymous, "email": user.get("email")},
+            {"display_name": user_display_name},
+        )
         # --- END NEW KARMA LOGIC ---
 
-        # --- 4. (Optional) Update ES doc with all image URLs if analyzer didn't ---
+        # --- 5. (Optional) Update ES doc with all image URLs if analyzer didn't ---
         # ... (Keep this commented out for now) ...
 
         return {
             "message": f"{len(public_urls)} images uploaded.",
             "image_urls": public_urls,
+            "failed_uploads": failed_uploads,
             "analysis": analysis_result,
             "location_text": location_text,
             "location_coords": {
                 "latitude": geocoded["latitude"],
                 "longitude": geocoded["longitude"],
             },
+            "location_source": geocoded["source"],
         }
     # --- Keep existing error handling blocks ---
-    except requests.exceptions.HTTPError as http_err:
+    except httpx.HTTPStatusError as http_err:
         error_detail = (
             f"Analysis error: {http_err.response.status_code}. {http_err.response.text}"
         )
         logger.error(error_detail)
         raise HTTPException(502, "Error from analysis service.")
-    except requests.exceptions.RequestException as e:
+    except httpx.RequestError as e:
         logger.exception("Analyzer conn fail")
         raise HTTPException(502, f"Analysis conn err: {e}")
     except Exception as e:
@@ -1319,33 +2238,20 @@ async def get_user_stats(user_id: str, user: dict = Depends(get_current_user)):
 
     try:
         # --- 1. Get User Data & Karma from Firestore ---
-        user_doc_ref = db.collection("users").document(user_id)
-        user_doc = user_doc_ref.get()  # Synchronous call
+        user_data = await store.get_user(user_id)
 
-        if not user_doc.exists:
+        if user_data is None:
             raise HTTPException(404, f"User {user_id} not found")
 
-        user_data = user_doc.to_dict()
         karma = user_data.get("karma", 0)
         user_type = user_data.get("userType", "citizen")
 
         # --- 2. Calculate Rank (Simple version) ---
-        # This query can be slow/expensive on large datasets.
-        # For production, this should be a scheduled Cloud Function.
+        # Count aggregation over users of the same type with higher karma.
+        # This might require a composite index.
         current_rank = 0  # Default rank
         try:
-            users_ref = db.collection("users")
-            # Query for users of the same type with higher karma
-            rank_query = users_ref.where(
-                filter=FieldFilter("userType", "==", user_type)
-            ).where(filter=FieldFilter("karma", ">", karma))
-            # .stream() is slow as it iterates. .count() is better but still a query.
-            # Let's use a simple count. This might require an index.
-            # A more efficient way is to just fetch the IDs
-            higher_karma_docs_stream = rank_query.select(
-                []
-            ).stream()  # Select no fields, just get count
-            higher_karma_count = len(list(higher_karma_docs_stream))
+            higher_karma_count = await store.count_users_with_more_karma(user_type, karma)
             current_rank = higher_karma_count + 1
             logger.info(f"Calculated rank for {user_id}: {current_rank}")
         except Exception as rank_err:
@@ -1375,12 +2281,12 @@ async def get_user_stats(user_id: str, user: dict = Depends(get_current_user)):
 
             # Run ES count queries in parallel
             count_reported_resp, count_resolved_resp = await asyncio.gather(
-                es_client.count(index="issues", body=reported_query, ignore=[404]),
-                es_client.count(index="issues", body=resolved_query, ignore=[404]),
+                es_count(index="issues", body=reported_query, ignore=[404]),
+                es_count(index="issues", body=resolved_query, ignore=[404]),
             )
 
-            issues_reported = count_reported_resp.body.get("count", 0)
-            issues_resolved = count_resolved_resp.body.get("count", 0)
+            issues_reported = count_reported_resp.get("count", 0)
+            issues_resolved = count_resolved_resp.get("count", 0)
 
         elif user_type in ["ngo", "volunteer"]:
             # Count issues fixed by this user (check 'closed_by' field)
@@ -1393,13 +2299,13 @@ async def get_user_stats(user_id: str, user: dict = Depends(get_current_user)):
             }
 
             count_fixed_resp, agg_co2_resp = await asyncio.gather(
-                es_client.count(index="issues", body=fixed_query, ignore=[404]),
-                es_client.search(index="issues", body=co2_agg_query, ignore=[404]),
+                es_count(index="issues", body=fixed_query, ignore=[404]),
+                es_search(index="issues", body=co2_agg_query, ignore=[404]),
             )
 
-            issues_fixed = count_fixed_resp.body.get("count", 0)
+            issues_fixed = count_fixed_resp.get("count", 0)
             co2_saved = (
-                agg_co2_resp.body.get("aggregations", {})
+                agg_co2_resp.get("aggregations", {})
                 .get("total_co2_saved", {})
                 .get("value", 0)
             )
@@ -1407,7 +2313,7 @@ async def get_user_stats(user_id: str, user: dict = Depends(get_current_user)):
             # Debug: Log the actual counts for troubleshooting
             logger.info(f"User {user_id} ({user_type}) - Issues fixed count: {issues_fixed}")
             logger.info(f"User {user_id} - Fixed query: {fixed_query}")
-            logger.info(f"User {user_id} - Count response: {count_fixed_resp.body}")
+            logger.info(f"User {user_id} - Count response: {count_fixed_resp}")
 
         # --- 4. Build Response ---
         response_stats = {
@@ -1450,13 +2356,11 @@ async def get_user_stats_firebase(user_id: str, user: dict = Depends(get_current
 
     try:
         # --- 1. Get User Data & Stats from Firestore ---
-        user_doc_ref = db.collection("users").document(user_id)
-        user_doc = user_doc_ref.get()
+        user_data = await store.get_user(user_id)
 
-        if not user_doc.exists:
+        if user_data is None:
             raise HTTPException(404, f"User {user_id} not found")
 
-        user_data = user_doc.to_dict()
         user_type = user_data.get("userType", "citizen")
 
         # --- 2. Extract stats from Firebase document ---
@@ -1472,14 +2376,9 @@ async def get_user_stats_firebase(user_id: str, user: dict = Depends(get_current
         # --- 3. Calculate Rank (from Firebase data) ---
         current_rank = 0  # Default rank
         try:
-            users_ref = db.collection("users")
-            # Query for users of the same type with higher karma
-            rank_query = users_ref.where(
-                filter=FieldFilter("userType", "==", user_type)
-            ).where(filter=FieldFilter("karma", ">", karma))
-
-            higher_karma_docs = list(rank_query.stream())
-            current_rank = len(higher_karma_docs) + 1
+            # Count users of the same type with higher karma
+            higher_karma_count = await store.count_users_with_more_karma(user_type, karma)
+            current_rank = higher_karma_count + 1
             logger.info(f"Calculated Firebase rank for {user_id}: {current_rank}")
         except Exception as rank_err:
             logger.error(f"Failed to calculate Firebase rank for {user_id}: {rank_err}")
@@ -1521,7 +2420,6 @@ async def upvote_issue(issue_id: str, user: dict = Depends(get_current_user)):
         raise HTTPException(503, "DB unavailable")
 
     user_uid = user.get("uid")
-    upvote_doc_id = f"{issue_id}__{user_uid}"
 
     try:
         # --- Get current issue details FIRST (for status and reporter) ---
@@ -1530,39 +2428,14 @@ async def upvote_issue(issue_id: str, user: dict = Depends(get_current_user)):
         current_status = source_doc.get("status", "open")
         reporter_uid = source_doc.get("reported_by")  # Get reporter ID for potential karma
 
-        # --- Check if upvote document exists in Firestore ---
-        upvote_ref = db.collection("upvotes").document(upvote_doc_id)
-        upvote_doc = upvote_ref.get()
-
+        # --- Toggle (or create) the upvote document in one Firestore transaction ---
         now = datetime.utcnow().isoformat() + "Z"
-        new_active_state = True  # Default for new upvotes
-        is_first_upvote = False  # Track if this is the first time upvoting (for karma)
-
-        if upvote_doc.exists:
-            # Toggle existing upvote
-            upvote_data = upvote_doc.to_dict()
-            is_active = upvote_data.get("isActive", False)
-            new_active_state = not is_active
-
-            # Update Firestore with new state
-            upvote_ref.update({
-                "isActive": new_active_state,
-                "lastUpdated": now
-            })
-
-            logger.info(f"Toggling upvote from {is_active} to {new_active_state}")
-        else:
-            # Create new upvote document with isActive=True
-            upvote_ref.set({
-                "issueId": issue_id,
-                "userId": user_uid,
-                "isActive": True,
-                "upvotedAt": now,
-                "lastUpdated": now
-            })
-            new_active_state = True
-            is_first_upvote = True  # Mark as first upvote for karma award
-            logger.info(f"Creating new upvote for user {user_uid}")
+        new_active_state, is_first_upvote = await store.toggle_upvote(
+            issue_id, user_uid, now
+        )
+        logger.info(
+            f"Upvote for user {user_uid} on {issue_id} is now {new_active_state} (new: {is_first_upvote})"
+        )
 
         # --- Update Elasticsearch count based on new state ---
         if new_active_state:
@@ -1608,6 +2481,7 @@ async def upvote_issue(issue_id: str, user: dict = Depends(get_current_user)):
             refresh="wait_for",  # Use wait_for for consistency before awarding karma
             retry_on_conflict=3,
         )
+        issues_changed(source_doc.get("location"))
 
         # Retrieve updated document from Elasticsearch
         get_response = await es_client.get(index="issues", id=issue_id)
@@ -1628,11 +2502,10 @@ async def upvote_issue(issue_id: str, user: dict = Depends(get_current_user)):
                     )
                 else:
                     try:
-                        user_doc_ref = db.collection("users").document(reporter_uid)
                         # Check if user exists before trying to update
-                        reporter_doc = user_doc_ref.get()  # Synchronous call
-                        if reporter_doc.exists:
-                            user_doc_ref.update({"karma": Increment(5)})
+                        reporter_data = await store.get_user(reporter_uid, cached=False)
+                        if reporter_data is not None:
+                            await store.update_user(reporter_uid, {"karma": Increment(5)})
                             logger.info(
                                 f"Awarded +5 karma to reporter {reporter_uid} for upvote on {issue_id}."
                             )
@@ -1709,6 +2582,7 @@ async def unlike_issue(
         # Retrieve updated document
         get_response = await es_client.get(index="issues", id=issue_id)
         updated_source = get_response["_source"]
+        issues_changed(updated_source.get("location"))
 
         logger.info(f"Unlike OK for {issue_id}. New: {updated_source.get('upvotes')}")
         return {"message": "Unliked", "updated_issue": updated_source}
@@ -1738,15 +2612,12 @@ async def report_issue(issue_id: str, user: dict = Depends(get_current_user)):
         raise HTTPException(503, "DB unavailable")
 
     user_uid = user.get("uid")
-    report_doc_id = f"{issue_id}__{user_uid}"
 
     try:
         # Check if user already reported this issue
-        report_ref = db.collection("reports").document(report_doc_id)
-        report_doc = report_ref.get()
+        report_data = await store.get_report(issue_id, user_uid)
 
-        if report_doc.exists:
-            report_data = report_doc.to_dict()
+        if report_data is not None:
             if report_data.get("isActive", False):
                 logger.warning(f"User {user_uid} already reported {issue_id}")
                 return {
@@ -1759,15 +2630,7 @@ async def report_issue(issue_id: str, user: dict = Depends(get_current_user)):
         now = datetime.utcnow().isoformat() + "Z"
 
         # Create permanent report document in Firestore (NOT toggleable)
-        report_ref.set(
-            {
-                "issueId": issue_id,
-                "userId": user_uid,
-                "isActive": True,  # Always true, reports are permanent
-                "reportedAt": now,
-                "lastUpdated": now,
-            }
-        )
+        await store.create_report(issue_id, user_uid, now)
 
         logger.info(f"Created permanent report for user {user_uid}")
 
@@ -1838,6 +2701,7 @@ async def report_issue(issue_id: str, user: dict = Depends(get_current_user)):
                 refresh=True,
                 retry_on_conflict=3,
             )
+            issues_changed(source.get("location"))
         else:
             logger.info("No update script needed.")
 
@@ -1882,7 +2746,7 @@ async def submit_fix(
     """
     if not es_client:
         raise HTTPException(503, "DB unavailable")
-    if not storage_client:
+    if not upload_pipeline:
         raise HTTPException(503, "GCS unavailable")
     if not db:
         raise HTTPException(503, "Firestore client not available")
@@ -1893,16 +2757,15 @@ async def submit_fix(
     )
 
     # --- 1. Verify user is an NGO/Volunteer ---
-    user_doc = None  # Define user_doc here to use later in karma block
+    user_data = None  # Define user_data here to use later in karma block
     try:
-        user_doc_ref = db.collection("users").document(user_uid)
-        user_doc = user_doc_ref.get()  # Synchronous call
+        # Not from the profile cache: the NGO flag gates a karma-awarding write
+        user_data = await store.get_user(user_uid, cached=False)
 
-        if not user_doc.exists:
+        if user_data is None:
             logger.warning(f"User {user_uid} not found in Firestore.")
             raise HTTPException(status_code=403, detail="User profile not found.")
 
-        user_data = user_doc.to_dict()  # Use .to_dict()
         user_type = user_data.get("userType")
         if user_type != "ngo":
             logger.warning(
@@ -1934,43 +2797,40 @@ async def submit_fix(
         logger.exception(f"Error checking issue status: {e}")
         raise HTTPException(status_code=500, detail="Error fetching issue details.")
 
-    # --- 3. Upload MULTIPLE fix files to GCS ---
-    fix_public_urls = []  # List to store URLs
+    # --- 3. Upload MULTIPLE fix files to GCS (concurrently, in submission order) ---
     if not files:
         raise HTTPException(400, "No proof files provided.")
+    if len(files) > MAX_FILES_PER_SUBMISSION:
+        raise HTTPException(413, f"At most {MAX_FILES_PER_SUBMISSION} files per submission")
 
+    fix_items = []
     for file in files:
         if not (file.content_type and file.content_type.startswith("image/")):
             logger.warning(f"Skipping non-image file: {file.filename}")
             continue  # Skip non-image files
-
-        try:
-            file_uuid = uuid.uuid4()
-            # Still use issue_id in path for organization
-            blob_name = (
-                f"fix-proof/{issue_id}/{file_uuid}_{file.filename or 'fix_image'}"
+        size = upload_size(file, MAX_IMAGE_UPLOAD_BYTES)
+        if not size:
+            logger.warning(f"Skipping empty file: {file.filename}")
+            continue  # Skip empty files
+        file_uuid = uuid.uuid4()
+        fix_items.append(
+            UploadItem(
+                # Still use issue_id in path for organization
+                object_name=f"fix-proof/{issue_id}/{file_uuid}_{file.filename or 'fix_image'}",
+                source=file.file,
+                size=size,
+                content_type=file.content_type,
+                filename=file.filename,
             )
-            data = await file.read()
-            if not data:
-                logger.warning(f"Skipping empty file: {file.filename}")
-                continue  # Skip empty files
-
-            if not BUCKET_NAME:
-                raise HTTPException(500, "GCS bucket not configured")
-
-            bucket = storage_client.bucket(BUCKET_NAME)
-            blob = bucket.blob(blob_name)
-
-            blob.upload_from_string(data, content_type=file.content_type)
-            public_url = f"https://storage.googleapis.com/{BUCKET_NAME}/{blob_name}"
-            fix_public_urls.append(public_url)
-            logger.info(f"Uploaded fix proof image to GCS: {public_url}")
+        )
 
-        except Exception as gcs_error:
-            logger.exception(f"GCS upload failed for file {file.filename}")
-            # Decide if one failure should stop the whole process or just skip the file
-            # For now, we continue and report success if at least one uploads
-            # raise HTTPException(500, f"GCS upload failed for {file.filename}: {gcs_error}")
+    # One failed file doesn't stop the fix; we continue if at least one uploads
+    fix_uploads = await upload_pipeline.upload_many(fix_items)
+    fix_public_urls = [u.url for u in fix_uploads if u.ok]
+    failed_uploads = [
+        {"filename": u.filename, "error": u.error} for u in fix_uploads if not u.ok
+    ]
+    logger.info(f"Uploaded {len(fix_public_urls)}/{len(fix_items)} fix proof images for {issue_id}")
 
     if not fix_public_urls:
         raise HTTPException(400, "No valid proof image files were uploaded.")
@@ -1991,10 +2851,10 @@ async def submit_fix(
             "timestamp": datetime.utcnow().isoformat() + "Z",
         }
 
-        verifier_response = requests.post(
+        verifier_response = await http_client.post(
             f"{VERIFIER_URL}/verify_fix/",  # Should end with /verify_fix/
             json=verifier_payload,
-            timeout=90,  # Slightly increased timeout for potentially more images
+            timeout=VERIFIER_TIMEOUT,  # Longer than the analyzer: potentially more images
         )
         verifier_response.raise_for_status()
         verification_result = verifier_response.json()
@@ -2024,18 +2884,15 @@ async def submit_fix(
         # Update NGO stats in Firestore
         if should_update_stats and db:
             try:
-                ngo_doc_ref = db.collection("users").document(
-                    user_uid
-                )  # Use the UID of the submitter
-                # Check if user exists before trying to update (using the doc snapshot we already fetched)
-                if user_doc.exists:  # Check the snapshot from step 1
+                # Check if user exists before trying to update (using the profile we already fetched)
+                if user_data is not None:  # Check the profile from step 1
                     # Update karma, CO2 saved, and issues_fixed for NGO (NOT issues_resolved - that's for citizens)
                     update_data = {
                         "karma": Increment(karma_points),
                         "stats.issues_fixed": Increment(1),
                         "stats.co2_saved": Increment(co2_saved),
                     }
-                    ngo_doc_ref.update(update_data)
+                    await store.update_user(user_uid, update_data)  # UID of the submitter
                     logger.info(
                         f"Awarded +{karma_points} karma, +{co2_saved} CO2, and updated stats for NGO {user_uid} for fix outcome '{overall_outcome}' on {issue_id}."
                     )
@@ -2051,12 +2908,11 @@ async def submit_fix(
             reporter_uid = original_issue_doc.get("reported_by")
             if reporter_uid and reporter_uid != "anonymous":
                 try:
-                    reporter_doc_ref = db.collection("users").document(reporter_uid)
-                    reporter_doc = reporter_doc_ref.get()
+                    reporter_data = await store.get_user(reporter_uid, cached=False)
                     
-                    if reporter_doc.exists:
+                    if reporter_data is not None:
                         # Award karma to reporter and increment their issues_resolved count
-                        reporter_doc_ref.update({
+                        await store.update_user(reporter_uid, {
                             "karma": Increment(15),  # Reward reporter when their issue is fixed
                             "stats.issues_resolved": Increment(1)
                         })
@@ -2109,6 +2965,7 @@ async def submit_fix(
                     body=update_body,
                     refresh='wait_for'  # Make changes immediately searchable for stats queries
                 )
+                issues_changed(original_issue_doc.get("location"))
                 logger.info(f"Successfully updated ES document {issue_id}.")
 
             except NotFoundError:
@@ -2129,10 +2986,11 @@ async def submit_fix(
             "message": f"Fix submitted successfully with {len(fix_public_urls)} images!",
             "issue_id": issue_id,
             "verification_result": verification_result,
+            "failed_uploads": failed_uploads,
         }
 
     # --- Error Handling (No major changes needed) ---
-    except requests.exceptions.HTTPError as http_err:
+    except httpx.HTTPStatusError as http_err:
         # ... (keep existing HTTPError handling) ...
         error_detail = f"Verifier service error: {http_err.response.status_code}. {http_err.response.text}"
         logger.error(error_detail)
@@ -2142,7 +3000,7 @@ async def submit_fix(
         except json.JSONDecodeError:
             pass
         raise HTTPException(502, f"Error from verifier service: {error_detail}")
-    except requests.exceptions.RequestException as e:
+    except httpx.RequestError as e:
         # ... (keep existing RequestException handling) ...
         logger.exception(
             f"Failed to connect to Issue Verifier service at {VERIFIER_URL}"
@@ -2172,7 +3030,7 @@ async def get_issue_fix_details(issue_id: str):
     try:
         # 1. Fetch the issue from Elasticsearch
         issue_query = {"query": {"term": {"issue_id": {"value": issue_id}}}}
-        issue_response = await es_client.search(
+        issue_response = await es_search(
             index="issues", body=issue_query, size=1
         )
         issue_hits = issue_response.get("hits", {}).get("hits", [])
@@ -2193,7 +3051,7 @@ async def get_issue_fix_details(issue_id: str):
 
         # 4. Fetch fix details from fixes index
         fix_query = {"query": {"term": {"issue_id": {"value": issue_id}}}}
-        fix_response = await es_client.search(index="fixes", body=fix_query, size=1)
+        fix_response = await es_search(index="fixes", body=fix_query, size=1)
         fix_hits = fix_response.get("hits", {}).get("hits", [])
 
         if not fix_hits:
@@ -2202,11 +3060,10 @@ async def get_issue_fix_details(issue_id: str):
         fix_data = fix_hits[0]["_source"]
 
         # 5. Fetch user information from Firestore
-        user_doc = db.collection("users").document(closed_by_uid).get()
+        user_data = await store.get_user(closed_by_uid)
         user_info = {}
 
-        if user_doc.exists:
-            user_data = user_doc.to_dict()
+        if user_data is not None:
             user_info = {
                 "name": user_data.get("name", "Anonymous NGO"),
                 "organization": user_data.get("organization", None),
@@ -2250,19 +3107,11 @@ async def get_citizen_leaderboard():
         raise HTTPException(503, "Firestore client not available")
     try:
         logger.info("Fetching citizen leaderboard...")
-        users_ref = db.collection("users")
         # Query for userType == "citizen", order by karma descending, limit to 10
-        query = (
-            users_ref.where(field_path="userType", op_string="==", value="citizen")
-            .order_by("karma", direction="DESCENDING")
-            .limit(10)
-        )
-        docs = query.stream()  # This is a synchronous call
-
+        top_users = await store.top_users_by_karma("citizen", limit=10)
         leaderboard = []
         rank = 1
-        for doc in docs:
-            user_data = doc.to_dict()
+        for user_data in top_users:
             leaderboard.append(
                 {
                     "rank": rank,
@@ -2287,19 +3136,11 @@ async def get_ngo_leaderboard():
         raise HTTPException(503, "Firestore client not available")
     try:
         logger.info("Fetching NGO leaderboard...")
-        users_ref = db.collection("users")
         # Query for userType == "ngo", order by karma descending, limit to 10
-        query = (
-            users_ref.where(field_path="userType", op_string="==", value="ngo")
-            .order_by("karma", direction="DESCENDING")
-            .limit(10)
-        )
-        docs = query.stream()  # Synchronous call
-
+        top_users = await store.top_users_by_karma("ngo", limit=10)
         leaderboard = []
         rank = 1
-        for doc in docs:
-            user_data = doc.to_dict()
+        for user_data in top_users:
             leaderboard.append(
                 {
                     "rank": rank,
@@ -2324,13 +3165,11 @@ async def get_upvote_status(issue_id: str, user: dict = Depends(get_current_user
         raise HTTPException(503, "Firestore unavailable")
 
     user_uid = user.get("uid")
-    upvote_doc_id = f"{issue_id}__{user_uid}"
 
     try:
-        upvote_doc = db.collection("upvotes").document(upvote_doc_id).get()
+        upvote_data = await store.get_upvote(issue_id, user_uid)
 
-        if upvote_doc.exists:
-            upvote_data = upvote_doc.to_dict()
+        if upvote_data is not None:
             return {
                 "hasUpvoted": upvote_data.get("isActive", False),
                 "upvotedAt": upvote_data.get("upvotedAt"),
@@ -2363,43 +3202,10 @@ async def get_batch_upvote_status(
     issue_ids = request.issue_ids
 
     try:
-        # Build document IDs for all issues (both upvotes and reports)
-        upvote_doc_ids = [f"{issue_id}__{user_uid}" for issue_id in issue_ids]
-        report_doc_ids = [f"{issue_id}__{user_uid}" for issue_id in issue_ids]
-
-        # Batch fetch upvotes from Firestore
-        upvote_refs = [
-            db.collection("upvotes").document(doc_id) for doc_id in upvote_doc_ids
-        ]
-
-        # Batch fetch reports from Firestore
-        report_refs = [
-            db.collection("reports").document(doc_id) for doc_id in report_doc_ids
-        ]
-
-        # Get all documents in two batch operations (efficient!)
-        upvote_docs = db.get_all(upvote_refs)
-        report_docs = db.get_all(report_refs)
-
-        # Build response maps
-        upvote_status = {}
-        report_status = {}
-
-        for i, doc in enumerate(upvote_docs):
-            issue_id = issue_ids[i]
-            if doc.exists:
-                upvote_data = doc.to_dict()
-                upvote_status[issue_id] = upvote_data.get("isActive", False)
-            else:
-                upvote_status[issue_id] = False
-
-        for i, doc in enumerate(report_docs):
-            issue_id = issue_ids[i]
-            if doc.exists:
-                report_data = doc.to_dict()
-                report_status[issue_id] = report_data.get("isActive", False)
-            else:
-                report_status[issue_id] = False
+        # Two concurrent batch reads (upvotes + reports), mapped back by document id
+        upvote_status, report_status = await store.get_interaction_status(
+            user_uid, issue_ids
+        )
 
         logger.info(
             f"Batch checked {len(issue_ids)} issues (upvotes + reports) for user {user_uid}"
@@ -2413,7 +3219,7 @@ async def get_batch_upvote_status(
 
 # --- *** UPDATED MAP ROUTE WITH CLUSTERING *** ---
 def get_geohash_precision(zoom: float) -> int:
-    """Determine geohash precision based on map zoom level."""
+    """Geohash precision of /api/map-data clusters at a map zoom level (a few hundred cells per viewport)."""
     if zoom < 3:
         return 1
     elif zoom < 5:
@@ -2423,46 +3229,74 @@ def get_geohash_precision(zoom: float) -> int:
     elif zoom < 10:
         return 4
     elif zoom < 12:
-        return 5  # Switch to points at zoom 12+
+        return 5  # Switch to points at zoom 12+ (MAP_POINTS_MIN_ZOOM)
     else:
         return 6  # Higher precision for filtering if needed, though points are shown
 
 
-# --- *** SIMPLIFIED MAP ROUTE (Always returns points) *** ---
-@app.get("/api/map-data")
-async def get_map_data(
-    zoom: float = Query(...),
-    bounds: str = Query(...),
-    filters: str = Query(...),
-    user: dict = Depends(get_current_user),
-):
-    """
-    Fetches issues for map view based on geographic bounds and filters.
-    ALWAYS returns individual points. The frontend decides how to display them.
-    """
-    if not es_client:
-        raise HTTPException(503, "Database unavailable")
-
-    try:
-        bounds_obj = json.loads(bounds)
-        filters_obj = json.loads(filters)
-        logger.info(
-            f"Fetching map points - Zoom: {zoom:.2f}, Bounds: {bounds_obj}, Filters: {filters_obj}"
+# Below this zoom /api/map-data returns geohash clusters instead of points
+MAP_POINTS_MIN_ZOOM = float(os.getenv("MAP_POINTS_MIN_ZOOM", "12"))
+MAP_MAX_CLUSTERS = int(os.getenv("MAP_MAX_CLUSTERS", "2000"))
+MAP_MAX_POINTS = 1000
+# What the map popup shows; the full documents are not needed
+MAP_POINT_FIELDS = [
+    "issue_id",
+    "location",
+    "status",
+    "issue_types",
+    "detected_issues",
+    "severity_score",
+    "description",
+    "auto_caption",
+    "display_address",
+    "photo_url",
+    "photo_variants",
+    "upvotes",
+    "reports",
+    "created_at",
+    "source",
+]
+
+
+# Properties of each issue in vector tiles: enough to style it and open its popup.
+# Single-valued fields only: _mvt `fields` does not support arrays (issue_types),
+# and the popup loads everything else by issue_id.
+MAP_VECTOR_TILE_FIELDS = ["issue_id", "status", "severity_score"]
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+def map_cluster_features(buckets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """GeoJSON features for geohash_grid buckets, placed at each bucket's centroid."""
+    features = []
+    for bucket in buckets:
+        centroid = (bucket.get("centroid") or {}).get("location")
+        if not centroid:
+            continue
+        count = bucket["doc_count"]
+        severity_sum = (bucket.get("severity") or {}).get("value") or 0.0
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [centroid["lon"], centroid["lat"]]},
+                "properties": {
+                    "cluster": True,
+                    "geohash": bucket["key"],
+                    "count": count,
+                    "severity_sum": round(severity_sum, 2),
+                    "severity_avg": round(severity_sum / count, 2) if count else None,
+                    "top_issue_types": [
+                        {"type": b["key"], "count": b["doc_count"]}
+                        for b in (bucket.get("top_types") or {}).get("buckets", [])
+                    ],
+                },
+            }
         )
-    except json.JSONDecodeError:
-        raise HTTPException(400, "Invalid bounds or filters JSON")
+    return features
 
-    # --- Build Base Query Filters ---
-    geo_filter = {
-        "geo_bounding_box": {
-            "location": {  # Assumes your geo field is named 'location'
-                "top_left": {"lat": bounds_obj["north"], "lon": bounds_obj["west"]},
-                "bottom_right": {"lat": bounds_obj["south"], "lon": bounds_obj["east"]},
-            }
-        }
-    }
 
-    active_filters = [geo_filter]  # Start with geo filter
+def map_filter_clauses(filters_obj: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ES filter clauses for the map's status/issue_type/source/date filters."""
+    active_filters = []
 
     # --- Apply Optional Filters ---
     # !! IMPORTANT: Assumes 'status', 'issue_types', 'source' are mapped as 'keyword' in ES !!
@@ -2484,53 +3318,128 @@ async def get_map_data(
         # Assumes 'reported_at' is your date field, mapped correctly in ES
         active_filters.append({"range": {"created_at": date_filter}})
 
-    # --- Combine filters ---
-    base_query = {"bool": {"filter": active_filters}}
+    return active_filters
 
-    try:
-        # --- Always Fetch Points ---
-        points_query = {
-            "query": base_query,  # Apply filters
-            "size": 1000,  # Limit number of points returned for performance
-            # Increase if needed, but consider impact
-            "_source": True,  # Fetch all fields needed for popup/heatmap weight
+
+async def query_map_features(zoom: float, bounds_obj: Dict[str, Any], filters_obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Clusters or points for a bounding box and filter set (shared by /api/map-data and /api/map-tiles).
+
+    Below MAP_POINTS_MIN_ZOOM the result is {"type": "clusters"}: one feature
+    per geohash cell (precision from the zoom) with the issue count, severity
+    sum/average and top issue types. From that zoom on it is {"type": "points"},
+    up to MAP_MAX_POINTS issues. Either way the payload and the ES work are
+    bounded, however many issues exist.
+    """
+    # --- Build Base Query Filters ---
+    geo_filter = {
+        "geo_bounding_box": {
+            "location": {  # Assumes your geo field is named 'location'
+                "top_left": {"lat": bounds_obj["north"], "lon": bounds_obj["west"]},
+                "bottom_right": {"lat": bounds_obj["south"], "lon": bounds_obj["east"]},
+            }
         }
+    }
 
-        logger.debug(f"Executing ES Points query: {json.dumps(points_query, indent=2)}")
-        search_resp = await es_client.search(index="issues", body=points_query)
-
-        hits = search_resp["hits"]["hits"]
-        points = []
-        for hit in hits:
-            source = hit.get("_source", {})
-            location = source.get("location")
-            # Basic check for valid location data
-            if location and "lon" in location and "lat" in location:
-                points.append(
-                    {
-                        "type": "Feature",
-                        "geometry": {
-                            "type": "Point",
-                            "coordinates": [
-                                location["lon"],
-                                location["lat"],
-                            ],  # Lon, Lat standard for GeoJSON
-                        },
-                        "properties": {
-                            **source,
-                            "id": hit["_id"],
-                        },  # Include document ID
-                    }
-                )
-            else:
-                logger.warning(
-                    f"Skipping hit {hit.get('_id', 'N/A')} due to missing/invalid location."
-                )
+    # --- Combine filters ---
+    base_query = {"bool": {"filter": [geo_filter, *map_filter_clauses(filters_obj)]}}
+
+    if zoom < MAP_POINTS_MIN_ZOOM:
+        precision = get_geohash_precision(zoom)
+        clusters_query = {
+            "query": base_query,
+            "size": 0,
+            "aggs": {
+                "cells": {
+                    "geohash_grid": {
+                        "field": "location",
+                        "precision": precision,
+                        "size": MAP_MAX_CLUSTERS,
+                    },
+                    "aggs": {
+                        "centroid": {"geo_centroid": {"field": "location"}},
+                        "severity": {"sum": {"field": "severity_score"}},
+                        "top_types": {"terms": {"field": "issue_types", "size": 3}},
+                    },
+                }
+            },
+        }
+        search_resp = await es_search(index="issues", body=clusters_query)
+        buckets = search_resp["aggregations"]["cells"]["buckets"]
+        clusters = map_cluster_features(buckets)
+        # hits.total stops counting at 10,000; the buckets hold every issue in view
+        total = sum(bucket["doc_count"] for bucket in buckets)
+        logger.info(
+            f"Returning {len(clusters)} clusters (geohash precision {precision}) for {total} issues."
+        )
+        return {"type": "clusters", "precision": precision, "total": total, "features": clusters}
+
+    points_query = {
+        "query": base_query,  # Apply filters
+        "size": MAP_MAX_POINTS,
+        "_source": MAP_POINT_FIELDS,  # Only what the popup/heatmap weight needs
+    }
+
+    logger.debug(f"Executing ES Points query: {json.dumps(points_query, indent=2)}")
+    search_resp = await es_search(index="issues", body=points_query)
+
+    hits = search_resp["hits"]["hits"]
+    points = []
+    for hit in hits:
+        source = hit.get("_source", {})
+        location = source.get("location")
+        # Basic check for valid location data
+        if location and "lon" in location and "lat" in location:
+            points.append(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [
+                            location["lon"],
+                            location["lat"],
+                        ],  # Lon, Lat standard for GeoJSON
+                    },
+                    "properties": {
+                        **source,
+                        "id": hit["_id"],
+                    },  # Include document ID
+                }
+            )
+        else:
+            logger.warning(
+                f"Skipping hit {hit.get('_id', 'N/A')} due to missing/invalid location."
+            )
+
+    logger.info(f"Returning {len(points)} points for map.")
+    return {"type": "points", "features": points}
+
+
+@app.get("/api/map-data")
+async def get_map_data(
+    zoom: float = Query(...),
+    bounds: str = Query(...),
+    filters: str = Query(...),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Fetches issues for map view based on geographic bounds and filters
+    (see query_map_features). Not cached: prefer /api/map-tiles/{z}/{x}/{y}.
+    """
+    if not es_client:
+        raise HTTPException(503, "Database unavailable")
 
-        logger.info(f"Returning {len(points)} points for map.")
-        # ALWAYS return type "points". JS will handle rendering.
-        return {"type": "points", "features": points}
+    try:
+        bounds_obj = json.loads(bounds)
+        filters_obj = json.loads(filters)
+        logger.info(
+            f"Fetching map points - Zoom: {zoom:.2f}, Bounds: {bounds_obj}, Filters: {filters_obj}"
+        )
+    except json.JSONDecodeError:
+        raise HTTPException(400, "Invalid bounds or filters JSON")
 
+    try:
+        return await query_map_features(zoom, bounds_obj, filters_obj)
     except NotFoundError:
         logger.warning("Issues index not found in Elasticsearch.")
         raise HTTPException(404, "Issues index not found")
@@ -2539,7 +3448,118 @@ async def get_map_data(
         raise HTTPException(500, "Failed to fetch map data")
 
 
-# --- *** END OF SIMPLIFIED MAP ROUTE *** ---
+def parse_tile_request(z: int, x: int, y: int, filters: str) -> Dict[str, Any]:
+    if not es_client:
+        raise HTTPException(503, "Database unavailable")
+    if not valid_tile(z, x, y):
+        raise HTTPException(400, f"Invalid tile {z}/{x}/{y} (zoom 0-{MAP_TILE_MAX_ZOOM})")
+    try:
+        filters_obj = json.loads(filters)
+    except json.JSONDecodeError:
+        raise HTTPException(400, "Invalid filters JSON")
+    if not isinstance(filters_obj, dict):
+        raise HTTPException(400, "Invalid filters JSON")
+    return filters_obj
+
+
+# Declared before /api/map-tiles/{z}/{x}/{y}, whose {y} would otherwise match "<y>.mvt"
+@app.get("/api/map-tiles/{z}/{x}/{y}.mvt")
+async def get_map_vector_tile(
+    z: int,
+    x: int,
+    y: int,
+    filters: str = Query("{}"),
+    user: dict = Depends(get_current_user),
+):
+    """
+    The map tile as a Mapbox Vector Tile, rendered by Elasticsearch (_mvt on
+    `location`) with the same filters as /api/map-tiles/{z}/{x}/{y}.
+
+    Below MAP_POINTS_MIN_ZOOM the tile has an "aggs" layer of geotile cells
+    (count, severity_sum) and no hits. From that zoom on it has a "hits" layer
+    of up to MAP_MAX_POINTS issues carrying only MAP_VECTOR_TILE_FIELDS; the
+    popup loads anything else by issue_id. Tiles are cached like the JSON ones.
+    """
+    filters_obj = parse_tile_request(z, x, y, filters)
+    tile = (z, x, y)
+    tile_filters = "mvt:" + filter_key(filters_obj)
+    headers = {"Cache-Control": f"private, max-age={map_tiles.ttl}"}
+    cached = map_tiles.get(tile, tile_filters)
+    if cached is None:
+        params: Dict[str, Any] = {
+            "index": "issues",
+            "field": "location",
+            "zoom": z,
+            "x": x,
+            "y": y,
+            "query": {"bool": {"filter": map_filter_clauses(filters_obj)}},
+            "exact_bounds": True,
+            "track_total_hits": False,
+        }
+        if z < MAP_POINTS_MIN_ZOOM:
+            params.update(
+                size=0,
+                grid_agg="geotile",
+                grid_type="centroid",
+                aggs={"severity_sum": {"sum": {"field": "severity_score"}}},
+            )
+        else:
+            params.update(size=MAP_MAX_POINTS, grid_precision=0, fields=MAP_VECTOR_TILE_FIELDS)
+        generation = map_tiles.generation
+        try:
+            cached = await es_search_mvt(**params)
+        except NotFoundError:
+            logger.warning("Issues index not found in Elasticsearch.")
+            raise HTTPException(404, "Issues index not found")
+        except Exception as e:
+            logger.exception(f"Error fetching vector tile {z}/{x}/{y}: {e}")
+            raise HTTPException(500, "Failed to fetch map data")
+        map_tiles.put(tile, tile_filters, cached, generation)
+    return Response(content=cached, media_type=MVT_MEDIA_TYPE, headers=headers)
+
+
+@app.get("/api/map-tiles/{z}/{x}/{y}")
+async def get_map_tile(
+    z: int,
+    x: int,
+    y: int,
+    filters: str = Query("{}"),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Clusters or points for one slippy-map tile (web mercator z/x/y), in the
+    same format as /api/map-data at zoom z.
+
+    Each (tile, filter set) is cached for MAP_TILE_CACHE_TTL_SECONDS and shared
+    by every client viewing that area, so panning mostly re-requests tiles that
+    are already cached. Writes to an issue invalidate only the tiles containing it.
+    """
+    filters_obj = parse_tile_request(z, x, y, filters)
+    tile = (z, x, y)
+    tile_filters = filter_key(filters_obj)
+    headers = {"Cache-Control": f"private, max-age={map_tiles.ttl}"}
+    cached = map_tiles.get(tile, tile_filters)
+    if cached is not None:
+        return JSONResponse(content=cached, headers=headers)
+
+    generation = map_tiles.generation
+    try:
+        result = await es_single_flight.do(
+            request_key("map_tile", {"tile": tile, "filters": tile_filters}),
+            lambda: query_map_features(z, tile_bounds(z, x, y), filters_obj),
+        )
+    except NotFoundError:
+        logger.warning("Issues index not found in Elasticsearch.")
+        raise HTTPException(404, "Issues index not found")
+    except Exception as e:
+        logger.exception(f"Error querying ES for map tile {z}/{x}/{y}: {e}")
+        raise HTTPException(500, "Failed to fetch map data")
+
+    result = {**result, "tile": {"z": z, "x": x, "y": y}}
+    map_tiles.put(tile, tile_filters, result, generation)
+    return JSONResponse(content=result, headers=headers)
+
+
 @app.get("/api/fixes")
 async def get_fixes():
     with open("simplified_civicfix_image_url.json", "r") as f:
@@ -0,0 +1,124 @@
+"""
+Slippy-map tile addressing and a per-tile cache for the map API.
+
+/api/map-data takes arbitrary viewport bounds, so every small pan is a new
+query. /api/map-tiles/{z}/{x}/{y} snaps the map to standard web-mercator
+tiles instead: the same tile is requested by every client looking at that
+area, and its response (clusters or points for one filter set) is cached
+here for MAP_TILE_CACHE_TTL_SECONDS. The .mvt variant caches its binary
+tiles here too, under an "mvt:" filter key.
+
+A write to an issue invalidates only the tiles containing it: one tile per
+zoom level, across all filter sets.
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+
+from cachetools import TTLCache
+
+MAP_TILE_CACHE_TTL_SECONDS = int(os.getenv("MAP_TILE_CACHE_TTL_SECONDS", "60"))
+MAP_TILE_CACHE_SIZE = int(os.getenv("MAP_TILE_CACHE_SIZE", "20000"))
+MAP_TILE_MAX_ZOOM = 20
+# Web mercator cannot represent the poles
+MAX_MERCATOR_LAT = 85.05112878
+
+TileKey = Tuple[int, int, int]
+
+
+def tile_bounds(z: int, x: int, y: int) -> Dict[str, float]:
+    """Bounds of a tile as {"north", "south", "east", "west"} in degrees."""
+    n = 2 ** z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return {"north": lat(y), "south": lat(y + 1), "west": x / n * 360.0 - 180.0, "east": (x + 1) / n * 360.0 - 180.0}
+
+
+def tile_for(lat: float, lon: float, z: int) -> TileKey:
+    """The tile at zoom z containing a point."""
+    n = 2 ** z
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return z, min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAP_TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def filter_key(filters: Dict[str, Any]) -> str:
+    """Canonical form of a map filter set: key order, list order and empty values do not matter."""
+    normalized = {}
+    for name, value in filters.items():
+        if value in (None, "", [], {}):
+            continue
+        normalized[name] = sorted(value) if isinstance(value, list) else value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class MapTileCache:
+    def __init__(
+        self,
+        ttl: int = MAP_TILE_CACHE_TTL_SECONDS,
+        maxsize: int = MAP_TILE_CACHE_SIZE,
+        max_zoom: int = MAP_TILE_MAX_ZOOM,
+    ):
+        self.ttl = ttl
+        self.max_zoom = max_zoom
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # tile -> filter keys cached for it, so a write finds its entries without a scan
+        self._filters_by_tile: Dict[TileKey, Set[str]] = {}
+        # Bumped on every invalidation; a tile computed before one is not stored
+        self.generation = 0
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "tiles_invalidated": 0, "full_invalidations": 0}
+
+    def get(self, tile: TileKey, filters: str) -> Optional[Any]:
+        value = self._entries.get((tile, filters))
+        self.metrics["hits" if value is not None else "misses"] += 1
+        return value
+
+    def put(self, tile: TileKey, filters: str, value: Any, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._entries[(tile, filters)] = value
+        self._filters_by_tile.setdefault(tile, set()).add(filters)
+        self.metrics["stores"] += 1
+        # Expired and evicted entries leave their tile in the index; drop those
+        # once they outnumber the live ones (amortized O(1) per put)
+        if len(self._filters_by_tile) > 2 * len(self._entries):
+            self._prune_index()
+
+    def _prune_index(self) -> None:
+        live: Dict[TileKey, Set[str]] = {}
+        for tile, filters in self._entries.keys():
+            live.setdefault(tile, set()).add(filters)
+        self._filters_by_tile = live
+
+    def invalidate_point(self, lat: float, lon: float) -> None:
+        """Drop every cached tile (any zoom, any filters) that contains the point."""
+        self.generation += 1
+        for z in range(self.max_zoom + 1):
+            tile = tile_for(lat, lon, z)
+            for filters in self._filters_by_tile.pop(tile, ()):
+                if self._entries.pop((tile, filters), None) is not None:
+                    self.metrics["tiles_invalidated"] += 1
+
+    def invalidate_all(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._filters_by_tile.clear()
+        self.metrics["full_invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+        }
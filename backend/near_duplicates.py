@@ -0,0 +1,199 @@
+"""
+Near-duplicate detection for new issue reports.
+
+Neighbours often photograph the same pothole separately. Each recent issue's
+photo dHash is kept in memory, bucketed by geohash cell, so a new report can
+be compared against the issues around it without touching ES. A report whose
+photo is within NEAR_DUP_MAX_HAMMING bits of an open issue's photo, within
+NEAR_DUP_RADIUS_METERS of it and sharing one of its issue types, is attached
+to that issue instead of going through the analyzer.
+
+The index is warmed from ES at startup and fed by every issue the gateway
+creates; issues created by other instances appear after their next restart.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from geoutils import geohash_encode, geohash_neighbors, haversine_km
+from imaging import hamming_distance
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() in ("1", "true", "yes")
+NEAR_DUP_RADIUS_METERS = float(os.getenv("NEAR_DUP_RADIUS_METERS", "50"))
+NEAR_DUP_MAX_HAMMING = int(os.getenv("NEAR_DUP_MAX_HAMMING", "10"))
+NEAR_DUP_WINDOW_DAYS = int(os.getenv("NEAR_DUP_WINDOW_DAYS", "30"))
+NEAR_DUP_INDEX_SIZE = int(os.getenv("NEAR_DUP_INDEX_SIZE", "200000"))
+# Precision 7 cells are ~150 m across, so the cell plus its 8 neighbours
+# always covers a radius of up to ~150 m.
+NEAR_DUP_GEOHASH_PRECISION = 7
+
+
+def parse_dhash(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value, 16) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def format_dhash(value: int) -> str:
+    return f"{value:016x}"
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+@dataclass
+class PhotoEntry:
+    issue_id: str
+    lat: float
+    lon: float
+    dhash: int
+    issue_types: Set[str]
+    created_at: float
+    cell: str
+
+
+@dataclass
+class NearDuplicate:
+    issue_id: str
+    distance_bits: int
+    distance_m: float
+
+
+class NearDuplicateIndex:
+    def __init__(
+        self,
+        radius_m: float = NEAR_DUP_RADIUS_METERS,
+        max_hamming: int = NEAR_DUP_MAX_HAMMING,
+        window_days: int = NEAR_DUP_WINDOW_DAYS,
+        maxsize: int = NEAR_DUP_INDEX_SIZE,
+        enabled: bool = NEAR_DUP_ENABLED,
+    ):
+        self.radius_m = radius_m
+        self.max_hamming = max_hamming
+        self.window_seconds = window_days * 24 * 3600
+        self.maxsize = maxsize
+        self.enabled = enabled
+        # issue_id -> entry, in insertion order so the oldest is evicted first
+        self._entries: Dict[str, PhotoEntry] = {}
+        self._cells: Dict[str, Set[str]] = {}
+        self.metrics = {"lookups": 0, "matches": 0, "candidates_compared": 0, "loaded": 0}
+
+    @staticmethod
+    def normalize_types(types: Iterable[str]) -> Set[str]:
+        return {t.strip().lower().replace(" ", "_") for t in types if t and t.strip()}
+
+    def add(
+        self,
+        issue_id: str,
+        lat: float,
+        lon: float,
+        dhash: int,
+        issue_types: Iterable[str],
+        created_at: Any = None,
+    ) -> None:
+        self.remove(issue_id)
+        cell = geohash_encode(lat, lon, NEAR_DUP_GEOHASH_PRECISION)
+        self._entries[issue_id] = PhotoEntry(
+            issue_id=issue_id,
+            lat=lat,
+            lon=lon,
+            dhash=dhash,
+            issue_types=self.normalize_types(issue_types),
+            created_at=_timestamp(created_at) if created_at is not None else time.time(),
+            cell=cell,
+        )
+        self._cells.setdefault(cell, set()).add(issue_id)
+        while len(self._entries) > self.maxsize:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, issue_id: str) -> None:
+        entry = self._entries.pop(issue_id, None)
+        if entry is None:
+            return
+        bucket = self._cells.get(entry.cell)
+        if bucket is not None:
+            bucket.discard(issue_id)
+            if not bucket:
+                del self._cells[entry.cell]
+
+    def find(
+        self, lat: float, lon: float, dhash: Optional[int], issue_types: Iterable[str]
+    ) -> Optional[NearDuplicate]:
+        """Closest matching recent photo (by Hamming distance), or None."""
+        types = self.normalize_types(issue_types)
+        if not self.enabled or dhash is None or not types:
+            return None
+        self.metrics["lookups"] += 1
+        cutoff = time.time() - self.window_seconds
+        best: Optional[NearDuplicate] = None
+        for cell in geohash_neighbors(lat, lon, NEAR_DUP_GEOHASH_PRECISION):
+            for issue_id in list(self._cells.get(cell, ())):
+                entry = self._entries[issue_id]
+                if entry.created_at < cutoff:
+                    self.remove(issue_id)
+                    continue
+                if not (entry.issue_types & types):
+                    continue
+                self.metrics["candidates_compared"] += 1
+                bits = hamming_distance(dhash, entry.dhash)
+                if bits > self.max_hamming or (best and bits >= best.distance_bits):
+                    continue
+                meters = haversine_km(lat, lon, entry.lat, entry.lon) * 1000
+                if meters <= self.radius_m:
+                    best = NearDuplicate(issue_id=issue_id, distance_bits=bits, distance_m=round(meters, 1))
+        if best:
+            self.metrics["matches"] += 1
+        return best
+
+    async def load(self, es, index: str = "issues", limit: int = 10000) -> int:
+        """Warm the index with recent open issues that have a photo hash."""
+        if not self.enabled or es is None:
+            return 0
+        resp = await es.search(
+            index=index,
+            size=limit,
+            query={
+                "bool": {
+                    "filter": [
+                        {"exists": {"field": "photo_dhash"}},
+                        {"term": {"status": "open"}},
+                        {"range": {"created_at": {"gte": f"now-{self.window_seconds // 86400}d"}}},
+                    ]
+                }
+            },
+            source=["photo_dhash", "location", "issue_types", "created_at"],
+            sort=[{"created_at": {"order": "asc"}}],
+        )
+        hits: List[Dict[str, Any]] = resp["hits"]["hits"]
+        for hit in hits:
+            src = hit.get("_source", {})
+            dhash = parse_dhash(src.get("photo_dhash"))
+            loc = src.get("location") or {}
+            if dhash is None or loc.get("lat") is None or loc.get("lon") is None:
+                continue
+            self.add(hit["_id"], loc["lat"], loc["lon"], dhash, src.get("issue_types") or [], src.get("created_at"))
+        self.metrics["loaded"] = len(hits)
+        return len(hits)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "cells": len(self._cells),
+            "radius_m": self.radius_m,
+            "max_hamming": self.max_hamming,
+        }
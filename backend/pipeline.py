@@ -0,0 +1,158 @@
+"""
+Async stage graphs for request handlers with several independent slow steps.
+
+A Pipeline is a set of named async stages with declared dependencies. Each
+stage starts as soon as the stages it depends on have finished, so
+independent work (an upload, a profile read, a geocode) overlaps and the
+end-to-end latency tends towards the critical path instead of the sum of all
+steps. Stage functions receive the results of earlier stages by name.
+
+A failing stage cancels the stages still running, except those declared with
+cancellable=False: stages with external side effects (an analyzer call that
+indexes an issue, a karma award) are left to finish, because cancelling the
+local await would not undo the remote write.
+
+Per-stage timings are kept per run (for a Server-Timing header) and
+aggregated per pipeline name in PipelineMetrics (for /metrics).
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+StageFn = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class _Stage:
+    fn: StageFn
+    deps: Tuple[str, ...]
+    cancellable: bool = True
+
+
+@dataclass
+class _StageStats:
+    count: int = 0
+    failures: int = 0
+    seconds_total: float = 0.0
+    seconds_max: float = 0.0
+
+    def add(self, seconds: float, failed: bool) -> None:
+        self.count += 1
+        self.failures += int(failed)
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.seconds_total / self.count * 1000, 1) if self.count else 0.0,
+            "max_ms": round(self.seconds_max * 1000, 1),
+        }
+
+
+@dataclass
+class _PipelineStats:
+    total: _StageStats = field(default_factory=_StageStats)
+    stages: Dict[str, _StageStats] = field(default_factory=dict)
+
+
+class PipelineMetrics:
+    """Aggregated timings of every run, by pipeline and stage."""
+
+    def __init__(self):
+        self._pipelines: Dict[str, _PipelineStats] = {}
+
+    def record(self, pipeline: "Pipeline", failed: bool) -> None:
+        stats = self._pipelines.setdefault(pipeline.name, _PipelineStats())
+        stats.total.add(pipeline.elapsed, failed)
+        for name, seconds in pipeline.timings.items():
+            stats.stages.setdefault(name, _StageStats()).add(seconds, name in pipeline.failed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                **stats.total.as_dict(),
+                "stages": {stage: s.as_dict() for stage, s in stats.stages.items()},
+            }
+            for name, stats in self._pipelines.items()
+        }
+
+
+class Pipeline:
+    def __init__(self, name: str, metrics: Optional[PipelineMetrics] = None):
+        self.name = name
+        self.metrics = metrics
+        self._stages: Dict[str, _Stage] = {}
+        self.timings: Dict[str, float] = {}
+        self.failed: set = set()
+        self.results: Dict[str, Any] = {}
+        self.elapsed = 0.0
+
+    def stage(self, name: str, fn: StageFn, deps: Sequence[str] = (), cancellable: bool = True) -> None:
+        """
+        Add a stage; dependencies must already be declared, which rules out cycles.
+        A stage with cancellable=False is not cancelled when another stage fails.
+        """
+        if name in self._stages:
+            raise ValueError(f"Duplicate stage {name}")
+        missing = [d for d in deps if d not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on undeclared stages {missing}")
+        self._stages[name] = _Stage(fn=fn, deps=tuple(deps), cancellable=cancellable)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run all stages, each as soon as its dependencies are done. Returns
+        {stage: result}. The first stage to fail cancels the rest (waiting for
+        the non-cancellable ones to finish), and its exception is re-raised.
+        Results of the stages that did finish stay in `self.results`.
+        """
+        results = self.results
+        tasks: Dict[str, asyncio.Task] = {}
+        started = time.perf_counter()
+
+        async def run_stage(name: str, stage: _Stage) -> None:
+            if stage.deps:
+                await asyncio.gather(*(tasks[d] for d in stage.deps))
+            stage_started = time.perf_counter()
+            try:
+                results[name] = await stage.fn(results)
+            except asyncio.CancelledError:
+                raise  # another stage failed; not this stage's failure
+            except BaseException:
+                self.failed.add(name)
+                self.timings[name] = time.perf_counter() - stage_started
+                raise
+            self.timings[name] = time.perf_counter() - stage_started
+
+        for name, stage in self._stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, stage))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for name, task in tasks.items():
+                if self._stages[name].cancellable:
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            self._finish(started, failed=True)
+            raise
+        self._finish(started, failed=False)
+        return results
+
+    def _finish(self, started: float, failed: bool) -> None:
+        self.elapsed = time.perf_counter() - started
+        if self.metrics is not None:
+            self.metrics.record(self, failed)
+        logger.debug(f"Pipeline {self.name}: {self.server_timing()}")
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one entry per stage that ran, plus the total."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.timings.items()]
+        entries.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ", ".join(entries)
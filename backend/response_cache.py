@@ -0,0 +1,137 @@
+"""
+Stale-while-revalidate cache for public, caller-independent responses
+(/issues/latest, /api/issues).
+
+- An entry is fresh for `ttl` seconds and served as-is.
+- After that it is served stale for up to `stale_ttl` more seconds while one
+  background task recomputes it. A burst of app opens therefore costs one ES
+  query, not one per request.
+- A miss is computed once; concurrent requests for the same key await that
+  single computation.
+- invalidate() drops every entry after our own writes (submit, upvote,
+  report, fix). A computation that started before the invalidation is
+  returned to the requests already waiting on it, but not stored or shared.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_TTL_SECONDS = float(os.getenv("FEED_CACHE_TTL_SECONDS", "10"))
+FEED_CACHE_STALE_SECONDS = float(os.getenv("FEED_CACHE_STALE_SECONDS", "60"))
+FEED_CACHE_SIZE = int(os.getenv("FEED_CACHE_SIZE", "1000"))
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        ttl: float = FEED_CACHE_TTL_SECONDS,
+        stale_ttl: float = FEED_CACHE_STALE_SECONDS,
+        maxsize: int = FEED_CACHE_SIZE,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: LRUCache = LRUCache(maxsize=maxsize)
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._generation = 0
+        self.metrics = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "invalidations": 0,
+        }
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.fresh_until:
+            self.metrics["hits"] += 1
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            self.metrics["stale_hits"] += 1
+            self._refresh_in_background(key, compute)
+            return entry.value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.metrics["coalesced"] += 1
+        else:
+            self.metrics["misses"] += 1
+            pending = self._start(key, compute)
+        # Shielded: a caller that goes away does not cancel it for the others
+        return await asyncio.shield(pending)
+
+    def _start(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        generation = self._generation
+
+        async def _run() -> Any:
+            try:
+                value = await compute()
+            finally:
+                if self._pending.get(key) is asyncio.current_task():
+                    self._pending.pop(key)
+            if generation == self._generation:
+                now = time.monotonic()
+                self._entries[key] = _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+            return value
+
+        task = asyncio.create_task(_run())
+        self._pending[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()  # mark retrieved; awaiting callers re-raise it themselves
+
+    def _refresh_in_background(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._pending:
+            return
+        self.metrics["refreshes"] += 1
+        task = self._start(key, compute)
+
+        def _log_failure(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                # Keep serving the stale entry until it expires
+                self.metrics["refresh_errors"] += 1
+                logger.warning(f"Background refresh of {key} failed: {task.exception()}")
+
+        task.add_done_callback(_log_failure)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        # Requests from now on must not join computations that started before the write
+        self._pending.clear()
+        self.metrics["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["stale_hits"] + self.metrics["misses"] + self.metrics["coalesced"]
+        served_cached = lookups - self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(served_cached / lookups, 4) if lookups else 0.0,
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale_ttl,
+        }
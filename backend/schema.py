@@ -15,6 +15,9 @@ class ReportIn(BaseModel):
     user_selected_labels: List[str] = []
     reported_by: Optional[str] = None
     source: Optional[str] = "citizen"  # citizen | anonymous
+    display_address: Optional[str] = None
+    photo_variants: Optional[Dict[str, str]] = None
+    photo_dhash: Optional[str] = None
 
 
 class DetectedIssue(BaseModel):
@@ -0,0 +1,76 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+When a push notification sends thousands of users into the app at once,
+the gateway issues the same ES searches concurrently (the same
+/issues/latest page, the same nearby-feed cell). SingleFlight lets the
+first caller for a key run the call while the others wait on it, and fans
+out the result (or the exception) to all of them. Nothing is kept after
+the call completes: this is coalescing, not caching.
+
+A shared result is deep-copied per caller, because handlers annotate the
+hits they get (distance, user status) in place.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def request_key(operation: str, params: Dict[str, Any]) -> str:
+    """Stable key for an operation and its parameters (dict order does not matter)."""
+    canonical = json.dumps([operation, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # Every caller may have gone away; the callers that remain re-raise it themselves
+    if not task.cancelled():
+        task.exception()
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    callers: int = 1
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.metrics = {"calls": 0, "executions": 0, "coalesced": 0, "max_fan_out": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.metrics["calls"] += 1
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.callers += 1
+            self.metrics["coalesced"] += 1
+        else:
+            self.metrics["executions"] += 1
+            flight = _Flight(task=asyncio.create_task(self._run(key, fn)))
+            flight.task.add_done_callback(_retrieve_exception)
+            self._flights[key] = flight
+        # Shielded: a caller that goes away does not cancel the call for the others
+        result = await asyncio.shield(flight.task)
+        # No one can join once the task is done, so `callers` is final here
+        return copy.deepcopy(result) if flight.callers > 1 else result
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        finally:
+            flight = self._flights.pop(key, None)
+            if flight is not None:
+                self.metrics["max_fan_out"] = max(self.metrics["max_fan_out"], flight.callers)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.metrics["calls"]
+        return {
+            **self.metrics,
+            "coalescing_ratio": round(self.metrics["coalesced"] / calls, 4) if calls else 0.0,
+            "in_flight": len(self._flights),
+        }
@@ -0,0 +1,295 @@
+"""
+Cached, mostly offline Firebase ID-token verification for the auth middleware.
+
+- Signatures are verified locally (PyJWT, RS256) against Google's securetoken
+  public keys, which are cached and refreshed in the background according to
+  their Cache-Control max-age.
+- Decoded tokens are cached by SHA-256 of the raw token until their `exp`.
+- Revocation/disabled status is refreshed in the background for recently seen
+  uids (batched `auth.get_users`) instead of a Firebase round trip per request.
+  A revoked token is therefore rejected within one refresh interval.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional, Set
+
+import jwt
+import requests
+from cachetools import TLRUCache
+from cryptography.x509 import load_pem_x509_certificate
+from firebase_admin import auth
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CLOCK_SKEW_SECONDS = int(os.getenv("TOKEN_CLOCK_SKEW_SECONDS", "10"))
+REVOCATION_REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", "60"))
+# Only uids seen within this window are re-checked for revocation.
+REVOCATION_ACTIVE_WINDOW_SECONDS = int(os.getenv("REVOCATION_ACTIVE_WINDOW_SECONDS", "3600"))
+CERTS_MIN_REFRESH_SECONDS = 60
+CERTS_FALLBACK_MAX_AGE_SECONDS = 3600
+GET_USERS_BATCH_SIZE = 100  # Firebase Auth limit per get_users call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+
+class TokenVerificationError(ValueError):
+    """The token is malformed, expired, or fails signature/claim checks."""
+
+
+class TokenRevokedError(TokenVerificationError):
+    """The token was issued before the user's tokens were revoked."""
+
+
+class TokenUserDisabledError(TokenVerificationError):
+    """The token belongs to a disabled user."""
+
+
+class FirebaseTokenVerifier:
+    def __init__(
+        self,
+        project_id: Optional[str],
+        cache_size: int = TOKEN_CACHE_SIZE,
+        revocation_interval: int = REVOCATION_REFRESH_SECONDS,
+    ):
+        self.project_id = project_id
+        self.issuer = f"https://securetoken.google.com/{project_id}" if project_id else None
+        self.revocation_interval = revocation_interval
+        # sha256(token) -> decoded claims; each entry expires at the token's own `exp`
+        self._tokens: TLRUCache = TLRUCache(
+            maxsize=cache_size,
+            ttu=lambda _key, claims, _now: claims["exp"] + TOKEN_CLOCK_SKEW_SECONDS,
+            timer=time.time,
+        )
+        self._public_keys: Dict[str, Any] = {}
+        self._certs_expire_at = 0.0
+        self._certs_lock = asyncio.Lock()
+        # Refresh forced by an unknown `kid`; at most one per CERTS_MIN_REFRESH_SECONDS
+        self._forced_refresh: Optional[asyncio.Task] = None
+        self._forced_refresh_at = float("-inf")
+        # uid -> revocation cut-off (epoch seconds); tokens with iat below it are revoked
+        self._valid_after: Dict[str, float] = {}
+        self._disabled: Set[str] = set()
+        self._active_uids: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.metrics: Dict[str, Any] = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "invalid": 0,
+            "revoked": 0,
+            "disabled": 0,
+            "cert_refreshes": 0,
+            "cert_refresh_failures": 0,
+            "unknown_kid_rejections": 0,
+            "revocation_refreshes": 0,
+            "revocation_refresh_failures": 0,
+            "latency_count": 0,
+            "latency_seconds_total": 0.0,
+            "latency_seconds_max": 0.0,
+            "latency_buckets": {str(b): 0 for b in LATENCY_BUCKETS + ("+Inf",)},
+        }
+
+    # --- Public keys ---
+    def _fetch_certs_blocking(self) -> Dict[str, Any]:
+        resp = requests.get(GOOGLE_CERTS_URL, timeout=10)
+        resp.raise_for_status()
+        max_age = CERTS_FALLBACK_MAX_AGE_SECONDS
+        match = re.search(r"max-age=(\d+)", resp.headers.get("Cache-Control", ""))
+        if match:
+            max_age = int(match.group(1))
+        keys = {
+            kid: load_pem_x509_certificate(pem.encode("utf-8")).public_key()
+            for kid, pem in resp.json().items()
+        }
+        return {"keys": keys, "max_age": max_age}
+
+    async def refresh_certs(self) -> None:
+        async with self._certs_lock:
+            try:
+                result = await asyncio.to_thread(self._fetch_certs_blocking)
+            except Exception as e:
+                self.metrics["cert_refresh_failures"] += 1
+                logger.error(f"Failed to refresh Firebase public keys: {e}")
+                return
+            self._public_keys = result["keys"]
+            self._certs_expire_at = time.time() + result["max_age"]
+            self.metrics["cert_refreshes"] += 1
+            logger.info(
+                f"Refreshed {len(self._public_keys)} Firebase public keys (max-age {result['max_age']}s)"
+            )
+
+    async def _refresh_certs_for_unknown_kid(self) -> None:
+        """
+        Refetch the keys, unless a forced refresh already ran within
+        CERTS_MIN_REFRESH_SECONDS: tokens with random `kid`s must not turn
+        into one fetch to Google each. Callers arriving while a refresh runs share it.
+        """
+        if self._forced_refresh is None or self._forced_refresh.done():
+            now = time.monotonic()
+            if now - self._forced_refresh_at < CERTS_MIN_REFRESH_SECONDS:
+                return
+            self._forced_refresh_at = now
+            self._forced_refresh = asyncio.create_task(self.refresh_certs())
+        await asyncio.shield(self._forced_refresh)
+
+    async def _cert_refresh_loop(self) -> None:
+        while True:
+            # Refresh a little before Google rotates/expires the published keys
+            delay = max(CERTS_MIN_REFRESH_SECONDS, (self._certs_expire_at - time.time()) * 0.9)
+            await asyncio.sleep(delay)
+            await self.refresh_certs()
+
+    # --- Revocation ---
+    def _fetch_user_status_blocking(self, uids):
+        result = auth.get_users([auth.UidIdentifier(uid) for uid in uids])
+        return [
+            (u.uid, u.disabled, (u.tokens_valid_after_timestamp or 0) / 1000.0)
+            for u in result.users
+        ]
+
+    async def refresh_revocations(self) -> None:
+        cutoff = time.time() - REVOCATION_ACTIVE_WINDOW_SECONDS
+        for uid, last_seen in list(self._active_uids.items()):
+            if last_seen < cutoff:
+                self._active_uids.pop(uid, None)
+        uids = list(self._active_uids)
+        for start in range(0, len(uids), GET_USERS_BATCH_SIZE):
+            batch = uids[start : start + GET_USERS_BATCH_SIZE]
+            try:
+                statuses = await asyncio.to_thread(self._fetch_user_status_blocking, batch)
+            except Exception as e:
+                self.metrics["revocation_refresh_failures"] += 1
+                logger.error(f"Failed to refresh revocation status for {len(batch)} users: {e}")
+                continue
+            for uid, disabled, valid_after in statuses:
+                self._valid_after[uid] = valid_after
+                if disabled:
+                    self._disabled.add(uid)
+                else:
+                    self._disabled.discard(uid)
+        self.metrics["revocation_refreshes"] += 1
+
+    async def _revocation_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.revocation_interval)
+            await self.refresh_revocations()
+
+    def _check_revocation(self, claims: Dict[str, Any]) -> None:
+        uid = claims["uid"]
+        self._active_uids[uid] = time.time()
+        if uid in self._disabled:
+            self.metrics["disabled"] += 1
+            raise TokenUserDisabledError(f"User {uid} is disabled")
+        if claims.get("iat", 0) < self._valid_after.get(uid, 0):
+            self.metrics["revoked"] += 1
+            raise TokenRevokedError(f"Token for {uid} has been revoked")
+
+    # --- Verification ---
+    async def _decode(self, id_token: str) -> Dict[str, Any]:
+        if not self.project_id:
+            # No project id to check aud/iss against: defer to the Admin SDK (still no revocation RPC)
+            try:
+                return await asyncio.to_thread(auth.verify_id_token, id_token, check_revoked=False)
+            except (ValueError, auth.InvalidIdTokenError) as e:
+                raise TokenVerificationError(str(e)) from e
+
+        try:
+            kid = jwt.get_unverified_header(id_token).get("kid")
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Malformed token header: {e}") from e
+        if not kid:
+            raise TokenVerificationError("Token has no 'kid' header")
+
+        key = self._public_keys.get(kid)
+        if key is None:
+            # Keys may have rotated since the last refresh
+            await self._refresh_certs_for_unknown_kid()
+            key = self._public_keys.get(kid)
+            if key is None:
+                self.metrics["unknown_kid_rejections"] += 1
+                raise TokenVerificationError(f"Unknown signing key id: {kid}")
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                key=key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=self.issuer,
+                leeway=TOKEN_CLOCK_SKEW_SECONDS,
+                options={"require": ["exp", "iat", "sub", "aud", "iss"]},
+            )
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(str(e)) from e
+
+        sub = claims.get("sub")
+        if not isinstance(sub, str) or not sub or len(sub) > 128:
+            raise TokenVerificationError("Token has an invalid 'sub' claim")
+        if claims.get("auth_time", 0) > time.time() + TOKEN_CLOCK_SKEW_SECONDS:
+            raise TokenVerificationError("Token 'auth_time' is in the future")
+        claims["uid"] = sub  # Same shape as firebase_admin.auth.verify_id_token
+        return claims
+
+    def _observe_latency(self, seconds: float) -> None:
+        self.metrics["latency_count"] += 1
+        self.metrics["latency_seconds_total"] += seconds
+        self.metrics["latency_seconds_max"] = max(self.metrics["latency_seconds_max"], seconds)
+        for bucket in LATENCY_BUCKETS:
+            if seconds <= bucket:
+                self.metrics["latency_buckets"][str(bucket)] += 1
+                return
+        self.metrics["latency_buckets"]["+Inf"] += 1
+
+    async def verify(self, id_token: str) -> Dict[str, Any]:
+        """Return decoded claims or raise a TokenVerificationError subclass."""
+        started = time.perf_counter()
+        try:
+            cache_key = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+            claims = self._tokens.get(cache_key)
+            if claims is not None:
+                self.metrics["cache_hits"] += 1
+            else:
+                self.metrics["cache_misses"] += 1
+                try:
+                    claims = await self._decode(id_token)
+                except TokenVerificationError:
+                    self.metrics["invalid"] += 1
+                    raise
+                self._tokens[cache_key] = claims
+            self._check_revocation(claims)
+            return claims
+        finally:
+            self._observe_latency(time.perf_counter() - started)
+
+    # --- Lifecycle ---
+    async def start(self) -> None:
+        if self.project_id:
+            await self.refresh_certs()
+            self._tasks.add(asyncio.create_task(self._cert_refresh_loop()))
+        else:
+            logger.warning("No Firebase project id; token signatures are verified via the Admin SDK.")
+        self._tasks.add(asyncio.create_task(self._revocation_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["cache_hits"] + self.metrics["cache_misses"]
+        count = self.metrics["latency_count"]
+        return {
+            **self.metrics,
+            "cache_hit_rate": round(self.metrics["cache_hits"] / lookups, 4) if lookups else 0.0,
+            "latency_seconds_avg": round(self.metrics["latency_seconds_total"] / count, 6) if count else 0.0,
+            "cached_tokens": len(self._tokens),
+            "public_keys": len(self._public_keys),
+            "tracked_uids": len(self._active_uids),
+        }
@@ -0,0 +1,254 @@
+"""
+Concurrent upload pipeline for submission photos.
+
+Blocking storage SDK calls run on a dedicated, bounded thread pool so several
+photos upload in parallel without ever blocking the event loop. Results come
+back in the order the files were given, with a per-file error instead of an
+all-or-nothing failure.
+
+Sources may be bytes or a file object (e.g. the multipart request's spooled
+temp file). File objects are streamed: GCS gets a chunked resumable upload
+for anything above the 8 MB multipart threshold, so memory per upload stays
+bounded (one multipart body or one chunk) however large the file is.
+
+Issue photos are stored content-addressed (object name derived from the
+SHA-256 of the bytes); items flagged skip_if_exists are not re-uploaded when
+an object with that name is already there, so a resubmitted photo costs one
+existence check instead of a full upload.
+
+Backends:
+- GCSBackend:      google-cloud-storage bucket (production)
+- LocalFSBackend:  files under a local directory, for offline runs/benchmarks
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_BACKEND = os.getenv("UPLOAD_BACKEND", "gcs").lower()
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+LOCAL_UPLOAD_DIR = os.getenv(
+    "LOCAL_UPLOAD_DIR", os.path.join(os.path.dirname(__file__), "local_uploads")
+)
+LOCAL_UPLOAD_BASE_URL = os.getenv("LOCAL_UPLOAD_BASE_URL", "file://" + LOCAL_UPLOAD_DIR)
+# GCS requires resumable chunks to be a multiple of 256 KiB
+_GCS_CHUNK_UNIT = 256 * 1024
+UPLOAD_CHUNK_SIZE = max(
+    _GCS_CHUNK_UNIT,
+    int(os.getenv("UPLOAD_CHUNK_SIZE", str(4 * 1024 * 1024))) // _GCS_CHUNK_UNIT * _GCS_CHUNK_UNIT,
+)
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_FILES_PER_SUBMISSION = int(os.getenv("MAX_FILES_PER_SUBMISSION", "10"))
+# Slack for multipart boundaries and the non-file form fields
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+UploadSource = Union[bytes, BinaryIO]
+
+
+def stream_size(fileobj: BinaryIO) -> int:
+    """Size of a seekable file object; leaves it rewound to the start."""
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+def content_sha256(source: UploadSource) -> str:
+    """Hex SHA-256 of bytes or a seekable file object (read in chunks, then rewound)."""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def content_object_name(prefix: str, digest: str, filename: Optional[str] = None) -> str:
+    """issues + <sha256> + photo.JPG -> issues/sha256/<sha256>.jpg"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return f"{prefix}/sha256/{digest}{ext}"
+
+
+def read_stream(fileobj: BinaryIO) -> bytes:
+    """Whole content of a seekable file object; leaves it rewound to the start."""
+    fileobj.seek(0)
+    data = fileobj.read()
+    fileobj.seek(0)
+    return data
+
+
+@dataclass
+class UploadItem:
+    object_name: str
+    source: UploadSource
+    content_type: Optional[str] = None
+    filename: Optional[str] = None
+    size: Optional[int] = None
+    # Content-addressed items: an existing object with the same name already holds these bytes
+    skip_if_exists: bool = False
+
+    def __post_init__(self):
+        if self.size is None:
+            self.size = len(self.source) if isinstance(self.source, (bytes, bytearray)) else stream_size(self.source)
+
+
+@dataclass
+class UploadResult:
+    index: int
+    filename: Optional[str]
+    object_name: str
+    url: Optional[str] = None
+    error: Optional[str] = None
+    existed: bool = False  # skipped: identical content was already stored
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class GCSBackend:
+    def __init__(self, client, bucket_name: str):
+        self.bucket = client.bucket(bucket_name)
+        self.bucket_name = bucket_name
+
+    def url_for(self, object_name: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket_name}/{object_name}"
+
+    def exists(self, object_name: str) -> bool:
+        return self.bucket.blob(object_name).exists()
+
+    def put(self, object_name: str, source: UploadSource, size: int, content_type: Optional[str]) -> str:
+        blob = self.bucket.blob(object_name, chunk_size=UPLOAD_CHUNK_SIZE)
+        if isinstance(source, (bytes, bytearray)):
+            blob.upload_from_string(source, content_type=content_type)
+        else:
+            # Up to 8 MB goes as one multipart request; larger files use a resumable
+            # session that reads and sends UPLOAD_CHUNK_SIZE at a time.
+            source.seek(0)
+            blob.upload_from_file(source, size=size, content_type=content_type)
+        return self.url_for(object_name)
+
+
+class LocalFSBackend:
+    def __init__(self, root: str = LOCAL_UPLOAD_DIR, base_url: str = LOCAL_UPLOAD_BASE_URL):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, object_name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, object_name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Object name escapes upload root: {object_name}")
+        return path
+
+    def url_for(self, object_name: str) -> str:
+        return f"{self.base_url}/{object_name}"
+
+    def exists(self, object_name: str) -> bool:
+        return os.path.exists(self._path(object_name))
+
+    def put(self, object_name: str, source: UploadSource, size: int, content_type: Optional[str]) -> str:
+        path = self._path(object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fh:
+            if isinstance(source, (bytes, bytearray)):
+                fh.write(source)
+            else:
+                source.seek(0)
+                shutil.copyfileobj(source, fh, UPLOAD_CHUNK_SIZE)
+        os.replace(tmp_path, path)
+        return self.url_for(object_name)
+
+
+class UploadPipeline:
+    def __init__(self, backend, concurrency: int = UPLOAD_CONCURRENCY):
+        self.backend = backend
+        # One pool per process: bounds parallel uploads across all requests, not per request
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="upload")
+        self.metrics: Dict[str, Any] = {
+            "uploads": 0,
+            "failures": 0,
+            "bytes": 0,
+            "dedup_hits": 0,
+            "dedup_bytes_skipped": 0,
+            "upload_seconds_total": 0.0,
+            "upload_seconds_max": 0.0,
+        }
+
+    def _put_timed(self, item: UploadItem) -> Tuple[str, bool]:
+        if item.skip_if_exists and self.backend.exists(item.object_name):
+            return self.backend.url_for(item.object_name), True
+        started = time.perf_counter()
+        url = self.backend.put(item.object_name, item.source, item.size, item.content_type)
+        elapsed = time.perf_counter() - started
+        self.metrics["upload_seconds_total"] += elapsed
+        self.metrics["upload_seconds_max"] = max(self.metrics["upload_seconds_max"], elapsed)
+        return url, False
+
+    async def _upload(self, index: int, item: UploadItem) -> UploadResult:
+        result = UploadResult(index=index, filename=item.filename, object_name=item.object_name)
+        loop = asyncio.get_running_loop()
+        try:
+            result.url, result.existed = await loop.run_in_executor(self._executor, self._put_timed, item)
+            if result.existed:
+                self.metrics["dedup_hits"] += 1
+                self.metrics["dedup_bytes_skipped"] += item.size
+                return result
+            self.metrics["uploads"] += 1
+            self.metrics["bytes"] += item.size
+        except Exception as e:
+            self.metrics["failures"] += 1
+            result.error = str(e) or e.__class__.__name__
+            logger.error(f"Upload failed for {item.filename or item.object_name}: {result.error}")
+        return result
+
+    async def upload_one(self, item: UploadItem) -> UploadResult:
+        return await self._upload(0, item)
+
+    def url_for(self, object_name: str) -> str:
+        return self.backend.url_for(object_name)
+
+    async def existing_url(self, object_name: str) -> Optional[str]:
+        """URL of object_name if it is already stored, else None (errors count as absent)."""
+        loop = asyncio.get_running_loop()
+        try:
+            if await loop.run_in_executor(self._executor, self.backend.exists, object_name):
+                return self.backend.url_for(object_name)
+        except Exception as e:
+            logger.warning(f"Existence check failed for {object_name}: {e}")
+        return None
+
+    async def upload_many(self, items: Sequence[UploadItem]) -> List[UploadResult]:
+        """Upload concurrently; results are in input order, failures reported per item."""
+        return list(await asyncio.gather(*(self._upload(i, item) for i, item in enumerate(items))))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        done = self.metrics["uploads"]
+        return {
+            **self.metrics,
+            "backend": type(self.backend).__name__,
+            "upload_seconds_avg": round(self.metrics["upload_seconds_total"] / done, 4) if done else 0.0,
+        }
+
+
+def build_upload_pipeline(storage_client, bucket_name: Optional[str]) -> Optional[UploadPipeline]:
+    """Pick the backend from UPLOAD_BACKEND; returns None if GCS is selected but unavailable."""
+    if UPLOAD_BACKEND == "local":
+        logger.info(f"Uploads go to local directory {LOCAL_UPLOAD_DIR}")
+        return UploadPipeline(LocalFSBackend())
+    if storage_client is None or not bucket_name:
+        return None
+    return UploadPipeline(GCSBackend(storage_client, bucket_name))
@@ -0,0 +1,114 @@
+"""
+In-process cache of Firestore `users/{uid}` documents.
+
+Submissions, fixes, upvotes and the issue detail view all read user profiles
+(display name, NGO flag, karma state) on their hot paths. FirestoreStore.get_user
+serves them from this cache:
+
+- Entries live for USER_CACHE_TTL_SECONDS. Missing documents are not cached:
+  clients create their own user documents, which the gateway would not see.
+- Every write through FirestoreStore (update_user/set_user) invalidates the
+  uid. A per-uid generation counter keeps a read that was in flight during
+  the write from caching the old document.
+- Optionally (USER_CACHE_SNAPSHOT_LISTENER=true) a Firestore snapshot listener
+  on the users collection invalidates documents changed by other gateway
+  instances or the console. The listener's initial snapshot reads every user
+  document once, so it is off by default. It honours FIRESTORE_EMULATOR_HOST
+  like any Firestore client (see benchmarks/user_profile_cache.py).
+"""
+
+import copy
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SNAPSHOT_LISTENER = os.getenv("USER_CACHE_SNAPSHOT_LISTENER", "false").lower() in ("1", "true", "yes")
+
+_MISSING = object()
+
+
+class UserProfileCache:
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: int = USER_CACHE_TTL_SECONDS):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[str, int] = {}
+        # Snapshot callbacks run on a Firestore thread, not the event loop
+        self._lock = threading.Lock()
+        self._watch = None
+        self._listener_primed = False
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "listener_invalidations": 0,
+            "stale_fills_skipped": 0,
+        }
+
+    def generation(self, uid: str) -> int:
+        """Take before reading Firestore; pass to put() so a concurrent write wins."""
+        with self._lock:
+            return self._generations.get(uid, 0)
+
+    def get(self, uid: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(hit, document)."""
+        with self._lock:
+            value = self._cache.get(uid, _MISSING)
+            self.metrics["misses" if value is _MISSING else "hits"] += 1
+        if value is _MISSING:
+            return False, None
+        # Callers may modify what they get; the cached copy must not change
+        return True, copy.deepcopy(value)
+
+    def put(self, uid: str, data: Dict[str, Any], generation: int) -> None:
+        if data is None:
+            return  # Missing documents are never cached
+        with self._lock:
+            if self._generations.get(uid, 0) != generation:
+                self.metrics["stale_fills_skipped"] += 1
+                return
+            self._cache[uid] = copy.deepcopy(data)
+
+    def invalidate(self, uid: str, from_listener: bool = False) -> None:
+        with self._lock:
+            self._cache.pop(uid, None)
+            # Only uids with a generation need one; bounded by the uids ever written
+            self._generations[uid] = self._generations.get(uid, 0) + 1
+            self.metrics["listener_invalidations" if from_listener else "invalidations"] += 1
+
+    # --- Snapshot listener ---
+    def _on_snapshot(self, _docs, changes, _read_time) -> None:
+        if not self._listener_primed:
+            # The first callback is the initial state of the collection, not a change
+            self._listener_primed = True
+            return
+        for change in changes:
+            self.invalidate(change.document.id, from_listener=True)
+
+    def start_listener(self, client, collection: str = "users") -> None:
+        """Watch `collection` with a synchronous Firestore client (async clients cannot listen)."""
+        if self._watch is not None:
+            return
+        self._listener_primed = False
+        self._watch = client.collection(collection).on_snapshot(self._on_snapshot)
+        logger.info(f"User profile cache listening for changes on '{collection}'")
+
+    def stop_listener(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "listener": self._watch is not None,
+        }
@@ -204,6 +204,28 @@ def index_issue(issue_id: str, doc: Dict[str, Any]) -> None:
     es.index(index="issues", id=issue_id, document=doc)
 
 
+def bulk_index_issues(docs: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Index many issues with one _bulk request.
+    Returns {issue_id: error} for the documents ES rejected (empty when all succeeded).
+    """
+    if not docs:
+        return {}
+    operations: List[Dict[str, Any]] = []
+    for issue_id, doc in docs.items():
+        operations.append({"index": {"_index": "issues", "_id": issue_id}})
+        operations.append(doc)
+    resp = es.bulk(operations=operations)
+    errors: Dict[str, str] = {}
+    if resp.get("errors"):
+        for item in resp.get("items", []):
+            result = item.get("index", {})
+            if result.get("error"):
+                errors[result.get("_id")] = str(result["error"].get("reason") or result["error"])
+        logger.warning("Bulk index: %d of %d documents rejected", len(errors), len(docs))
+    return errors
+
+
 def get_issue(issue_id: str) -> Optional[Dict[str, Any]]:
     try:
         res = es.get(index="issues", id=issue_id)
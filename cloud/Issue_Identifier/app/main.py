@@ -4,16 +4,17 @@ import uuid
 import json
 import time
 import re
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, File, Form, UploadFile
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
-from app.schemas import ReportIn, AnalyzeOut, DetectedIssue
+from app.schemas import ReportIn, AnalyzeOut, DetectedIssue, BatchAnalyzeIn, BatchAnalyzeOut, BatchItemOut
 from app.prompt_templates import build_prompt
-from app.utils import fetch_image_bytes, get_weather_summary
+from app.utils import fetch_image_bytes, get_weather_summary, map_bounded
 from app import es_client
 
 # google genai SDK
@@ -26,6 +27,9 @@ logger = logging.getLogger("uvicorn.error")
 API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "gemini-embedding-001")
+# Reports analyzed in parallel by /analyze/batch; bounded to stay under Gemini rate limits
+ANALYZE_BATCH_CONCURRENCY = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", "8"))
+ANALYZE_BATCH_MAX_REPORTS = int(os.getenv("ANALYZE_BATCH_MAX_REPORTS", "200"))
 
 if not API_KEY:
     logger.error("GEMINI_API_KEY missing. Set GEMINI_API_KEY (from Google AI Studio or Vertex). Requests will fail.")
@@ -200,14 +204,23 @@ def generate_embedding(text: str) -> Optional[List[float]]:
         return None
 
 
-@app.post("/analyze/", response_model=AnalyzeOut)
-def analyze(report: ReportIn):
-    # 1. fetch image
-    try:
-        image_bytes, mime_type = fetch_image_bytes(report.image_url)
-    except Exception as e:
-        logger.exception("fetch_image_bytes failed")
-        raise HTTPException(status_code=400, detail=f"Could not fetch image: {e}")
+def run_analysis(report: ReportIn, image: Optional[Tuple[bytes, str]] = None) -> Tuple[AnalyzeOut, Optional[Dict[str, Any]]]:
+    """
+    Analyze one report end to end, except indexing.
+    `image` is (bytes, mime_type) when the caller sent the photo inline;
+    otherwise it is downloaded from report.image_url.
+    Returns (response, es_doc); es_doc is None when no issue was found.
+    Raises HTTPException on failure.
+    """
+    # 1. fetch image (unless sent inline)
+    if image is not None:
+        image_bytes, mime_type = image
+    else:
+        try:
+            image_bytes, mime_type = fetch_image_bytes(report.image_url)
+        except Exception as e:
+            logger.exception("fetch_image_bytes failed")
+            raise HTTPException(status_code=400, detail=f"Could not fetch image: {e}")
 
     # 2. Generate query embedding for hybrid search (before evidence retrieval)
     # Build a simple query text from user input
@@ -406,7 +419,7 @@ def analyze(report: ReportIn):
             no_issues_found=True,
             location=report.location,
             timestamp=report.timestamp
-        )
+        ), None
 
     # 8. validate detected_issues list
     raw_detected = parsed.get("detected_issues") or []
@@ -476,7 +489,7 @@ def analyze(report: ReportIn):
             no_issues_found=True,
             location=report.location,
             timestamp=report.timestamp
-        )
+        ), None
 
     # 9. Enforce maximum 5 issues (sort by severity_score, keep top 5)
     if len(retained) > 5:
@@ -526,11 +539,14 @@ def analyze(report: ReportIn):
         "created_at": report.timestamp,
         "updated_at": report.timestamp,
         "location": {"lat": report.location.latitude, "lon": report.location.longitude},
+        "display_address": report.display_address,
         "description": report.description,
         "text_embedding": text_embedding,
         "auto_caption": parsed.get("auto_caption"),
         "user_selected_labels": report.user_selected_labels,
         "photo_url": report.image_url,
+        "photo_variants": report.photo_variants,
+        "photo_dhash": report.photo_dhash,
         "detected_issues": [d.dict() for d in retained],
         "issue_types": list(seen_types),
         "label_confidences": label_confidences,
@@ -546,12 +562,6 @@ def analyze(report: ReportIn):
         "is_spam": False
     }
 
-    try:
-        es_client.index_issue(issue_id, es_doc)
-    except Exception:
-        logger.exception("Failed to index issue into Elasticsearch")
-        raise HTTPException(status_code=500, detail="Failed to index issue into search store")
-
     return AnalyzeOut(
         issue_id=issue_id,
         detected_issues=retained,
@@ -559,4 +569,100 @@ def analyze(report: ReportIn):
         no_issues_found=False,
         location=report.location,
         timestamp=report.timestamp
+    ), es_doc
+
+
+def analyze_and_index(report: ReportIn, image: Optional[Tuple[bytes, str]] = None) -> AnalyzeOut:
+    result, es_doc = run_analysis(report, image)
+    if es_doc is None:
+        return result
+
+    try:
+        es_client.index_issue(result.issue_id, es_doc)
+    except Exception:
+        logger.exception("Failed to index issue into Elasticsearch")
+        raise HTTPException(status_code=500, detail="Failed to index issue into search store")
+
+    return result
+
+
+@app.post("/analyze/", response_model=AnalyzeOut)
+def analyze(report: ReportIn):
+    return analyze_and_index(report)
+
+
+@app.post("/analyze/inline", response_model=AnalyzeOut)
+def analyze_inline(report: str = Form(...), image: UploadFile = File(...)):
+    """
+    Same as /analyze/, but the photo comes in the request (multipart: `report`
+    is the ReportIn JSON, `image` the file) instead of being downloaded from
+    image_url, which is still stored as the issue's photo_url.
+    """
+    try:
+        report_in = ReportIn.model_validate_json(report)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    image_bytes = image.file.read()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty image")
+    mime_type = (image.content_type or "image/jpeg").split(";")[0].strip()
+    return analyze_and_index(report_in, (image_bytes, mime_type))
+
+
+@app.post("/analyze/batch", response_model=BatchAnalyzeOut)
+def analyze_batch(batch: BatchAnalyzeIn):
+    """
+    Analyze many reports in one call (bulk imports, the seeder).
+
+    Reports are analyzed concurrently, at most ANALYZE_BATCH_CONCURRENCY at a time,
+    and every resulting issue is indexed with a single _bulk request. Each report
+    gets its own result or error; one bad report does not fail the batch.
+    """
+    if len(batch.reports) > ANALYZE_BATCH_MAX_REPORTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(batch.reports)} reports (max {ANALYZE_BATCH_MAX_REPORTS})"
+        )
+
+    started = time.perf_counter()
+    outcomes = map_bounded(run_analysis, batch.reports, ANALYZE_BATCH_CONCURRENCY)
+
+    results: List[BatchItemOut] = []
+    to_index: Dict[str, Dict[str, Any]] = {}
+    for index, (outcome, error) in enumerate(outcomes):
+        if error is not None:
+            status_code = error.status_code if isinstance(error, HTTPException) else 500
+            detail = error.detail if isinstance(error, HTTPException) else repr(error)
+            if not isinstance(error, HTTPException):
+                logger.error("Batch item %d failed: %r", index, error)
+            results.append(BatchItemOut(index=index, ok=False, status_code=status_code, error=str(detail)))
+            continue
+        result, es_doc = outcome
+        if es_doc is not None:
+            to_index[result.issue_id] = es_doc
+        results.append(BatchItemOut(index=index, ok=True, status_code=200, result=result))
+
+    index_errors: Dict[str, str] = {}
+    if to_index:
+        try:
+            index_errors = es_client.bulk_index_issues(to_index)
+        except Exception as e:
+            logger.exception("Bulk indexing failed")
+            index_errors = {issue_id: repr(e) for issue_id in to_index}
+        for item in results:
+            if item.ok and item.result.issue_id in index_errors:
+                item.ok = False
+                item.status_code = 500
+                item.error = f"Failed to index issue into search store: {index_errors[item.result.issue_id]}"
+
+    failed = sum(1 for item in results if not item.ok)
+    indexed = len(to_index) - len(index_errors)
+    logger.info(
+        "Batch of %d analyzed in %.1fs: %d indexed, %d failed",
+        len(results), time.perf_counter() - started, indexed, failed
+    )
+    return BatchAnalyzeOut(
+        results=results,
+        indexed=indexed,
+        failed=failed,
     )
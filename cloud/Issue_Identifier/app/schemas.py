@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal, List, Optional
+from typing import Literal, List, Optional, Dict
 from datetime import datetime, timezone
 
 class Location(BaseModel):
@@ -16,6 +16,9 @@ class ReportIn(BaseModel):
     reported_by: Optional[str] = "anonymous"
     uploader_display_name: Optional[str] = "anonymous"
     source: Optional[str] = "anonymous"  # citizen | anonymous
+    display_address: Optional[str] = None  # resolved by the gateway at submission
+    photo_variants: Optional[Dict[str, str]] = None  # WebP derivatives, e.g. {"thumb": url, "medium": url}
+    photo_dhash: Optional[str] = None  # 64-bit perceptual hash (hex) for near-duplicate detection
 
 
 class DetectedIssue(BaseModel):
@@ -37,3 +40,21 @@ class AnalyzeOut(BaseModel):
     no_issues_found: bool = False
     location: Optional[Location] = None
     timestamp: Optional[str] = None
+
+
+class BatchAnalyzeIn(BaseModel):
+    reports: List[ReportIn]
+
+
+class BatchItemOut(BaseModel):
+    index: int  # position in the request's reports list
+    ok: bool
+    status_code: int
+    result: Optional[AnalyzeOut] = None
+    error: Optional[str] = None
+
+
+class BatchAnalyzeOut(BaseModel):
+    results: List[BatchItemOut]
+    indexed: int = 0
+    failed: int = 0
@@ -1,5 +1,6 @@
 import requests
-from typing import Tuple, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Dict, Any, Callable, List, Optional, Sequence, TypeVar
 from datetime import datetime, timezone, timedelta
 import logging
 
@@ -7,13 +8,37 @@ logger = logging.getLogger("uvicorn.error")
 
 OPEN_METEO_HISTORICAL_URL = "https://archive-api.open-meteo.com/v1/archive"
 
+# One pooled session for all outbound calls, so repeated requests reuse connections
+_session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=32))
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_bounded(fn: Callable[[T], R], items: Sequence[T], concurrency: int) -> List[Tuple[Optional[R], Optional[BaseException]]]:
+    """
+    Run fn over items on at most `concurrency` threads.
+    Returns (result, None) or (None, exception) per item, in input order.
+    """
+    def call(item: T) -> Tuple[Optional[R], Optional[BaseException]]:
+        try:
+            return fn(item), None
+        except Exception as e:
+            return None, e
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items)))) as executor:
+        return list(executor.map(call, items))
+
 
 def fetch_image_bytes(url: str, timeout: int = 10) -> Tuple[bytes, str]:
     """
     Fetch image from URL. Returns bytes and MIME type.
     Raises requests.HTTPError on failure.
     """
-    resp = requests.get(url, timeout=timeout)
+    resp = _session.get(url, timeout=timeout)
     resp.raise_for_status()
     content_type = resp.headers.get("Content-Type", "image/jpeg")
     mime = content_type.split(";")[0].strip()
@@ -65,7 +90,7 @@ def get_weather_summary(location: Dict[str, float], timestamp: str) -> Dict[str,
     }
 
     try:
-        r = requests.get(OPEN_METEO_HISTORICAL_URL, params=params, timeout=10)
+        r = _session.get(OPEN_METEO_HISTORICAL_URL, params=params, timeout=10)
         r.raise_for_status()
         data = r.json()
         
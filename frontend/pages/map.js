@@ -53,13 +53,20 @@ function initMap() {
             source: 'issues-source',
             maxzoom: HEATMAP_ZOOM_THRESHOLD, // Hide heatmap when zooming IN past threshold
             paint: {
-                // Increase weight based on severity, default to 1 if missing
+                // Increase weight based on severity, default to 1 if missing.
+                // Below the threshold the backend sends clusters: weigh them by
+                // their severity sum, the same as the points they stand for.
                  'heatmap-weight': [
-                    'interpolate', ['linear'],
-                    ['coalesce', ['get', 'severity_score'], 1], // Use severity_score or default 1
-                    0, 0, // Severity 0 -> weight 0
-                    5, 1, // Severity 5 -> weight 1
-                    10, 2 // Severity 10 -> weight 2 
+                    'case',
+                    ['has', 'count'],
+                    ['/', ['coalesce', ['get', 'severity_sum'], ['get', 'count']], 5],
+                    [
+                        'interpolate', ['linear'],
+                        ['coalesce', ['get', 'severity_score'], 1], // Use severity_score or default 1
+                        0, 0, // Severity 0 -> weight 0
+                        5, 1, // Severity 5 -> weight 1
+                        10, 2 // Severity 10 -> weight 2 
+                    ]
                  ],
                 // Adjust intensity based on zoom
                 'heatmap-intensity': [
@@ -223,56 +230,98 @@ function initMap() {
 
 } // End initMap
 
+// --- Tile-addressed map data ---
+// The viewport is snapped to z/x/y tiles; the backend caches each tile per
+// filter set, so panning mostly fetches tiles that are already cached (here or there).
+const MAP_TILE_MAX_ZOOM = 20;
+const MAP_TILE_TTL_MS = 60 * 1000; // Matches the backend MAP_TILE_CACHE_TTL_SECONDS
+const MAP_TILE_CACHE_LIMIT = 500;
+const mapTileCache = new Map(); // "z/x/y|filters" -> { expires, data }
+let mapLoadSeq = 0;
+
+function lonToTileX(lon, z) {
+  return Math.floor(((lon + 180) / 360) * 2 ** z);
+}
+
+function latToTileY(lat, z) {
+  const clamped = Math.max(-85.05112878, Math.min(85.05112878, lat));
+  const rad = (clamped * Math.PI) / 180;
+  return Math.floor(((1 - Math.asinh(Math.tan(rad)) / Math.PI) / 2) * 2 ** z);
+}
+
+function visibleTiles(bounds, z) {
+  const max = 2 ** z - 1;
+  const clamp = (v) => Math.max(0, Math.min(max, v));
+  const xMin = clamp(lonToTileX(bounds.getWest(), z));
+  const xMax = clamp(lonToTileX(bounds.getEast(), z));
+  const yMin = clamp(latToTileY(bounds.getNorth(), z));
+  const yMax = clamp(latToTileY(bounds.getSouth(), z));
+  const tiles = [];
+  for (let x = xMin; x <= xMax; x++) {
+    for (let y = yMin; y <= yMax; y++) tiles.push({ z, x, y });
+  }
+  return tiles;
+}
+
+async function fetchMapTile({ z, x, y }, filters) {
+  const key = `${z}/${x}/${y}|${filters}`;
+  const cached = mapTileCache.get(key);
+  if (cached && cached.expires > Date.now()) return cached.data;
+
+  const queryParams = new URLSearchParams({ filters });
+  const response = await fetch(`${API_BASE}/api/map-tiles/${z}/${x}/${y}?${queryParams}`, {
+      headers: { 'Authorization': `Bearer ${currentToken}` }
+  });
+  if (!response.ok) {
+      let errorMsg = `Error ${response.status}`;
+      try { const errData = await response.json(); errorMsg = errData.detail || errorMsg; } catch (e) {}
+      throw new Error(errorMsg);
+  }
+  const data = await response.json();
+
+  mapTileCache.delete(key);
+  mapTileCache.set(key, { expires: Date.now() + MAP_TILE_TTL_MS, data });
+  if (mapTileCache.size > MAP_TILE_CACHE_LIMIT) {
+    mapTileCache.delete(mapTileCache.keys().next().value); // Oldest first
+  }
+  return data;
+}
+
 async function loadMapData() {
   if (!map || !currentToken) {
      console.log("Map not ready or token unavailable.");
      return; 
   }
 
-  const zoom = map.getZoom();
-  const bounds = map.getBounds();
-  const boundsObj = {
-    north: bounds.getNorth(), south: bounds.getSouth(),
-    east: bounds.getEast(), west: bounds.getWest()
-  };
+  const seq = ++mapLoadSeq;
+  const z = Math.max(0, Math.min(MAP_TILE_MAX_ZOOM, Math.floor(map.getZoom())));
+  const tiles = visibleTiles(map.getBounds(), z);
+  const filters = JSON.stringify(currentFilters);
 
   try {
-    const queryParams = new URLSearchParams({
-      zoom: zoom.toString(),
-      bounds: JSON.stringify(boundsObj),
-      filters: JSON.stringify(currentFilters)
-    });
-
-    const response = await fetch(`${API_BASE}/api/map-data?${queryParams}`, {
-        headers: { 'Authorization': `Bearer ${currentToken}` }
-    });
-
-    if (!response.ok) {
-        let errorMsg = `Error ${response.status}`;
-        try { const errData = await response.json(); errorMsg = errData.detail || errorMsg; } catch (e) {}
-        throw new Error(errorMsg);
-    }
-
-    const data = await response.json(); // Backend now ALWAYS sends {type: 'points', features: [...]}
+    // Each tile is {type: 'clusters' | 'points', features: [...]}: clusters (one
+    // per geohash cell, with count/severity_sum) below HEATMAP_ZOOM_THRESHOLD, points above
+    const results = await Promise.all(tiles.map((tile) => fetchMapTile(tile, filters)));
+    if (seq !== mapLoadSeq) return; // A newer pan/zoom superseded this load
+    const features = results.flatMap((data) => data.features || []);
 
     // --- Update the single GeoJSON source ---
     const source = map.getSource('issues-source');
-    if (source && data.features) {
-         console.log(`Received ${data.features.length} points from backend.`);
+    if (source) {
+         console.log(`Received ${features.length} features from ${tiles.length} tiles at zoom ${z}.`);
         source.setData({
             type: 'FeatureCollection',
-            features: data.features 
+            features: features
         });
     } else {
-         console.warn("Issues source not found or no features received.");
-          // Clear source if no data
-         if(source) source.setData({ type: 'FeatureCollection', features: [] });
+         console.warn("Issues source not found.");
     }
     
     // --- Update layer visibility AFTER data is loaded ---
     updateLayerVisibility(); 
 
   } catch (error) {
+    if (seq !== mapLoadSeq) return;
     console.error('Error loading map data:', error);
     showToast(`⚠️ Error loading map data: ${error.message}`);
      // Optionally clear the source on error
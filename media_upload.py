@@ -1,6 +1,7 @@
 import os
 import uuid
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Request, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from google.cloud import storage
@@ -12,12 +13,53 @@ BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
 if not BUCKET_NAME:
     raise RuntimeError("GCS_BUCKET_NAME must be set in .env")
 
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_VIDEO_UPLOAD_BYTES = int(os.getenv("MAX_VIDEO_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+# Resumable upload chunk size; must be a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
 # Create storage client (uses GOOGLE_APPLICATION_CREDENTIALS env variable)
 storage_client = storage.Client()
 
 app = FastAPI(title="GCS Image Uploader")
 
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject from the Content-Length header before the body is read
+    limits = {
+        "/upload": MAX_IMAGE_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+        "/upload_video": MAX_VIDEO_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    }
+    limit = limits.get(request.url.path)
+    content_length = request.headers.get("content-length")
+    if limit and content_length and content_length.isdigit() and int(content_length) > limit:
+        return JSONResponse({"detail": f"Request body too large (limit {limit} bytes)"}, status_code=413)
+    return await call_next(request)
+
+
+def stream_to_gcs(file: UploadFile, object_name: str, max_bytes: int) -> str:
+    """
+    Stream the spooled upload to GCS without reading it into memory; files above
+    8 MB go through a resumable upload, UPLOAD_CHUNK_SIZE at a time.
+    """
+    size = file.size
+    if size is None:
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+    if size == 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+    if size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File is {size} bytes; the limit is {max_bytes} bytes")
+
+    file.file.seek(0)
+    blob = storage_client.bucket(BUCKET_NAME).blob(object_name, chunk_size=UPLOAD_CHUNK_SIZE)
+    blob.upload_from_file(file.file, size=size, content_type=file.content_type)
+    # Public URL (works if bucket is public)
+    return f"https://storage.googleapis.com/{BUCKET_NAME}/{object_name}"
+
+
 @app.post("/upload")
 async def upload_image(file: UploadFile = File(...)):
     if not file:
@@ -33,17 +75,8 @@ async def upload_image(file: UploadFile = File(...)):
         ext = "." + file.filename.rsplit(".", 1)[1]
     object_name = f"uploads/{uuid.uuid4().hex}{ext}"
     
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="File is empty")
-    
-    # Upload to GCS
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(object_name)
-    blob.upload_from_string(data, content_type=file.content_type)
-    
-    # Public URL (works if bucket is public)
-    public_url = f"https://storage.googleapis.com/{BUCKET_NAME}/{object_name}"
+    # Upload to GCS (off the event loop)
+    public_url = await run_in_threadpool(stream_to_gcs, file, object_name, MAX_IMAGE_UPLOAD_BYTES)
     
     return JSONResponse({"object_name": object_name, "public_url": public_url})
 
@@ -58,11 +91,5 @@ async def upload_video(file: UploadFile = File(...)):
     if "." in (file.filename or ""):
         ext = "." + file.filename.rsplit(".", 1)[1]
     object_name = f"fix-videos/{uuid.uuid4().hex}{ext}"
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="File is empty")
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(object_name)
-    blob.upload_from_string(data, content_type=file.content_type)
-    public_url = f"https://storage.googleapis.com/{BUCKET_NAME}/{object_name}"
+    public_url = await run_in_threadpool(stream_to_gcs, file, object_name, MAX_VIDEO_UPLOAD_BYTES)
     return JSONResponse({"object_name": object_name, "public_url": public_url})